@@ -0,0 +1,187 @@
+# Measures what it costs to get from boot to the first player command sent on a button
+# press, the path main.py takes: the time and heap used by each step and the modules of
+# the library loaded after it. Imports are only
+# measured once per process, so run it in a fresh interpreter, on the device after boot.py:
+#
+#   python benchmark/boot_bench.py [--json]
+import gc
+import sys
+import time
+
+sys.path.insert(0, '/'.join(__file__.split('/')[:-2]) or '.')
+
+if sys.implementation.name == 'micropython':
+
+    def perf_counter():
+        # noinspection PyUnresolvedReferences
+        return time.ticks_us() / 1000000
+
+    def heap_used():
+        gc.collect()
+        return gc.mem_alloc()
+
+    def start_tracing():
+        pass
+
+
+else:
+    import tracemalloc
+
+    perf_counter = time.perf_counter
+
+    def heap_used():
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0]
+
+    def start_tracing():
+        tracemalloc.start()
+
+
+CREDENTIALS = dict(
+    refresh_token='refresh_token',
+    access_token='access_token',
+    expires_at=time.time() + 3600,
+    client_id='client_id',
+    client_secret='client_secret',
+    device_id='device_id',
+)
+
+
+# Answers every request with 204 No Content, the response to player commands
+class NoContentPool:
+    def request(self, method, url, headers=None, json=None, data=None, stream=False, timeout=None):
+        from spotify_web_api.connection import Response
+
+        return Response(204, {}, b'')
+
+    def close(self):
+        pass
+
+
+# A button pin with a pull-up, press() pulls it low and calls the IRQ handler
+class ButtonPin:
+    IRQ_FALLING = 1
+    IRQ_RISING = 2
+
+    def __init__(self):
+        self.level = 1
+        self.handler = None
+
+    def value(self):
+        return self.level
+
+    def irq(self, handler, trigger):
+        self.handler = handler
+
+    def press(self):
+        self.level = 0
+        self.handler(self)
+
+
+# Counts the bytes written instead of sending them
+class NullStream:
+    def __init__(self):
+        self.written = 0
+
+    def write(self, data):
+        self.written += len(data)
+
+
+def steps():
+    state = {}
+
+    def import_library():
+        import spotify_web_api  # noqa: F401
+
+    def import_buttons():
+        import spotify_web_api.buttons  # noqa: F401
+
+    def create_client():
+        from spotify_web_api import Session, SpotifyWebApiClient
+        from spotify_web_api.buttons import Buttons, SINGLE
+
+        client = SpotifyWebApiClient(Session(dict(CREDENTIALS), pool=NoContentPool()))
+        buttons = state['buttons'] = Buttons()
+        client.session.add_hook('request', buttons.on_request)
+        state['pin'] = ButtonPin()
+        buttons.add(state['pin'], {SINGLE: client.pause}, debounce=0)
+
+    def first_command():
+        state['pin'].press()
+        if not state['buttons'].process():
+            raise RuntimeError('The press did not send a command')
+
+    def import_models():
+        import spotify_web_api.models  # noqa: F401
+
+    def import_setup_wizard():
+        import spotify_web_api.authorization_code_flow  # noqa: F401
+
+    def render_setup_page():
+        from spotify_web_api.server import render_template
+
+        stream = NullStream()
+        for line in render_template(
+            'setup.html',
+            redirect_uri='http://192.168.1.17:8080/auth-response/',
+            default_client_id='',
+            default_client_secret='',
+        ):
+            stream.write(line)
+
+    return [
+        ('import spotify_web_api', import_library),
+        ('import buttons', import_buttons),
+        ('create client', create_client),
+        ('first command', first_command),
+        ('import models', import_models),
+        ('import setup wizard', import_setup_wizard),
+        ('render setup page', render_setup_page),
+    ]
+
+
+def loaded_modules():
+    return sorted(name for name in sys.modules if name.startswith('spotify_web_api'))
+
+
+def run():
+    start_tracing()
+    results = []
+    for name, step in steps():
+        heap = heap_used()
+        start = perf_counter()
+        step()
+        seconds = perf_counter() - start
+        results.append(
+            {
+                'step': name,
+                'ms': seconds * 1000,
+                'heap_bytes': heap_used() - heap,
+                'modules': len(loaded_modules()),
+            }
+        )
+    return results
+
+
+def format_results(results):
+    lines = ['{:<24}{:>10}{:>12}{:>9}'.format('step', 'ms', 'heap bytes', 'modules')]
+    for result in results:
+        lines.append(
+            '{:<24}{:>10.2f}{:>12}{:>9}'.format(result['step'], result['ms'], result['heap_bytes'], result['modules'])
+        )
+    return '\n'.join(lines)
+
+
+def main(argv):
+    results = run()
+    if '--json' in argv:
+        import json
+
+        print(json.dumps(results))
+    else:
+        print(format_results(results))
+        print('loaded: ' + ', '.join(loaded_modules()))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,189 @@
+# Load test for the control server (spotify_web_api.control): requests per second and
+# p50/p99 latency of status reads and player commands over keep-alive connections.
+#
+# On CPython the control server is started in the process, with a client that talks to
+# the fake Spotify server:
+#
+#   python benchmark/control_bench.py [--connections 4] [--requests 500] [--queue] [--json]
+#
+# To measure a device, serve the control server on it with the credentials on the device
+# and run the load from another machine:
+#
+#   micropython benchmark/control_bench.py --serve
+#   python benchmark/control_bench.py --target http://192.168.1.17:8082
+import sys
+import time
+
+sys.path.insert(0, '/'.join(__file__.split('/')[:-2]) or '.')
+
+from spotify_web_api.control import ControlServer  # noqa: E402
+
+if sys.implementation.name == 'micropython':
+
+    def perf_counter():
+        # noinspection PyUnresolvedReferences
+        return time.ticks_us() / 1000000
+
+
+else:
+    perf_counter = time.perf_counter
+
+
+REQUESTS = (
+    ('status', 'GET', '/status'),
+    ('pause', 'POST', '/pause'),
+    ('volume', 'POST', '/volume?volume_percent=40'),
+)
+
+
+def serve(port=8082):
+    from spotify_web_api import spotify_client
+    from spotify_web_api.commands import CommandQueue
+    from spotify_web_api.watcher import PlaybackWatcher
+
+    client = spotify_client()
+    control = ControlServer(client, CommandQueue(client), PlaybackWatcher(client), port=port).start()
+    print('Serving on port {}'.format(control.server.port))
+    control.run()
+
+
+# Starts a control server on a free port in a thread, its client talks to a fake Spotify
+# server in the process
+def start_local(queue=False):
+    import threading
+
+    from fake_spotify import FakeSpotifyServer
+    from run import LocalPool, make_pool
+
+    from spotify_web_api import Session, SpotifyWebApiClient
+    from spotify_web_api.commands import CommandQueue
+    from spotify_web_api.watcher import PlaybackWatcher
+
+    spotify = FakeSpotifyServer().start()
+    credentials = dict(
+        access_token='access_token_0',
+        refresh_token='refresh_token',
+        client_id='client_id',
+        client_secret='client_secret',
+        device_id=None,
+    )
+    client = SpotifyWebApiClient(Session(credentials, pool=LocalPool(make_pool('connection'), spotify.url)))
+    watcher = PlaybackWatcher(client)
+    watcher.poll()
+    control = ControlServer(
+        client,
+        CommandQueue(client) if queue else None,
+        watcher,
+        port=0,
+        host='127.0.0.1',
+        max_connections=16,
+    ).start()
+    stopped = []
+    thread = threading.Thread(target=control.run, args=(lambda: stopped, 0.05))
+    thread.start()
+
+    def stop():
+        stopped.append(True)
+        thread.join()
+        control.close()
+        spotify.stop()
+
+    return 'http://127.0.0.1:{}'.format(control.server.port), stop
+
+
+# Sends `requests` requests split over `connections` keep-alive connections at once
+def load(target, method, path, connections=4, requests=500):
+    import http.client
+    import threading
+
+    host, _, port = target.split('://')[-1].partition(':')
+    timings = []
+    errors = []
+
+    def worker(count):
+        connection = http.client.HTTPConnection(host, int(port or 80), timeout=30)
+        for _ in range(count):
+            start = perf_counter()
+            try:
+                connection.request(method, path)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    errors.append(response.status)
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(e)
+                connection.close()
+            timings.append(perf_counter() - start)
+        connection.close()
+
+    workers = [
+        threading.Thread(target=worker, args=(requests // connections + (i < requests % connections),))
+        for i in range(connections)
+    ]
+    start = perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = perf_counter() - start
+    timings.sort()
+    return {
+        'requests': len(timings),
+        'requests_per_second': len(timings) / elapsed if elapsed else 0,
+        'p50_ms': timings[len(timings) // 2] * 1000,
+        'p99_ms': timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000,
+        'errors': len(errors),
+    }
+
+
+def run(target=None, connections=4, requests=500, queue=False):
+    stop = None
+    if target is None:
+        target, stop = start_local(queue)
+    try:
+        return dict(
+            (name, load(target, method, path, connections, requests)) for name, method, path in REQUESTS
+        )
+    finally:
+        if stop is not None:
+            stop()
+
+
+def format_results(results):
+    row = '{:<10}{:>10}{:>12}{:>10}{:>10}{:>8}'
+    lines = [row.format('request', 'requests', 'requests/s', 'p50 ms', 'p99 ms', 'errors')]
+    for name, result in results.items():
+        lines.append(
+            '{:<10}{:>10}{:>12.1f}{:>10.2f}{:>10.2f}{:>8}'.format(
+                name,
+                result['requests'],
+                result['requests_per_second'],
+                result['p50_ms'],
+                result['p99_ms'],
+                result['errors'],
+            )
+        )
+    return '\n'.join(lines)
+
+
+def main(argv):
+    if '--serve' in argv:
+        serve(int(argv[argv.index('--port') + 1]) if '--port' in argv else 8082)
+        return
+    sys.path.insert(0, '/'.join(__file__.split('/')[:-1]) or '.')
+    results = run(
+        argv[argv.index('--target') + 1] if '--target' in argv else None,
+        int(argv[argv.index('--connections') + 1]) if '--connections' in argv else 4,
+        int(argv[argv.index('--requests') + 1]) if '--requests' in argv else 500,
+        '--queue' in argv,
+    )
+    if '--json' in argv:
+        import json
+
+        print(json.dumps(results))
+    else:
+        print(format_results(results))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,251 @@
+# Local stand-in for the parts of the Spotify Web API used by the library, for the
+# benchmarks and for trying out a device without touching a real account. Runs on CPython:
+#
+#   python benchmark/fake_spotify.py --port 8000 --latency 0.02 --error-rate 0.05
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DEVICES = {
+    'devices': [
+        {
+            'id': 'device_{}'.format(i),
+            'is_active': i == 0,
+            'is_private_session': False,
+            'is_restricted': False,
+            'name': 'Speaker {}'.format(i),
+            'type': 'Speaker',
+            'volume_percent': 50,
+        }
+        for i in range(4)
+    ]
+}
+
+
+PUT_COMMANDS = (
+    '/v1/me/player',
+    '/v1/me/player/play',
+    '/v1/me/player/pause',
+    '/v1/me/player/seek',
+    '/v1/me/player/volume',
+    '/v1/me/player/shuffle',
+    '/v1/me/player/repeat',
+)
+
+POST_COMMANDS = ('/v1/me/player/next', '/v1/me/player/previous', '/v1/me/player/queue')
+
+
+def track(i):
+    return {
+        'id': 'track{:018d}'.format(i),
+        'name': 'Track {}'.format(i),
+        'uri': 'spotify:track:track{:018d}'.format(i),
+        'duration_ms': 180000 + i,
+        'explicit': False,
+        'popularity': i % 100,
+        'track_number': i % 12 + 1,
+        'artists': [{'id': 'artist{}'.format(i % 7), 'name': 'Artist {}'.format(i % 7)}],
+        'album': {'id': 'album{}'.format(i % 13), 'name': 'Album {}'.format(i % 13), 'images': []},
+        'available_markets': ['SE', 'NO', 'DK', 'FI', 'US', 'GB', 'DE'],
+    }
+
+
+PLAYBACK_STATE = {
+    'device': DEVICES['devices'][0],
+    'context': {'type': 'playlist', 'uri': 'spotify:playlist:benchmark'},
+    'currently_playing_type': 'track',
+    'is_playing': True,
+    'item': track(0),
+    'progress_ms': 60000,
+    'repeat_state': 'off',
+    'shuffle_state': False,
+    'timestamp': 1600000000000,
+}
+
+
+# latency is added to every response, error_rate is the probability of each of 401
+# (expired access token), 429 (with Retry-After: retry_after) and 503 responses.
+class FakeSpotifyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=('127.0.0.1', 0),
+        latency=0,
+        error_rate=0,
+        retry_after=0,
+        playlist_size=1000,
+        seed=0,
+    ):
+        super().__init__(address, FakeSpotifyHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.playlist_size = playlist_size
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.access_token = 'access_token_0'
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return 'http://{}:{}'.format(*self.server_address[:2])
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def injected_error(self):
+        with self._lock:
+            self.requests += 1
+            draw = self.random.random()
+        for status in (401, 429, 503):
+            if draw < self.error_rate:
+                return status
+            draw -= self.error_rate
+        return None
+
+    def new_access_token(self):
+        with self._lock:
+            self.access_token = 'access_token_{}'.format(self.requests)
+            return self.access_token
+
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # The headers and the body are written separately, without this the body waits
+        # for the delayed ACK of the headers on reused connections.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        if not self._begin():
+            return
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        parts = url.path.strip('/').split('/')
+        if url.path == '/v1/me/player/devices':
+            self._json(200, DEVICES)
+        elif url.path in ('/v1/me/player', '/v1/me/player/currently-playing'):
+            self._json(200, PLAYBACK_STATE)
+        elif url.path == '/v1/me/player/queue':
+            self._json(200, {'currently_playing': track(0), 'queue': [track(i) for i in range(1, 21)]})
+        elif url.path == '/v1/tracks':
+            ids = query['ids'][0].split(',')
+            self._json(200, {'tracks': [track(int(i[5:]) if i[5:].isdigit() else 0) for i in ids]})
+        elif len(parts) == 4 and parts[:2] == ['v1', 'playlists'] and parts[3] == 'tracks':
+            self._json(200, self._playlist_page(url.path, query))
+        else:
+            self._error(404, 'Not found')
+
+    def do_PUT(self):
+        self._read_body()
+        if not self._begin():
+            return
+        if self.path.split('?')[0] in PUT_COMMANDS:
+            self._send(204, b'')
+        else:
+            self._error(404, 'Not found')
+
+    def do_POST(self):
+        if self.path.split('?')[0] in POST_COMMANDS:
+            self._read_body()
+            if self._begin():
+                self._send(204, b'')
+            return
+        body = parse_qs(self._read_body().decode())
+        time.sleep(self.server.latency)
+        if self.path != '/api/token' or body.get('grant_type') != ['refresh_token']:
+            self._send(400, json.dumps({'error': 'invalid_request'}).encode())
+            return
+        self._json(200, {'access_token': self.server.new_access_token(), 'expires_in': 3600})
+
+    def log_message(self, *args):
+        pass
+
+    def _begin(self):
+        time.sleep(self.server.latency)
+        if self.headers.get('Authorization') != 'Bearer {}'.format(self.server.access_token):
+            self._error(401, 'The access token expired')
+            return False
+        status = self.server.injected_error()
+        if status == 401:
+            self.server.new_access_token()
+            self._error(401, 'The access token expired')
+        elif status == 429:
+            self._error(429, 'API rate limit exceeded', {'Retry-After': str(self.server.retry_after)})
+        elif status == 503:
+            self._error(503, 'Service unavailable')
+        return status is None
+
+    def _playlist_page(self, path, query):
+        offset = int(query.get('offset', ['0'])[0])
+        limit = int(query.get('limit', ['100'])[0])
+        total = self.server.playlist_size
+        next_url = None
+        if offset + limit < total:
+            next_url = 'https://api.spotify.com{}?offset={}&limit={}'.format(path, offset + limit, limit)
+        return {
+            'items': [
+                {'added_at': '2020-01-01T00:00:00Z', 'track': track(i)} for i in range(offset, min(offset + limit, total))
+            ],
+            'limit': limit,
+            'next': next_url,
+            'offset': offset,
+            'total': total,
+        }
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def _json(self, status, value):
+        self._send(status, json.dumps(value).encode(), {'Content-Type': 'application/json'})
+
+    def _error(self, status, message, headers=None):
+        body = json.dumps({'error': {'status': status, 'message': message}}).encode()
+        self._send(status, body, dict(headers or {}, **{'Content-Type': 'application/json'}))
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 204:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--retry-after', type=int, default=0)
+    parser.add_argument('--playlist-size', type=int, default=1000)
+    args = parser.parse_args()
+    server = FakeSpotifyServer(
+        (args.host, args.port),
+        latency=args.latency,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+        playlist_size=args.playlist_size,
+    )
+    print('Fake Spotify Web API on {}'.format(server.url))
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+# Measures calls per second, p50/p99 latency, allocations and peak memory of the client
+# operations against the fake Spotify server. On CPython the server is started in the
+# process unless --server is given:
+#
+#   python benchmark/run.py [--pool connection|requests] [--iterations 100] [--latency 0.005]
+#
+# On the MicroPython unix port start benchmark/fake_spotify.py with CPython first:
+#
+#   micropython benchmark/run.py --server http://127.0.0.1:8000
+#
+# --record FILE saves the traffic of a run and --replay FILE runs the operations on
+# recorded responses without a server, operations that were not recorded are skipped.
+#
+# Allocations are the bytes allocated per call with the garbage collector disabled and are
+# only measured on MicroPython, peak memory is measured with tracemalloc on CPython.
+import gc
+import sys
+import time
+
+sys.path.insert(0, '/'.join(__file__.split('/')[:-2]) or '.')
+
+from spotify_web_api import Session, SpotifyWebApiClient  # noqa: E402
+from spotify_web_api.replay import RecordingPool, ReplayPool  # noqa: E402
+
+if sys.implementation.name == 'micropython':
+    # noinspection PyUnresolvedReferences
+    import ujson as json
+
+    tracemalloc = None
+
+    def perf_counter():
+        # noinspection PyUnresolvedReferences
+        return time.ticks_us() / 1000000
+
+
+else:
+    import json
+    import tracemalloc
+
+    perf_counter = time.perf_counter
+
+
+SPOTIFY_URLS = ('https://api.spotify.com', 'https://accounts.spotify.com')
+
+TRACK_IDS = ['track{:018d}'.format(i) for i in range(100)]
+
+
+# Sends the requests for the Spotify Web API to the fake server instead
+class LocalPool:
+    def __init__(self, pool, url):
+        self.pool = pool
+        self.url = url
+
+    def request(self, method, url, **kwargs):
+        for prefix in SPOTIFY_URLS:
+            if url.startswith(prefix):
+                url = self.url + url[len(prefix) :]
+        return self.pool.request(method, url, **kwargs)
+
+    def close(self):
+        self.pool.close()
+
+
+def operations(client):
+    return [
+        ('devices', lambda: list(client.devices())),
+        ('play', lambda: client.play(uris=['spotify:track:471sXvN5C5vfMSBdKrGpo7'])),
+        ('pause', client.pause),
+        ('next', client.next),
+        ('volume', lambda: client.volume(40)),
+        ('playback_state', client.playback_state),
+        ('tracks', lambda: list(client.tracks(TRACK_IDS, fields=('id', 'name')))),
+        ('playlist_tracks', lambda: list(client.playlist_tracks('benchmark', fields=('id', 'name')))),
+        ('refresh', client.session._refresh_access_token),
+    ]
+
+
+def measure(operation, iterations):
+    operation()  # Warm up connections and imports
+    timings = []
+    allocated = 0
+    peak = None
+    gc.collect()
+    if tracemalloc is not None:
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+    start = perf_counter()
+    for _ in range(iterations):
+        if tracemalloc is None:
+            gc.collect()
+            gc.disable()
+            before = gc.mem_alloc()
+        call_start = perf_counter()
+        operation()
+        timings.append(perf_counter() - call_start)
+        if tracemalloc is None:
+            allocated += gc.mem_alloc() - before
+            gc.enable()
+    elapsed = perf_counter() - start
+    if tracemalloc is not None:
+        peak = tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+    timings.sort()
+    return {
+        'calls': iterations,
+        'calls_per_second': iterations / elapsed if elapsed else 0,
+        'p50_ms': timings[len(timings) // 2] * 1000,
+        'p99_ms': timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000,
+        'alloc_bytes': allocated // iterations if tracemalloc is None else None,
+        'peak_bytes': peak,
+    }
+
+
+def make_pool(name):
+    if name == 'requests':
+        from spotify_web_api.connection import RequestsPool
+
+        return RequestsPool()
+    from spotify_web_api.connection import ConnectionPool
+
+    return ConnectionPool()
+
+
+def run(server_url, pool='connection', iterations=100, only=None, record=None, replay=None):
+    credentials = dict(
+        access_token='access_token_0',
+        refresh_token='refresh_token',
+        client_id='client_id',
+        client_secret='client_secret',
+        device_id=None,
+    )
+    if replay is not None:
+        transport = ReplayPool(replay, loop=True)
+    else:
+        transport = LocalPool(make_pool(pool), server_url)
+        if record is not None:
+            transport = RecordingPool(transport, record)
+    session = Session(credentials, pool=transport)
+    client = SpotifyWebApiClient(session)
+    results = {}
+    for name, operation in operations(client):
+        if only and name not in only:
+            continue
+        try:
+            # Paging through a whole playlist is ten requests
+            results[name] = measure(operation, max(1, iterations // 10) if name == 'playlist_tracks' else iterations)
+        except KeyError:
+            if replay is None:
+                raise
+    session.pool.close()
+    return results
+
+
+def format_results(results):
+    header = ('operation', 'calls', 'calls/s', 'p50 ms', 'p99 ms', 'alloc B', 'peak B')
+    lines = ['{:<16}{:>8}{:>10}{:>10}{:>10}{:>12}{:>12}'.format(*header)]
+    for name, result in results.items():
+        lines.append(
+            '{:<16}{:>8}{:>10.1f}{:>10.2f}{:>10.2f}{:>12}{:>12}'.format(
+                name,
+                result['calls'],
+                result['calls_per_second'],
+                result['p50_ms'],
+                result['p99_ms'],
+                '-' if result['alloc_bytes'] is None else result['alloc_bytes'],
+                '-' if result['peak_bytes'] is None else result['peak_bytes'],
+            )
+        )
+    return '\n'.join(lines)
+
+
+def parse_args(argv):
+    args = {
+        'pool': 'connection',
+        'iterations': '100',
+        'latency': '0',
+        'server': None,
+        'only': None,
+        'json': None,
+        'record': None,
+        'replay': None,
+    }
+    i = 0
+    while i < len(argv):
+        name = argv[i][2:].replace('-', '_')
+        if name not in args:
+            raise SystemExit('Unknown argument {}'.format(argv[i]))
+        if name == 'json':
+            args[name] = True
+            i += 1
+            continue
+        args[name] = argv[i + 1]
+        i += 2
+    return args
+
+
+def main(argv):
+    args = parse_args(argv)
+    server = None
+    server_url = args['server']
+    if server_url is None and args['replay'] is None:
+        from fake_spotify import FakeSpotifyServer
+
+        server = FakeSpotifyServer(latency=float(args['latency'])).start()
+        server_url = server.url
+    try:
+        results = run(
+            server_url,
+            args['pool'],
+            int(args['iterations']),
+            args['only'] and args['only'].split(','),
+            args['record'],
+            args['replay'],
+        )
+    finally:
+        if server is not None:
+            server.stop()
+    print(json.dumps(results) if args['json'] else format_results(results))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,79 @@
+# Compares the urllib replacements in spotify_web_api with urllib.parse on CPython, on
+# MicroPython only the replacements are timed:
+#
+#   python benchmark/urllib_bench.py [--iterations 20000]
+import gc
+import sys
+import time
+
+sys.path.insert(0, '/'.join(__file__.split('/')[:-2]) or '.')
+
+import spotify_web_api  # noqa: E402
+
+if sys.implementation.name == 'micropython':
+    stdlib = None
+
+    def perf_counter():
+        # noinspection PyUnresolvedReferences
+        return time.ticks_us() / 1000000
+
+
+else:
+    import urllib.parse as stdlib
+
+    perf_counter = time.perf_counter
+
+
+REFRESH_PARAMS = dict(
+    grant_type='refresh_token',
+    refresh_token='AQBx3V9lqzR1kHn-8wmSn0Xo2p1r9rSgF6JfCk7tLxTj9yq0Jb5o7c0H2q2h3m4n5o6p7q8r9s0t1u2v3w4x5y6z',
+    client_id='0123456789abcdef0123456789abcdef',
+    client_secret='fedcba9876543210fedcba9876543210',
+)
+REDIRECT_URI = 'http://192.168.1.17:8080/auth-response/'
+QUOTED = 'code=AQD%2Fx%2By%3D&redirect_uri=http%3A%2F%2F192.168.1.17%3A8080%2Fauth-response%2F&name=Sigur+R%C3%B3s'
+
+
+def cases(module):
+    if module is stdlib:
+        return [
+            ('quote', lambda: module.quote(REDIRECT_URI, safe='')),
+            ('quote_plus utf-8', lambda: module.quote_plus('Sigur Rós – Hoppípolla', safe='')),
+            ('unquote_plus', lambda: module.unquote_plus(QUOTED)),
+            ('urlencode', lambda: module.urlencode(REFRESH_PARAMS)),
+            ('parse_qs', lambda: module.parse_qs(QUOTED)),
+        ]
+    return [
+        ('quote', lambda: module.quote(REDIRECT_URI)),
+        ('quote_plus utf-8', lambda: module.quote_plus('Sigur Rós – Hoppípolla')),
+        ('unquote_plus', lambda: module.unquote_plus(QUOTED)),
+        ('urlencode', lambda: module.urlencode(REFRESH_PARAMS)),
+        ('parse_qs', lambda: module.parse_qs(QUOTED)),
+    ]
+
+
+def timed(function, iterations):
+    gc.collect()
+    start = perf_counter()
+    for _ in range(iterations):
+        function()
+    return (perf_counter() - start) / iterations * 1000000
+
+
+def main(argv):
+    iterations = int(argv[argv.index('--iterations') + 1]) if '--iterations' in argv else 20000
+    ours = cases(spotify_web_api)
+    theirs = cases(stdlib) if stdlib is not None else [(name, None) for name, _ in ours]
+    print('{:<20}{:>14}{:>16}'.format('function', 'us/call', 'stdlib us/call'))
+    for (name, function), (_, reference) in zip(ours, theirs):
+        print(
+            '{:<20}{:>14.2f}{:>16}'.format(
+                name,
+                timed(function, iterations),
+                '-' if reference is None else '{:.2f}'.format(timed(reference, iterations)),
+            )
+        )
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,31 +1,58 @@
-import time
-
 import machine
 
 from spotify_web_api import (
+    RequestTimeout,
     spotify_client,
     SpotifyWebApiError,
 )
+from spotify_web_api.buttons import Buttons, DOUBLE, LONG, SINGLE
+
 
+def print_error(e):
+    if isinstance(e, SpotifyWebApiError):
+        print('Error: {}, Reason: {}'.format(e, e.reason))
+    else:
+        print('Error: {}'.format(e))
 
-def run(button):
+
+def run(pin):
     print("Running")
     spotify = spotify_client()
+    seagulls = spotify.prepare_play(uris=["spotify:track:471sXvN5C5vfMSBdKrGpo7"])
+
+    def play():
+        print("Play: Seagulls! Stop it now!")
+        spotify.play(body=seagulls)
+
+    def pause():
+        print("Pause")
+        spotify.pause()
+
+    def next_track():
+        print("Next")
+        spotify.next()
+
+    # light_sleep=True also needs a wake source for the pin, see Buttons
+    buttons = Buttons(on_error=print_error)
+    buttons.add(pin, {SINGLE: play, DOUBLE: next_track, LONG: pause})
+    spotify.session.add_hook('request', buttons.on_request)
     while True:
+        buttons.wait(30)
+        if buttons.process():
+            if buttons.last_latency is not None:
+                print('Press to request: {:.0f} ms'.format(buttons.last_latency * 1000))
+            continue
+        if not buttons.idle:
+            continue
         try:
-            if not button.value():
-                time.sleep(0.3)
-                if button.value():
-                    print("Play: Seagulls! Stop it now!")
-                    spotify.play(uris=["spotify:track:471sXvN5C5vfMSBdKrGpo7"])
-                else:
-                    print("Pause")
-                    spotify.pause()
-                while not button.value():
-                    time.sleep(0.1)
-            time.sleep(0.05)
+            spotify.session.refresh_if_needed(margin=300)
         except SpotifyWebApiError as e:
             print('Error: {}, Reason: {}'.format(e, e.reason))
+        except RequestTimeout as e:
+            print('Timeout: {}'.format(e))
+        except OSError as e:
+            # Connection errors of the token request, e.g. a reset or a failed DNS lookup
+            print('Error: {}'.format(e))
 
 
 def main():
@@ -4,6 +4,7 @@ import sdist_upip
 setup(
     name='micropython-spotify-web-api',
     packages=['spotify_web_api'],
+    package_data={'spotify_web_api': ['templates/*.html']},
     version='0.0.1',
     description='Spotify Web API client for MicroPython',
     long_description='Spotify Web API client for MicroPython',
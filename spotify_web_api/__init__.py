@@ -1,130 +1,330 @@
 import sys
-
+import time
+
+
+from .clock import elapsed, monotonic
+from .connection import (
+    Deadline,
+    DeadlineExceeded,
+    default_pool,
+    Headers,
+    RequestTimeout,
+)
+from .ratelimit import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_DEFAULT,
+    PRIORITY_INTERACTIVE,
+)
+from .urls import quote, urlencode
 
 if sys.implementation.name == 'micropython':
-    import urequests as requests
-
     # noinspection PyUnresolvedReferences
     import ujson as json
-
-    # noinspection PyShadowingBuiltins
-    class FileNotFoundError(Exception):
-        pass
-
-
 else:
-    import requests
     import json
 
 
+TOKEN_ENDPOINT = 'https://accounts.spotify.com/api/token'
+
+EMPTY_JSON_BODY = b'{}'
+
+PLAYER_URL = 'https://api.spotify.com/v1/me/player'
+
+# Names of the package that are imported from their submodule on first use, so that
+# sending player commands does not load the models, paging, streaming JSON and form
+# parsing code
+_LAZY = {
+    'Album': 'models',
+    'Device': 'models',
+    'PlaybackState': 'models',
+    'Playlist': 'models',
+    'Track': 'models',
+    'iter_items': 'jsonstream',
+    'chunked': 'paging',
+    'prefetched': 'paging',
+    'Prefetch': 'paging',
+    'RetryPolicy': 'retry',
+    'parse_qs': 'urls',
+    'parse_qsl': 'urls',
+    'quote_plus': 'urls',
+    'unquote': 'urls',
+    'unquote_plus': 'urls',
+}
+
+# Player commands of SpotifyWebApiClient: method, url, the query parameter for the value
+# of the command and whether the command is for the device of the session
+PLAYER_COMMANDS = {
+    'play': ('PUT', PLAYER_URL + '/play', None, True),
+    'pause': ('PUT', PLAYER_URL + '/pause', None, True),
+    'next': ('POST', PLAYER_URL + '/next', None, True),
+    'previous': ('POST', PLAYER_URL + '/previous', None, True),
+    'seek': ('PUT', PLAYER_URL + '/seek', 'position_ms', True),
+    'volume': ('PUT', PLAYER_URL + '/volume', 'volume_percent', True),
+    'shuffle': ('PUT', PLAYER_URL + '/shuffle', 'state', True),
+    'repeat': ('PUT', PLAYER_URL + '/repeat', 'state', True),
+    'add_to_queue': ('POST', PLAYER_URL + '/queue', 'uri', True),
+    'transfer_playback': ('PUT', PLAYER_URL, None, False),
+}
+
+
 class SpotifyWebApiClient:
     def __init__(self, session):
         self.session = session
 
-    def play(self, context_uri=None, uris=None, offset=None, position_ms=None):
-        request_body = {}
-        if context_uri is not None:
-            request_body['context_uri'] = context_uri
-        if uris is not None:
-            request_body['uris'] = list(uris)
-        if offset is not None:
-            request_body['offset'] = offset
-        if position_ms is not None:
-            request_body['position_ms'] = position_ms
-
-        self.session.put(
-            url='https://api.spotify.com/v1/me/player/play',
-            json=request_body,
+    # body is a request body from prepare_play() to send instead of the arguments
+    def play(self, context_uri=None, uris=None, offset=None, position_ms=None, body=None):
+        self._command(
+            'play',
+            json=play_request_body(context_uri, uris, offset, position_ms) if body is None else None,
+            data=body,
         )
 
+    # Serializes the body of a play request once, for requests that are sent again and again
+    @staticmethod
+    def prepare_play(context_uri=None, uris=None, offset=None, position_ms=None):
+        return json.dumps(play_request_body(context_uri, uris, offset, position_ms)).encode()
+
     def pause(self):
-        self.session.put(
-            url='https://api.spotify.com/v1/me/player/pause',
-        )
+        self._command('pause')
 
-    def devices(self):
-        response = self.session.get(
-            url='https://api.spotify.com/v1/me/player/devices',
-        )
-        for device in response['devices']:
-            yield Device(**device)
+    def next(self):
+        self._command('next')
 
+    def previous(self):
+        self._command('previous')
 
-class Device:
-    def __init__(
-        self,
-        id,
-        is_active,
-        is_private_session,
-        is_restricted,
-        name,
-        type,
-        volume_percent,
-    ):
-        self.id = id
-        self.is_active = is_active
-        self.is_private_session = is_private_session
-        self.is_restricted = is_restricted
-        self.name = name
-        self.type = type
-        self.volume_percent = volume_percent
+    def seek(self, position_ms):
+        self._command('seek', position_ms)
 
-    def __repr__(self):
-        return 'Device(name={}, type={}, id={})'.format(self.name, self.type, self.id)
+    def volume(self, volume_percent):
+        self._command('volume', volume_percent)
 
+    def shuffle(self, state):
+        self._command('shuffle', state)
 
-class Session:
-    def __init__(self, credentials):
-        self.credentials = credentials
-        self.device_id = credentials['device_id']
+    # state is 'track', 'context' or 'off'
+    def repeat(self, state):
+        self._command('repeat', state)
 
-    def get(self, url, **kwargs):
-        def get_request():
-            return requests.get(
-                url,
-                headers=self._headers(),
-                **kwargs,
-            )
+    def add_to_queue(self, uri):
+        self._command('add_to_queue', uri)
 
-        return self._execute_request(get_request)
+    # Moves playback to device_id, which also becomes the device of the session
+    def transfer_playback(self, device_id, play=None):
+        body = {'device_ids': [device_id]}
+        if play is not None:
+            body['play'] = play
+        self._command('transfer_playback', json=body)
+        self.session.device_id = device_id
 
-    def put(self, url, json=None, **kwargs):
-        # Workaround for urequests not sending "Content-Length" on empty data
-        if json is None:
-            json = {}
+    # Returns the currently playing track and the tracks in the queue
+    def queue(self, fields=None):
+        from .models import Track
 
-        def put_request():
-            return requests.put(
-                url=self._add_device_id(url),
-                headers=self._headers(),
-                json=json,
-                **kwargs,
-            )
+        model = Track.fields(*fields) if fields else Track
+        response = self.session.get(url=PLAYER_URL + '/queue', priority=PRIORITY_BACKGROUND)
+        current = response.get('currently_playing')
+        return (
+            model(current) if current is not None else None,
+            [model(track) for track in response.get('queue') or ()],
+        )
 
-        return self._execute_request(put_request)
+    def _command(self, name, value=None, json=None, data=None):
+        method, url, query, device = player_command(name, value)
+        self.session.request(
+            method,
+            url,
+            json=json,
+            data=data,
+            priority=PRIORITY_INTERACTIVE,
+            query=query,
+            device=device,
+        )
 
-    def _headers(self):
-        return {'Authorization': 'Bearer {access_token}'.format(**self.credentials)}
+    # None when there is no active device
+    def playback_state(self, market=None):
+        from .models import PlaybackState
 
-    def _execute_request(self, request):
-        response = request()
+        state = self.session.get(
+            url=with_query(PLAYER_URL, {'market': market} if market else None),
+            priority=PRIORITY_BACKGROUND,
+        )
+        return PlaybackState(state) if state else None
 
-        if response.status_code == 401:
-            error = Session._error_from_response(response)
+    # None when nothing is playing
+    def currently_playing(self, market=None):
+        from .models import PlaybackState
 
-            if error['message'] == 'The access token expired':
-                self._refresh_access_token()
-                response = request()  # Retry
+        state = self.session.get(
+            url=with_query(PLAYER_URL + '/currently-playing', {'market': market} if market else None),
+            priority=PRIORITY_BACKGROUND,
+        )
+        return PlaybackState(state) if state else None
+
+    def devices(self, fields=None):
+        from .models import Device
+
+        model = Device.fields(*fields) if fields else Device
+        for device in self.session.get_items(
+            url=PLAYER_URL + '/devices',
+            path='devices[*]',
+        ):
+            yield model(device)
+
+    def tracks(self, ids, fields=None, market=None, prefetch=False):
+        from .models import Track
+
+        model = Track.fields(*fields) if fields else Track
+        for track in self.session.get_batched(
+            url='https://api.spotify.com/v1/tracks',
+            ids=ids,
+            key='tracks',
+            max_ids=50,
+            params={'market': market} if market else None,
+            prefetch=prefetch,
+        ):
+            yield model(track) if track is not None else None
+
+    def albums(self, ids, fields=None, market=None, prefetch=False):
+        from .models import Album
+
+        model = Album.fields(*fields) if fields else Album
+        for album in self.session.get_batched(
+            url='https://api.spotify.com/v1/albums',
+            ids=ids,
+            key='albums',
+            max_ids=20,
+            params={'market': market} if market else None,
+            prefetch=prefetch,
+        ):
+            yield model(album) if album is not None else None
+
+    def audio_features(self, ids, prefetch=False):
+        return self.session.get_batched(
+            url='https://api.spotify.com/v1/audio-features',
+            ids=ids,
+            key='audio_features',
+            max_ids=100,
+            prefetch=prefetch,
+        )
 
-        self._check_status_code(response)
+    def playlist_tracks(self, playlist_id, fields=None, limit=100, prefetch=True):
+        from .models import Track
+
+        model = Track.fields(*fields) if fields else Track
+        for item in self.session.paginate(
+            url='https://api.spotify.com/v1/playlists/{}/tracks'.format(playlist_id),
+            params={'limit': limit},
+            prefetch=prefetch,
+        ):
+            if item.get('track') is not None:
+                yield model(item['track'])
+
+
+# The method, url, encoded query string and whether it is for the device of the session
+# of a command in PLAYER_COMMANDS with `value`
+def player_command(name, value=None):
+    method, url, parameter, device = PLAYER_COMMANDS[name]
+    query = None
+    if parameter is not None:
+        if value is True or value is False:
+            value = 'true' if value else 'false'
+        query = parameter + '=' + quote(str(value))
+    return method, url, query, device
+
+
+def with_query(url, params):
+    if not params:
+        return url
+    return '{}{}{}'.format(url, '&' if '?' in url else '?', urlencode(params))
+
+
+def play_request_body(context_uri=None, uris=None, offset=None, position_ms=None):
+    request_body = {}
+    if context_uri is not None:
+        request_body['context_uri'] = context_uri
+    if uris is not None:
+        request_body['uris'] = list(uris)
+    if offset is not None:
+        request_body['offset'] = offset
+    if position_ms is not None:
+        request_body['position_ms'] = position_ms
+    return request_body
+
+
+# The state and the request building shared by Session and aio.AsyncSession, they add
+# the sending of requests on top
+class BaseSession:
+    # timeout is a number or a (connect, read) tuple of seconds for each request, deadline
+    # is the number of seconds a call may take in total including token refresh and retries.
+    def __init__(self, credentials, pool, refresh_margin=60, cache=None, timeout=(5, 10), deadline=30, store=None):
+        self.credentials = credentials
+        self.store = store
+        self.device_id = credentials['device_id']
+        self._access_token = None
+        self._auth_headers = None
+        self._json_headers = None
+        self.pool = pool
+        self.refresh_margin = refresh_margin
+        self.cache = cache
+        self.timeout = timeout
+        self.deadline = deadline
+
+    @property
+    def device_id(self):
+        return self._device_id
+
+    @device_id.setter
+    def device_id(self, device_id):
+        self._device_id = device_id
+        self._device_urls = {}
+
+    def _needs_refresh(self, margin=None):
+        expires_at = self.credentials.get('expires_at')
+        if expires_at is None:
+            return False
+        if margin is None:
+            margin = self.refresh_margin
+        return time.time() + margin >= expires_at
+
+    # The headers are only created when the access token has changed, with json=True
+    # they include the Content-Type of JSON request bodies
+    def _headers(self, json=False):
+        access_token = self.credentials['access_token']
+        if access_token is not self._access_token:
+            self._auth_headers = Headers()
+            self._auth_headers['Authorization'] = 'Bearer ' + access_token
+            self._json_headers = Headers(self._auth_headers)
+            self._json_headers['Content-Type'] = 'application/json'
+            self._access_token = access_token
+        return self._json_headers if json else self._auth_headers
+
+    def _get_headers(self, cache_entry):
+        if cache_entry is None:
+            return self._headers()
+        return self.cache.conditional_headers(cache_entry, self._headers())
+
+    def _cache_lookup(self, key, url):
+        if self.cache is None or self.cache.ttl_for(url) is None:
+            return None
+        return self.cache.lookup(key)
+
+    def _deadline(self, timeout, deadline):
+        return Deadline(
+            self.timeout if timeout is None else timeout,
+            self.deadline if deadline is None else deadline,
+        )
 
-        if response.content:
-            return response.json()
+    @staticmethod
+    def _access_token_expired(response):
+        if response.status_code != 401:
+            return False
+        return BaseSession._error_from_response(response)['message'] == 'The access token expired'
 
     @staticmethod
     def _check_status_code(response):
         if response.status_code >= 400:
-            error = Session._error_from_response(response)
+            error = BaseSession._error_from_response(response)
             raise SpotifyWebApiError(**error)
 
     @staticmethod
@@ -139,28 +339,373 @@ class Session:
         return {'message': message, 'status': response.status_code, 'reason': reason}
 
     def _add_device_id(self, url):
-        return '{path}?device_id={device_id}'.format(path=url, device_id=self.device_id) if self.device_id else url
+        if not self._device_id:
+            return url
+        device_url = self._device_urls.get(url)
+        if device_url is None:
+            if len(self._device_urls) >= 16:
+                self._device_urls = {}
+            device_url = self._device_urls[url] = '{path}?device_id={device_id}'.format(
+                path=url, device_id=self._device_id
+            )
+        return device_url
 
-    def _refresh_access_token(self):
-        token_endpoint = "https://accounts.spotify.com/api/token"
+    def _refresh_request(self):
         params = dict(
             grant_type="refresh_token",
             refresh_token=self.credentials['refresh_token'],
             client_id=self.credentials['client_id'],
             client_secret=self.credentials['client_secret'],
         )
-        response = requests.post(
-            token_endpoint,
+        return dict(
             headers={'Content-Type': 'application/x-www-form-urlencoded'},
             data=urlencode(params),
         )
-        self._check_status_code(response)
 
-        tokens = response.json()
+    def _update_tokens(self, tokens):
         self.credentials['access_token'] = tokens['access_token']
-        if 'refresh_token' in tokens:
-            self.credentials['refresh_token'] = tokens['refresh_token']
-            save_credentials(self.credentials)
+        if 'expires_in' in tokens:
+            self.credentials['expires_at'] = time.time() + tokens['expires_in']
+        refresh_token = tokens.get('refresh_token')
+        if refresh_token is not None and refresh_token != self.credentials['refresh_token']:
+            self.credentials['refresh_token'] = refresh_token
+            if self.store is None:
+                save_credentials(self.credentials)
+            else:
+                self.store.save(self.credentials)
+
+
+class Session(BaseSession):
+    # Sessions on other threads that share the credentials dict share a refresh_lock, e.g.
+    # clock.allocate_lock(), so that an expired access token is refreshed once.
+    def __init__(
+        self,
+        credentials,
+        pool=None,
+        refresh_margin=60,
+        cache=None,
+        scheduler=None,
+        retry_policy=None,
+        timeout=(5, 10),
+        deadline=30,
+        store=None,
+        refresh_lock=None,
+    ):
+        super().__init__(
+            credentials,
+            pool if pool is not None else default_pool(),
+            refresh_margin,
+            cache,
+            timeout,
+            deadline,
+            store,
+        )
+        self.refresh_lock = refresh_lock
+        self.scheduler = scheduler
+        self.retry_policy = retry_policy
+        self.hooks = {}
+
+    # Calls hook(*args) on `event`:
+    #   'request' (method, url) before each attempt to send a request,
+    #   'response' (method, url, response, seconds) when its status and headers are read,
+    #   'parsed' (method, url, size, seconds) when the body of a call has been parsed,
+    #   'refresh' (seconds) after the access token was refreshed,
+    #   'retry' (method, url, attempt, error) before a request is sent again,
+    #   'error' (method, url, error) when a call fails.
+    # error is the status code of the response or the exception. See metrics.Metrics.
+    def add_hook(self, event, hook):
+        self.hooks.setdefault(event, []).append(hook)
+
+    def get(self, url, priority=PRIORITY_DEFAULT, retry=None, timeout=None, deadline=None, **kwargs):
+        start = monotonic()
+        entry = self._cache_lookup(url, url)
+        if entry is not None and self.cache.is_fresh(entry, url):
+            return entry.value
+
+        def get_request(timeout):
+            return self.pool.request(
+                'GET',
+                url,
+                headers=self._get_headers(entry),
+                timeout=timeout,
+                **kwargs,
+            )
+
+        response = self._send(get_request, priority, 'GET', retry, timeout, deadline, url)
+        if response.status_code == 304 and entry is not None:
+            self._emit('parsed', 'GET', url, 0, elapsed(monotonic(), start))
+            return self.cache.revalidated(entry)
+        value = response.json() if response.content else None
+        self._emit('parsed', 'GET', url, len(response.content), elapsed(monotonic(), start))
+        if self.cache is not None:
+            self.cache.store(url, url, response.headers.get('etag'), value)
+        return value
+
+    def get_items(self, url, path, priority=PRIORITY_DEFAULT, retry=None, timeout=None, deadline=None, **kwargs):
+        # Yields the items of the array at path in the response body (see jsonstream.iter_items)
+        # while it is being read, to not hold large responses in memory.
+        from .jsonstream import iter_items
+
+        start = monotonic()
+        key = url + ' ' + path
+        entry = self._cache_lookup(key, url)
+        if entry is not None and self.cache.is_fresh(entry, url):
+            for item in entry.value:
+                yield item
+            return
+
+        def get_request(timeout):
+            return self.pool.request(
+                'GET',
+                url,
+                headers=self._get_headers(entry),
+                stream=True,
+                timeout=timeout,
+                **kwargs,
+            )
+
+        response = self._send(get_request, priority, 'GET', retry, timeout, deadline, url)
+        if response.status_code == 304 and entry is not None:
+            response.close()
+            self._emit('parsed', 'GET', url, 0, elapsed(monotonic(), start))
+            for item in self.cache.revalidated(entry):
+                yield item
+            return
+
+        items = [] if self.cache is not None and self.cache.ttl_for(url) is not None else None
+        size = [0]
+
+        def counted(chunks):
+            for chunk in chunks:
+                size[0] += len(chunk)
+                yield chunk
+
+        try:
+            for item in iter_items(counted(response.iter_content(256)), path):
+                if items is not None:
+                    items.append(item)
+                yield item
+        finally:
+            response.close()
+        self._emit('parsed', 'GET', url, size[0], elapsed(monotonic(), start))
+        if items is not None:
+            self.cache.store(key, url, response.headers.get('etag'), items)
+
+    def paginate(self, url, params=None, paging_key=None, prefetch=False):
+        # Yields the items of a paging object and follows its next urls, paging_key is the
+        # key of the paging object for responses where it is not at the top, e.g. search.
+        # With prefetch the next page is requested while the current one is consumed.
+        from .paging import Prefetch
+
+        page = self.get(with_query(url, params), PRIORITY_BACKGROUND)
+        while page is not None:
+            if paging_key is not None:
+                page = page[paging_key]
+            next_url = page.get('next')
+            next_page = Prefetch(self.get, next_url, PRIORITY_BACKGROUND) if prefetch and next_url else None
+            for item in page.get('items') or ():
+                yield item
+            if not next_url:
+                return
+            page = next_page.result() if next_page is not None else self.get(next_url, PRIORITY_BACKGROUND)
+
+    def get_batched(self, url, ids, key, max_ids, params=None, prefetch=False):
+        # Yields the items for any number of ids from an endpoint taking up to max_ids
+        # comma separated ids per request, e.g. /tracks?ids=
+        from .paging import chunked, prefetched
+
+        def get_chunk(chunk):
+            query = dict(params) if params else {}
+            query['ids'] = ','.join(chunk)
+            return self.get(with_query(url, query), PRIORITY_BACKGROUND)[key]
+
+        for items in prefetched(get_chunk, chunked(ids, max_ids), prefetch):
+            for item in items:
+                yield item
+
+    def put(self, url, json=None, priority=PRIORITY_DEFAULT, **kwargs):
+        return self.request('PUT', url, json, priority, **kwargs)
+
+    def post(self, url, json=None, priority=PRIORITY_DEFAULT, **kwargs):
+        return self.request('POST', url, json, priority, **kwargs)
+
+    # Sends a request with a JSON body for the device of the session, or for any device
+    # with device=False. data is an already serialized JSON body to send instead of json
+    # and query an encoded query string that is added after the device_id.
+    def request(
+        self,
+        method,
+        url,
+        json=None,
+        priority=PRIORITY_DEFAULT,
+        retry=None,
+        timeout=None,
+        deadline=None,
+        data=None,
+        query=None,
+        device=True,
+        **kwargs
+    ):
+        # Workaround for urequests not sending "Content-Length" on empty data
+        if json is None and data is None:
+            data = EMPTY_JSON_BODY
+        if device:
+            url = self._add_device_id(url)
+        if query:
+            url = url + ('&' if '?' in url else '?') + query
+
+        def body_request(timeout):
+            return self.pool.request(
+                method,
+                url=url,
+                headers=self._headers(json=True),
+                json=json,
+                data=data,
+                timeout=timeout,
+                **kwargs,
+            )
+
+        return self._execute_request(body_request, priority, method, retry, timeout, deadline, url)
+
+    def refresh_if_needed(self, margin=None, timeout=None):
+        # Call with a larger margin than refresh_margin while idle to keep the refresh
+        # off the path of user initiated requests.
+        if not self._needs_refresh(margin):
+            return False
+        self._refresh_access_token(self.timeout if timeout is None else timeout, self.credentials['access_token'])
+        return True
+
+    def _execute_request(
+        self,
+        request,
+        priority=PRIORITY_DEFAULT,
+        method='GET',
+        retry=None,
+        timeout=None,
+        deadline=None,
+        url=None,
+    ):
+        start = monotonic()
+        response = self._send(request, priority, method, retry, timeout, deadline, url)
+        value = response.json() if response.content else None
+        self._emit('parsed', method, url, len(response.content), elapsed(monotonic(), start))
+        return value
+
+    def _emit(self, event, *args):
+        for hook in self.hooks.get(event, ()):
+            hook(*args)
+
+    # retry=True/False overrides whether the retry policy applies to the method.
+    # request is called with the timeout for each attempt, what is left of the deadline
+    # is shared by the token refresh, the retries and the request after a refresh.
+    def _send(
+        self,
+        request,
+        priority=PRIORITY_DEFAULT,
+        method='GET',
+        retry=None,
+        timeout=None,
+        deadline=None,
+        url=None,
+    ):
+        deadline = self._deadline(timeout, deadline)
+
+        def timed_request():
+            self._emit('request', method, url)
+            start = monotonic()
+            response = request(deadline.timeout())
+            self._emit('response', method, url, response, elapsed(monotonic(), start))
+            return response
+
+        try:
+            if self._needs_refresh():
+                self._refresh_access_token(deadline.timeout(), self.credentials['access_token'])
+            access_token = self.credentials['access_token']
+            response = self._attempt(timed_request, priority, method, retry, deadline, url)
+
+            if self._access_token_expired(response):
+                self._refresh_access_token(deadline.timeout(), access_token)
+                response = self._attempt(timed_request, priority, method, retry, deadline, url)  # Retry
+
+            self._check_status_code(response)
+        except SpotifyWebApiError as e:
+            self._emit('error', method, url, e.status)
+            raise
+        except OSError as e:
+            self._emit('error', method, url, e)
+            raise
+        return response
+
+    # Waits for retries and the scheduler only as long as the deadline allows, a wait that
+    # would outlast it ends the call with the last error instead
+    def _attempt(self, request, priority, method, retry, deadline, url=None):
+        policy = self.retry_policy
+        if policy is None or retry is False:
+            return self._scheduled(request, priority, deadline, method, url)
+        start = policy.clock()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = self._scheduled(request, priority, deadline, method, url)
+            except DeadlineExceeded:
+                raise
+            except OSError as e:
+                if policy.retry(method, attempt, start, retry, deadline.remaining()):
+                    self._emit('retry', method, url, attempt, e)
+                    continue
+                raise
+            if response.status_code in policy.statuses and policy.retry(
+                method, attempt, start, retry, deadline.remaining()
+            ):
+                response.close()
+                self._emit('retry', method, url, attempt, response.status_code)
+                continue
+            return response
+
+    def _scheduled(self, request, priority, deadline, method='GET', url=None):
+        if self.scheduler is None:
+            return request()
+        self._acquire(priority, deadline)
+        response = request()
+        if response.status_code == 429:
+            retry_after = self._retry_after(response)
+            self.scheduler.pause(retry_after)
+            remaining = deadline.remaining()
+            if retry_after <= self.scheduler.max_retry_after and (remaining is None or retry_after < remaining):
+                response.close()
+                self._emit('retry', method, url, 1, 429)
+                self._acquire(priority, deadline)
+                response = request()
+        return response
+
+    def _acquire(self, priority, deadline):
+        if not self.scheduler.acquire(priority, deadline.remaining()):
+            raise DeadlineExceeded('Deadline exceeded')
+
+    @staticmethod
+    def _retry_after(response):
+        try:
+            return int(response.headers.get('retry-after', 1))
+        except ValueError:
+            return 1
+
+    # access_token is the token that was found expired, with a refresh_lock the refresh is
+    # skipped when another session has replaced it in the meantime
+    def _refresh_access_token(self, timeout=None, access_token=None):
+        if self.refresh_lock is None:
+            self._request_tokens(timeout)
+            return
+        with self.refresh_lock:
+            if access_token is None or access_token == self.credentials['access_token']:
+                self._request_tokens(timeout)
+
+    def _request_tokens(self, timeout):
+        start = monotonic()
+        response = self.pool.request('POST', TOKEN_ENDPOINT, timeout=timeout, **self._refresh_request())
+        self._check_status_code(response)
+        self._update_tokens(response.json())
+        self._emit('refresh', elapsed(monotonic(), start))
 
 
 class SpotifyWebApiError(Exception):
@@ -170,110 +715,49 @@ class SpotifyWebApiError(Exception):
         self.reason = reason
 
 
-def save_credentials(credentials):
-    with open('credentials.json', 'w') as credentials_file:
-        credentials_file.write(json.dumps(credentials))
+# See credentials.CredentialStore for stores with other back ends and deferred writes
+def save_credentials(credentials, path='credentials.json'):
+    from .credentials import FileStore
+
+    FileStore(path).save(credentials)
+
 
+def load_credentials(path='credentials.json'):
+    from .credentials import CredentialStore, FileStore
 
-def load_credentials():
-    try:
-        with open('credentials.json') as credentials_file:
-            credentials = json.loads(credentials_file.read())
-        assert credentials['refresh_token']
-        assert credentials['client_id']
-        assert credentials['client_secret']
-        assert 'device_id' in credentials
-    except (OSError, ValueError, FileNotFoundError, KeyError, AssertionError):
-        return None
+    return CredentialStore(FileStore(path)).load()
 
-    return credentials
 
+# backend picks the HTTP transport, see connection.default_pool, store where the
+# credentials are kept, credentials.json by default
+def spotify_client(backend=None, store=None):
+    from .credentials import CredentialStore
 
-def spotify_client():
-    credentials = load_credentials()
+    if store is None:
+        store = CredentialStore()
+    pool = default_pool(backend=backend)
+    credentials = store.load()
     if not credentials:
         from . import authorization_code_flow
 
-        return authorization_code_flow.setup_wizard()
-    session = Session(credentials)
+        credentials = authorization_code_flow.setup_wizard(pool=pool, store=store).session.credentials
+    from .retry import RetryPolicy
+
+    session = Session(credentials, pool=pool, retry_policy=RetryPolicy(), store=store)
     return SpotifyWebApiClient(session)
 
 
-# urllib replacement
-
-
-def parse_qs(qs):
-    parsed_result = {}
-    pairs = parse_qsl(qs)
-    for name, value in pairs:
-        if name in parsed_result:
-            parsed_result[name].append(value)
-        else:
-            parsed_result[name] = [value]
-    return parsed_result
-
-
-def parse_qsl(qs):
-    pairs = [s2 for s1 in qs.split('&') for s2 in s1.split(';')]
-    r = []
-    for name_value in pairs:
-        if not name_value:
-            continue
-        nv = name_value.split('=', 1)
-        if len(nv) != 2:
-            continue
-        if len(nv[1]):
-            name = nv[0].replace('+', ' ')
-            name = unquote(name)
-            value = nv[1].replace('+', ' ')
-            value = unquote(value)
-            r.append((name, value))
-    return r
-
-
-def quote(s):
-    always_safe = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ' 'abcdefghijklmnopqrstuvwxyz' '0123456789' '_.-'
-    res = []
-    for c in s:
-        if c in always_safe:
-            res.append(c)
-            continue
-        res.append('%%%x' % ord(c))
-    return ''.join(res)
-
-
-def quote_plus(s):
-    s = quote(s)
-    if ' ' in s:
-        s = s.replace(' ', '+')
-    return s
-
-
-def unquote(s):
-    res = s.split('%')
-    for i in range(1, len(res)):
-        item = res[i]
-        try:
-            res[i] = chr(int(item[:2], 16)) + item[2:]
-        except ValueError:
-            res[i] = '%' + item
-    return "".join(res)
-
-
-def unquote_plus(s):
-    s = s.replace('+', ' ')
-    return unquote(s)
-
-
-def urlencode(query):
-    if isinstance(query, dict):
-        query = query.items()
-    li = []
-    for k, v in query:
-        if not isinstance(v, list):
-            v = [v]
-        for value in v:
-            k = quote_plus(str(k))
-            v = quote_plus(str(value))
-            li.append(k + '=' + v)
-    return '&'.join(li)
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(name)
+    value = getattr(__import__('spotify_web_api.' + module, None, None, (name,)), name)
+    globals()[name] = value
+    return value
+
+
+# Module __getattr__ needs Python 3.7, older versions import the names at once
+if sys.implementation.name != 'micropython' and sys.version_info < (3, 7):
+    for _name in _LAZY:
+        __getattr__(_name)
+    del _name
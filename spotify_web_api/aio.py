@@ -0,0 +1,384 @@
+import sys
+import time
+
+from . import (
+    BaseSession,
+    load_credentials,
+    play_request_body,
+    player_command,
+    PLAYER_URL,
+    SpotifyWebApiClient,
+    TOKEN_ENDPOINT,
+)
+from .connection import (
+    encode_body,
+    RequestTimeout,
+    split_timeout,
+    has_body,
+    parse_header_line,
+    parse_status_line,
+    request_head,
+    Response,
+    split_url,
+)
+from .models import Device
+
+if sys.implementation.name == 'micropython':
+    # noinspection PyUnresolvedReferences
+    import uasyncio as asyncio
+
+    # noinspection PyUnresolvedReferences
+    import usocket as socket
+
+    # noinspection PyUnresolvedReferences
+    import ussl as ssl
+
+    async def _open_connection(host, port, secure):
+        if not secure:
+            return await asyncio.open_connection(host, port)
+        try:
+            connecting = asyncio.open_connection(host, port, ssl=True)
+        except TypeError:
+            # uasyncio before MicroPython 1.22 has no TLS streams, the socket is wrapped
+            # here and the handshake blocks the event loop
+            addr = socket.getaddrinfo(host, port)[0][-1]
+            sock = socket.socket()
+            try:
+                sock.connect(addr)
+                tls = ssl.wrap_socket(sock, server_hostname=host)
+            except OSError:
+                sock.close()
+                raise
+            sock.setblocking(False)
+            stream = asyncio.StreamReader(tls)
+            return stream, stream
+        return await connecting
+
+
+else:
+    import asyncio
+
+    async def _open_connection(host, port, secure):
+        return await asyncio.open_connection(host, port, ssl=secure or None)
+
+
+# The player commands of SpotifyWebApiClient from the same PLAYER_COMMANDS table
+class AsyncSpotifyWebApiClient:
+    def __init__(self, session):
+        self.session = session
+
+    prepare_play = staticmethod(SpotifyWebApiClient.prepare_play)
+
+    async def play(self, context_uri=None, uris=None, offset=None, position_ms=None, body=None):
+        await self._command(
+            'play',
+            json=play_request_body(context_uri, uris, offset, position_ms) if body is None else None,
+            data=body,
+        )
+
+    async def pause(self):
+        await self._command('pause')
+
+    async def next(self):
+        await self._command('next')
+
+    async def previous(self):
+        await self._command('previous')
+
+    async def seek(self, position_ms):
+        await self._command('seek', position_ms)
+
+    async def volume(self, volume_percent):
+        await self._command('volume', volume_percent)
+
+    async def shuffle(self, state):
+        await self._command('shuffle', state)
+
+    async def repeat(self, state):
+        await self._command('repeat', state)
+
+    async def add_to_queue(self, uri):
+        await self._command('add_to_queue', uri)
+
+    async def transfer_playback(self, device_id, play=None):
+        body = {'device_ids': [device_id]}
+        if play is not None:
+            body['play'] = play
+        await self._command('transfer_playback', json=body)
+        self.session.device_id = device_id
+
+    async def _command(self, name, value=None, json=None, data=None):
+        method, url, query, device = player_command(name, value)
+        await self.session.request(method, url, json=json, data=data, query=query, device=device)
+
+    async def devices(self, fields=None):
+        model = Device.fields(*fields) if fields else Device
+        response = await self.session.get(url=PLAYER_URL + '/devices')
+        return [model(device) for device in response['devices']]
+
+
+# timeout and deadline work as for Session, a connect or read that takes longer raises
+# RequestTimeout and a call that takes longer than the deadline DeadlineExceeded.
+class AsyncSession(BaseSession):
+    def __init__(self, credentials, pool=None, refresh_margin=60, cache=None, timeout=(5, 10), deadline=30):
+        super().__init__(
+            credentials,
+            pool if pool is not None else AsyncConnectionPool(),
+            refresh_margin,
+            cache,
+            timeout,
+            deadline,
+        )
+        self._refresh_lock = asyncio.Lock()
+
+    async def get(self, url, timeout=None, deadline=None, **kwargs):
+        entry = self._cache_lookup(url, url)
+        if entry is not None and self.cache.is_fresh(entry, url):
+            return entry.value
+
+        def get_request(timeout):
+            return self.pool.request('GET', url, headers=self._get_headers(entry), timeout=timeout, **kwargs)
+
+        response = await self._send(get_request, timeout, deadline)
+        if response.status_code == 304 and entry is not None:
+            return self.cache.revalidated(entry)
+        value = response.json() if response.content else None
+        if self.cache is not None:
+            self.cache.store(url, url, response.headers.get('etag'), value)
+        return value
+
+    async def put(self, url, json=None, **kwargs):
+        return await self.request('PUT', url, json, **kwargs)
+
+    async def post(self, url, json=None, **kwargs):
+        return await self.request('POST', url, json, **kwargs)
+
+    # Session.request without priority and retry, there is no scheduler or retry policy
+    async def request(
+        self, method, url, json=None, data=None, query=None, device=True, timeout=None, deadline=None, **kwargs
+    ):
+        if json is None and data is None:
+            json = {}
+        if device:
+            url = self._add_device_id(url)
+        if query:
+            url = url + ('&' if '?' in url else '?') + query
+
+        def body_request(timeout):
+            return self.pool.request(
+                method, url, headers=self._headers(), json=json, data=data, timeout=timeout, **kwargs
+            )
+
+        return await self._execute_request(body_request, timeout, deadline)
+
+    async def refresh_if_needed(self, margin=None, timeout=None):
+        if not self._needs_refresh(margin):
+            return False
+        await self._refresh_access_token(self.timeout if timeout is None else timeout)
+        return True
+
+    async def _execute_request(self, request, timeout=None, deadline=None):
+        response = await self._send(request, timeout, deadline)
+        if response.content:
+            return response.json()
+
+    async def _send(self, request, timeout=None, deadline=None):
+        deadline = self._deadline(timeout, deadline)
+        if self._needs_refresh():
+            await self._refresh_access_token(deadline.timeout())
+        access_token = self.credentials['access_token']
+        response = await request(deadline.timeout())
+
+        if self._access_token_expired(response):
+            await self._refresh_access_token(deadline.timeout(), access_token)
+            response = await request(deadline.timeout())  # Retry
+
+        self._check_status_code(response)
+        return response
+
+    # access_token is the token that was found expired, concurrent requests that find the
+    # token expired share a single refresh
+    async def _refresh_access_token(self, timeout=None, access_token=None):
+        async with self._refresh_lock:
+            if access_token is not None and access_token != self.credentials['access_token']:
+                return
+            if access_token is None and not self._needs_refresh():
+                return
+            response = await self.pool.request('POST', TOKEN_ENDPOINT, timeout=timeout, **self._refresh_request())
+            self._check_status_code(response)
+            self._update_tokens(response.json())
+
+
+async def _wait_for(awaitable, timeout):
+    if timeout is None:
+        return await awaitable
+    return await asyncio.wait_for(awaitable, timeout)
+
+
+class AsyncConnection:
+    def __init__(self, host, port=443, secure=True):
+        self.host = host
+        self.port = port
+        self.secure = secure
+        self.last_used = None
+        self._reader = None
+        self._writer = None
+        self._read_timeout = None
+
+    @property
+    def connected(self):
+        return self._writer is not None
+
+    async def connect(self):
+        self._reader, self._writer = await _open_connection(self.host, self.port, self.secure)
+
+    async def close(self):
+        if self._writer is not None:
+            writer = self._writer
+            self._reader = None
+            self._writer = None
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    # timeout is a number or a (connect, read) tuple of seconds, the read timeout applies
+    # to each read from the connection
+    async def request(self, method, path, headers=None, body=None, timeout=None):
+        connect_timeout, self._read_timeout = split_timeout(timeout)
+        try:
+            if self._writer is None:
+                await _wait_for(self.connect(), connect_timeout)
+
+            self._writer.write(request_head(method, path, self.host, headers, body))
+            if body:
+                self._writer.write(body)
+            await _wait_for(self._writer.drain(), self._read_timeout)
+
+            response = await self._read_response(method)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise RequestTimeout('Timed out waiting for {}'.format(self.host))
+        self.last_used = time.time()
+        return response
+
+    async def _read_response(self, method):
+        version, status_code = parse_status_line(await self._readline())
+        headers = {}
+        while parse_header_line(await self._readline(), headers):
+            pass
+
+        will_close = version != b'HTTP/1.1' or headers.get('connection', '').lower() == 'close'
+        if not has_body(method, status_code):
+            content = b''
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            content = await self._read_chunked()
+        elif 'content-length' in headers:
+            content = await self._read_exactly(int(headers['content-length']))
+        else:
+            content = await self._read_to_end()
+            will_close = True
+
+        if will_close:
+            await self.close()
+        return Response(status_code, headers, content, will_close)
+
+    async def _readline(self):
+        return await _wait_for(self._reader.readline(), self._read_timeout)
+
+    async def _read(self, size):
+        return await _wait_for(self._reader.read(size), self._read_timeout)
+
+    async def _read_exactly(self, size):
+        chunks = []
+        while size > 0:
+            chunk = await self._read(size)
+            if not chunk:
+                raise OSError('Connection closed by peer')
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    # read(-1) of uasyncio returns what has arrived so far instead of reading to the end
+    async def _read_to_end(self):
+        chunks = []
+        while True:
+            chunk = await self._read(1024)
+            if not chunk:
+                return b''.join(chunks)
+            chunks.append(chunk)
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self._readline()).split(b';', 1)[0], 16)
+            if size == 0:
+                break
+            chunks.append(await self._read_exactly(size))
+            await self._readline()
+        while parse_header_line(await self._readline(), {}):
+            pass
+        return b''.join(chunks)
+
+
+# asyncio version of connection.ConnectionPool, a connection is only handed to one
+# request at a time so concurrent requests open additional connections.
+class AsyncConnectionPool:
+    def __init__(self, size=2, idle_timeout=60):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._idle = {}
+
+    async def request(self, method, url, headers=None, json=None, data=None, timeout=None):
+        secure, host, port, path = split_url(url)
+        headers, data = encode_body(headers, json, data)
+
+        connection = await self._acquire(secure, host, port)
+        reused = connection.connected
+        try:
+            response = await connection.request(method, path, headers, data, timeout)
+        except RequestTimeout:
+            raise
+        except OSError:
+            await connection.close()
+            if not reused:
+                raise
+            response = await connection.request(method, path, headers, data, timeout)
+
+        if not response.will_close:
+            await self._release(connection)
+        return response
+
+    async def close(self):
+        for connections in self._idle.values():
+            for connection in connections:
+                await connection.close()
+        self._idle = {}
+
+    async def _acquire(self, secure, host, port):
+        connections = self._idle.get((secure, host, port))
+        now = time.time()
+        while connections:
+            connection = connections.pop()
+            if now - connection.last_used <= self.idle_timeout:
+                return connection
+            await connection.close()
+        return AsyncConnection(host, port, secure)
+
+    async def _release(self, connection):
+        connections = self._idle.setdefault((connection.secure, connection.host, connection.port), [])
+        if len(connections) < self.size:
+            connections.append(connection)
+        else:
+            await connection.close()
+
+
+def async_spotify_client():
+    credentials = load_credentials()
+    if not credentials:
+        from . import authorization_code_flow
+
+        credentials = authorization_code_flow.setup_wizard().session.credentials
+    return AsyncSpotifyWebApiClient(AsyncSession(credentials))
+
@@ -0,0 +1,241 @@
+import sys
+
+from . import SpotifyWebApiError
+from .clock import elapsed, later, monotonic, sleep
+from .histogram import Histogram
+
+# Gestures of a Button
+SINGLE = 'single'
+DOUBLE = 'double'
+LONG = 'long'
+
+# Upper bounds in seconds of the press to request latency
+LATENCY_BUCKETS = (0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.5, 1)
+
+_IDLE = 0
+_PRESSED = 1
+_HELD = 2  # the gesture has been handled, waits for the release
+_RELEASED = 3  # waits for a second press
+_SECOND = 4
+
+if sys.implementation.name == 'micropython':
+    # noinspection PyUnresolvedReferences
+    import machine
+
+    # Sleeps until any interrupt, or in light sleep until a wake interrupt or the timeout
+    def _idle(seconds, light_sleep):
+        if light_sleep:
+            machine.lightsleep(max(int(seconds * 1000), 1))
+        else:
+            machine.idle()
+
+
+else:
+
+    def _idle(seconds, light_sleep):
+        sleep(min(seconds, 0.01))
+
+
+# The gestures of one button, fed with the edges from its pin IRQ. An edge starts a
+# debounce timer and the pin is read when it has been quiet for `debounce` seconds. A
+# press held for long_press seconds is LONG, a press released and pressed again within
+# double_click seconds is DOUBLE, otherwise SINGLE. Gestures without an action are not
+# waited for: with only SINGLE the action runs when the press has settled, and without
+# DOUBLE a release runs SINGLE at once.
+class Button:
+    def __init__(self, pin, actions, active_low=True, debounce=0.02, double_click=0.3, long_press=0.8, name=None):
+        self.pin = pin
+        self.actions = actions
+        self.active_low = active_low
+        self.debounce = debounce
+        self.double_click = double_click
+        self.long_press = long_press
+        self.name = name
+        self.pressed = self._read()
+        self.started_at = None  # the first edge of the last gesture
+        self._state = _IDLE
+        self._since = None
+        self._edge_at = None
+        self._settle_at = None
+
+    # Called from the IRQ, as a soft IRQ, with the time of the edge
+    def edge(self, now):
+        if self._settle_at is None:
+            self._edge_at = now
+        self._settle_at = later(now, self.debounce)
+
+    # Starts the debounce timer when the pin changed without an IRQ, returns whether it did
+    def missed_edge(self, now):
+        if self._settle_at is not None or self._read() == self.pressed:
+            return False
+        self.edge(now)
+        return True
+
+    @property
+    def idle(self):
+        return self._state == _IDLE and self._settle_at is None
+
+    # The time update() has to be called at next, None when it waits for an edge
+    def deadline(self):
+        deadline = self._settle_at
+        if self._state == _PRESSED and LONG in self.actions:
+            deadline = _earliest(deadline, later(self._since, self.long_press))
+        elif self._state == _RELEASED:
+            deadline = _earliest(deadline, later(self._since, self.double_click))
+        return deadline
+
+    # Returns the gesture that is complete at `now`, or None
+    def update(self, now):
+        settle_at = self._settle_at
+        if settle_at is not None and elapsed(now, settle_at) >= 0:
+            self._settle_at = None
+            pressed = self._read()
+            if pressed != self.pressed:
+                self.pressed = pressed
+                gesture = self._press(self._edge_at) if pressed else self._release(self._edge_at)
+                if gesture is not None:
+                    return gesture
+        if self._state == _PRESSED and LONG in self.actions and elapsed(now, later(self._since, self.long_press)) >= 0:
+            self._state = _HELD
+            return LONG
+        if self._state == _RELEASED and elapsed(now, later(self._since, self.double_click)) >= 0:
+            self._state = _IDLE
+            return SINGLE
+        return None
+
+    def _press(self, at):
+        if self._state == _RELEASED:
+            self._state = _SECOND
+            return None
+        self.started_at = at
+        self._since = at
+        if LONG not in self.actions and DOUBLE not in self.actions:
+            self._state = _HELD
+            return SINGLE
+        self._state = _PRESSED
+        return None
+
+    def _release(self, at):
+        state = self._state
+        if state == _SECOND:
+            self._state = _IDLE
+            return DOUBLE
+        if state == _PRESSED:
+            if DOUBLE in self.actions:
+                self._state = _RELEASED
+                self._since = at
+                return None
+            self._state = _IDLE
+            return SINGLE
+        self._state = _IDLE
+        return None
+
+    def _read(self):
+        return bool(self.pin.value()) != self.active_low
+
+
+# Runs the actions of the gestures of buttons on machine.Pin IRQs instead of polling the
+# pins. Call wait() and process() from the main loop: wait() idles the CPU until an edge
+# or a button timer, and process() runs the actions of the completed gestures. Failed
+# actions are passed to on_error, or kept in `error` without it. With on_request added as
+# the session's 'request' hook, the time from the first edge of a gesture to the next
+# request is kept in `latency`.
+#
+# With light_sleep=True wait() uses machine.lightsleep() instead. Edge IRQs do not fire
+# during light sleep, so the wake source is configured separately, e.g. on the ESP32
+# esp32.wake_on_ext0(pin, esp32.WAKEUP_ALL_LOW), and the pins are read after waking to
+# pick up the press. This has not been verified on hardware, it is off by default.
+class Buttons:
+    def __init__(self, on_error=None, light_sleep=False, clock=monotonic, idle=_idle):
+        self.buttons = []
+        self.on_error = on_error
+        self.error = None
+        self.light_sleep = light_sleep
+        self.gestures = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.last_latency = None
+        self._edge = False
+        self._started_at = None
+        self._clock = clock
+        self._idle = idle
+
+    def add(self, pin, actions, **kwargs):
+        button = Button(pin, actions, **kwargs)
+        self.buttons.append(button)
+
+        def handler(_):
+            button.edge(self._clock())
+            self._edge = True
+
+        pin.irq(handler=handler, trigger=pin.IRQ_FALLING | pin.IRQ_RISING)
+        return button
+
+    @property
+    def idle(self):
+        return not self._edge and all(button.idle for button in self.buttons)
+
+    # Returns after an edge, when a button is due or after timeout seconds
+    def wait(self, timeout):
+        now = self._clock()
+        deadline = later(now, timeout)
+        for button in self.buttons:
+            deadline = _earliest(deadline, button.deadline())
+        while not self._edge:
+            remaining = elapsed(deadline, self._clock())
+            if remaining <= 0:
+                break
+            self._idle(remaining, self.light_sleep)
+            if self.light_sleep:
+                self._missed_edges()
+
+    # Edges during light sleep are lost
+    def _missed_edges(self):
+        now = self._clock()
+        for button in self.buttons:
+            if button.missed_edge(now):
+                self._edge = True
+
+    # Runs the actions of the completed gestures, returns the number of them
+    def process(self):
+        self._edge = False
+        now = self._clock()
+        ran = 0
+        for button in self.buttons:
+            gesture = button.update(now)
+            if gesture is not None and gesture in button.actions:
+                self._run(button, button.actions[gesture])
+                ran += 1
+        return ran
+
+    def on_request(self, *args):
+        started_at = self._started_at
+        if started_at is not None:
+            self._started_at = None
+            self.last_latency = elapsed(self._clock(), started_at)
+            self.latency.add(self.last_latency)
+
+    def stats(self):
+        return {
+            'gestures': self.gestures,
+            'latency': self.latency.as_dict(),
+        }
+
+    def _run(self, button, action):
+        self.gestures += 1
+        self.last_latency = None
+        self._started_at = button.started_at
+        try:
+            action()
+        except (SpotifyWebApiError, OSError) as e:
+            if self.on_error is None:
+                self.error = e
+            else:
+                self.on_error(e)
+
+
+def _earliest(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a if elapsed(b, a) >= 0 else b
@@ -0,0 +1,107 @@
+import sys
+import time
+
+if sys.implementation.name == 'micropython':
+    # noinspection PyUnresolvedReferences
+    import ujson as json
+
+    # noinspection PyUnresolvedReferences
+    from ucollections import OrderedDict
+else:
+    import json
+    from collections import OrderedDict
+
+
+class CacheEntry:
+    __slots__ = ('stored_at', 'etag', 'value')
+
+    def __init__(self, stored_at, etag, value):
+        self.stored_at = stored_at
+        self.etag = etag
+        self.value = value
+
+
+# Least recently used cache of parsed GET responses, used by Session.get. Responses are
+# served from the cache for `ttl` seconds, or for the ttl of the longest matching url
+# prefix in `ttls`, and after that revalidated with If-None-Match when the response had
+# an ETag. A ttl of None disables caching for the url. With a `path` the cache can be
+# saved to and loaded from a file, loaded entries are always revalidated since the clock
+# may have been reset since they were stored.
+class ResponseCache:
+    def __init__(self, max_entries=16, ttl=0, ttls=None, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self.path = path
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        if path is not None:
+            self.load()
+
+    def ttl_for(self, url):
+        ttl = self.ttl
+        matched = ''
+        for prefix, prefix_ttl in self.ttls.items():
+            if url.startswith(prefix) and len(prefix) > len(matched):
+                matched = prefix
+                ttl = prefix_ttl
+        return ttl
+
+    def lookup(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._entries[key] = entry
+        return entry
+
+    def is_fresh(self, entry, url):
+        if entry is None or entry.stored_at is None:
+            return False
+        ttl = self.ttl_for(url)
+        if ttl is None or time.time() - entry.stored_at > ttl:
+            return False
+        self.hits += 1
+        return True
+
+    def conditional_headers(self, entry, headers):
+        if entry is None or entry.etag is None:
+            return headers
+        headers = dict(headers)
+        headers['If-None-Match'] = entry.etag
+        return headers
+
+    def revalidated(self, entry):
+        self.revalidations += 1
+        entry.stored_at = time.time()
+        return entry.value
+
+    def store(self, key, url, etag, value):
+        self.misses += 1
+        ttl = self.ttl_for(url)
+        self._entries.pop(key, None)
+        if ttl is None or (not ttl and etag is None):
+            return
+        self._entries[key] = CacheEntry(time.time(), etag, value)
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def clear(self):
+        self._entries = OrderedDict()
+
+    def save(self):
+        entries = dict((key, [entry.etag, entry.value]) for key, entry in self._entries.items() if entry.etag)
+        with open(self.path, 'w') as cache_file:
+            cache_file.write(json.dumps(entries))
+
+    def load(self):
+        try:
+            with open(self.path) as cache_file:
+                entries = json.loads(cache_file.read())
+        except (OSError, ValueError):
+            return
+        for key, (etag, value) in entries.items():
+            self._entries[key] = CacheEntry(None, etag, value)
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
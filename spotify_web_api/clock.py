@@ -0,0 +1,56 @@
+import sys
+import time
+
+# Times from monotonic() are only compared with elapsed() and moved with later(), they
+# must not be subtracted, added to or compared directly. Classes that take a `clock` use
+# elapsed() and later() on its times too, a clock given to them returns the same kind of
+# times as monotonic(), e.g. seconds as numbers on CPython.
+if sys.implementation.name == 'micropython':
+
+    # Ticks in ms, they wrap around after 2**30 ms (12.4 days) on most ports so times
+    # must be less than 2**29 ms (6.2 days) apart
+    # noinspection PyUnresolvedReferences
+    monotonic = time.ticks_ms
+
+    # Seconds from `then` to `now`
+    def elapsed(now, then):
+        # noinspection PyUnresolvedReferences
+        return time.ticks_diff(now, then) / 1000
+
+    # The time `seconds` after `then`
+    def later(then, seconds):
+        # noinspection PyUnresolvedReferences
+        return time.ticks_add(then, int(seconds * 1000))
+
+
+else:
+    monotonic = time.monotonic
+
+    def elapsed(now, then):
+        return now - then
+
+    def later(then, seconds):
+        return then + seconds
+
+
+sleep = time.sleep
+
+try:
+    from _thread import allocate_lock as _allocate_lock, start_new_thread
+except ImportError:
+    _allocate_lock = None
+    start_new_thread = None
+
+
+class _NoLock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+# A lock where threads are available, one that does nothing without them. start_new_thread
+# is None without threads.
+def allocate_lock():
+    return _allocate_lock() if _allocate_lock is not None else _NoLock()
@@ -0,0 +1,119 @@
+from . import SpotifyWebApiError
+from .clock import allocate_lock, elapsed, monotonic, sleep, start_new_thread
+
+# Waiting commands with the same key replace each other, only the last one is sent
+COALESCE = {
+    'play': 'playback',
+    'pause': 'playback',
+    'volume': 'volume',
+    'seek': 'seek',
+    'shuffle': 'shuffle',
+    'repeat': 'repeat',
+    'transfer_playback': 'device',
+}
+
+
+class Command:
+    __slots__ = ('name', 'args', 'kwargs', 'key', 'submitted')
+
+    def __init__(self, name, args, kwargs, key, submitted):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.submitted = submitted
+
+
+# Queues player commands for a SpotifyWebApiClient, e.g. queue.play(...) or
+# queue.submit('pause'), and returns at once. Commands are sent when no new command has
+# come for `debounce` seconds, but at the latest `max_delay` seconds after the oldest
+# waiting command, and in the order they came. A command replaces a waiting command with
+# the same key in COALESCE, so play, pause, play sends a single play. Commands are sent
+# by run_pending(), called from the main loop, or by a thread after start(). Failed
+# commands are passed to on_error, or kept in `error` without it.
+class CommandQueue:
+    def __init__(self, client, debounce=0.1, max_delay=0.5, on_error=None, clock=monotonic, sleep=sleep):
+        self.client = client
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.on_error = on_error
+        self.error = None
+        self.sent = 0
+        self.dropped = 0
+        self._pending = []
+        self._last_submitted = None
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = allocate_lock()
+
+    def __getattr__(self, name):
+        if name.startswith('_') or not callable(getattr(self.client, name, None)):
+            raise AttributeError(name)
+
+        def submit(*args, **kwargs):
+            self.submit(name, *args, **kwargs)
+
+        return submit
+
+    def submit(self, name, *args, **kwargs):
+        now = self._clock()
+        key = COALESCE.get(name)
+        submitted = now
+        with self._lock:
+            if key is not None:
+                for i, pending in enumerate(self._pending):
+                    if pending.key == key:
+                        # The replacement waits no longer than the command it replaces
+                        submitted = pending.submitted
+                        del self._pending[i]
+                        self.dropped += 1
+                        break
+            self._pending.append(Command(name, args, kwargs, key, submitted))
+            self._last_submitted = now
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def due(self):
+        if not self._pending:
+            return False
+        now = self._clock()
+        waited = max(elapsed(now, command.submitted) for command in self._pending)
+        return elapsed(now, self._last_submitted) >= self.debounce or waited >= self.max_delay
+
+    # Sends the waiting commands if they are due, returns the number of commands sent
+    def run_pending(self):
+        with self._lock:
+            if not self.due():
+                return 0
+            commands = self._pending
+            self._pending = []
+        for command in commands:
+            try:
+                getattr(self.client, command.name)(*command.args, **command.kwargs)
+                self.sent += 1
+            except (SpotifyWebApiError, OSError) as e:
+                if self.on_error is None:
+                    self.error = e
+                else:
+                    self.on_error(e)
+        return len(commands)
+
+    # Sends commands from a thread where threads are available
+    def start(self, interval=None):
+        if start_new_thread is None:
+            raise OSError('Threads are not available, call run_pending() instead')
+        start_new_thread(self._run, (self.debounce / 4 if interval is None else interval,))
+
+    def _run(self, interval):
+        while True:
+            self.run_pending()
+            self._sleep(interval)
+
+    def stats(self):
+        return {
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'pending': self.pending,
+        }
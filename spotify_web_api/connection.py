@@ -0,0 +1,510 @@
+import sys
+import time
+
+from .clock import elapsed, later, monotonic
+
+if sys.implementation.name == 'micropython':
+    # noinspection PyUnresolvedReferences
+    import usocket as socket
+
+    # noinspection PyUnresolvedReferences
+    import ussl as ssl
+
+    # noinspection PyUnresolvedReferences
+    from ujson import dumps, loads
+
+    # noinspection PyUnresolvedReferences
+    import uerrno as errno
+
+    def _open_stream(host, port, secure, timeout):
+        addr = socket.getaddrinfo(host, port)[0][-1]
+        sock = socket.socket()
+        sock.settimeout(timeout)
+        try:
+            sock.connect(addr)
+            stream = ssl.wrap_socket(sock, server_hostname=host) if secure else sock
+        except OSError:
+            sock.close()
+            raise
+        return sock, stream
+
+    def _is_timeout(error):
+        return bool(error.args) and error.args[0] in (errno.ETIMEDOUT, errno.EAGAIN)
+
+
+else:
+    import socket
+    from json import dumps, loads
+
+    # ssl is imported with the first secure connection, it takes longer to import than the rest
+    _ssl_context = None
+
+    def _open_stream(host, port, secure, timeout):
+        global _ssl_context
+        sock = socket.create_connection((host, port), timeout)
+        try:
+            if secure:
+                if _ssl_context is None:
+                    import ssl
+
+                    _ssl_context = ssl.create_default_context()
+                sock = _ssl_context.wrap_socket(sock, server_hostname=host)
+        except OSError:
+            sock.close()
+            raise
+        return sock, sock.makefile('rwb')
+
+    def _is_timeout(error):
+        return isinstance(error, socket.timeout)
+
+
+class RequestTimeout(OSError):
+    pass
+
+
+class DeadlineExceeded(RequestTimeout):
+    pass
+
+
+def split_timeout(timeout):
+    if isinstance(timeout, tuple):
+        return timeout
+    return timeout, timeout
+
+
+# Hands out the (connect, read) timeout for each request made as part of one call,
+# shortened so that the call as a whole does not take longer than `seconds`.
+class Deadline:
+    def __init__(self, timeout, seconds=None, clock=monotonic):
+        self._timeout = timeout
+        self._clock = clock
+        self.expires = later(clock(), seconds) if seconds is not None else None
+
+    def remaining(self):
+        if self.expires is None:
+            return None
+        return elapsed(self.expires, self._clock())
+
+    def timeout(self):
+        remaining = self.remaining()
+        if remaining is None:
+            return self._timeout
+        if remaining <= 0:
+            raise DeadlineExceeded('Deadline exceeded')
+        connect_timeout, read_timeout = split_timeout(self._timeout)
+        return _shortest(connect_timeout, remaining), _shortest(read_timeout, remaining)
+
+
+def _shortest(timeout, remaining):
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+# Headers that are sent with many requests, e.g. the Authorization header of a Session,
+# are only encoded once for the request head. Must not be modified after it is encoded.
+class Headers(dict):
+    _encoded = None
+
+    def encoded(self):
+        if self._encoded is None:
+            self._encoded = ''.join(['{}: {}\r\n'.format(name, value) for name, value in self.items()]).encode()
+        return self._encoded
+
+
+class Response:
+    def __init__(self, status_code, headers, content=None, will_close=False, body=None, abort=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.will_close = will_close
+        self._content = content
+        self._body = body
+        self._abort = abort
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = b''.join(self._body) if self._body is not None else b''
+            self._body = None
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return loads(self.text)
+
+    def iter_content(self, chunk_size=None):
+        if self._body is None:
+            if self.content:
+                yield self.content
+            return
+        for chunk in self._body:
+            yield chunk
+        self._body = None
+        self._content = b''
+
+    # Closes the connection if the body has not been read to the end
+    def close(self):
+        if self._body is not None:
+            self._body = None
+            if self._abort is not None:
+                self._abort()
+
+
+# Response headers kept by HTTPConnection, the others are skipped without decoding them
+RESPONSE_HEADERS = (
+    b'connection',
+    b'content-length',
+    b'content-type',
+    b'etag',
+    b'location',
+    b'retry-after',
+    b'transfer-encoding',
+)
+
+
+# HTTP/1.1 client connection on a plain or ssl wrapped socket. Requests that fit in
+# buffer_size bytes are copied to a buffer allocated once per connection and written
+# at once. header_names are the response headers to keep, None keeps all of them.
+class HTTPConnection:
+    def __init__(self, host, port=443, secure=True, chunk_size=256, buffer_size=1024, header_names=RESPONSE_HEADERS):
+        self.host = host
+        self.port = port
+        self.secure = secure
+        self.chunk_size = chunk_size
+        self.header_names = header_names
+        self.last_used = None
+        self._buffer = bytearray(buffer_size)
+        self._sock = None
+        self._stream = None
+
+    @property
+    def connected(self):
+        return self._stream is not None
+
+    def connect(self, timeout=None):
+        self._sock, self._stream = _open_stream(self.host, self.port, self.secure, timeout)
+
+    def close(self):
+        if self._stream is not None and self._stream is not self._sock:
+            self._stream.close()
+        if self._sock is not None:
+            self._sock.close()
+        self._sock = None
+        self._stream = None
+
+    # With stream=True the body is read from the socket while iterating over
+    # Response.iter_content() and the connection can not be used until it is consumed.
+    # timeout is a number or a (connect, read) tuple of seconds.
+    def request(self, method, path, headers=None, body=None, stream=False, timeout=None):
+        connect_timeout, read_timeout = split_timeout(timeout)
+        try:
+            if self._stream is None:
+                self.connect(connect_timeout)
+            self._sock.settimeout(read_timeout)
+            return self._request(method, path, headers, body, stream)
+        except OSError as e:
+            if _is_timeout(e):
+                self.close()
+                raise RequestTimeout('Timed out waiting for {}'.format(self.host))
+            raise
+
+    def _request(self, method, path, headers, body, stream):
+        self._write_request(method, path, headers, body)
+
+        version, status_code = parse_status_line(self._stream.readline())
+        headers = {}
+        while parse_header_line(self._stream.readline(), headers, self.header_names):
+            pass
+        self.last_used = time.time()
+
+        will_close = version != b'HTTP/1.1' or headers.get('connection', '').lower() == 'close'
+        if not has_body(method, status_code):
+            if will_close:
+                self.close()
+            return Response(status_code, headers, b'', will_close)
+
+        if 'content-length' not in headers and headers.get('transfer-encoding', '').lower() != 'chunked':
+            will_close = True
+        body = self._iter_body(headers, will_close)
+        if stream:
+            return Response(status_code, headers, None, will_close, body, self.close)
+        return Response(status_code, headers, b''.join(body), will_close)
+
+    # A body written separately from the head would wait for the ACK of the head
+    def _write_request(self, method, path, headers, body):
+        head = request_head(method, path, self.host, headers, body)
+        size = len(head) + (len(body) if body else 0)
+        if size <= len(self._buffer):
+            buffer = memoryview(self._buffer)
+            buffer[: len(head)] = head
+            if body:
+                buffer[len(head) : size] = body
+            self._stream.write(buffer[:size])
+        else:
+            self._stream.write(head)
+            if body:
+                self._stream.write(body)
+        if hasattr(self._stream, 'flush'):
+            self._stream.flush()
+
+    def _iter_body(self, headers, will_close):
+        complete = False
+        try:
+            if headers.get('transfer-encoding', '').lower() == 'chunked':
+                while True:
+                    size = int(self._stream.readline().split(b';', 1)[0], 16)
+                    if size == 0:
+                        break
+                    for chunk in self._iter_exactly(size):
+                        yield chunk
+                    self._stream.readline()
+                # Skip trailers
+                while parse_header_line(self._stream.readline(), {}, ()):
+                    pass
+            elif 'content-length' in headers:
+                for chunk in self._iter_exactly(int(headers['content-length'])):
+                    yield chunk
+            else:
+                while True:
+                    chunk = self._stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+            complete = True
+        except OSError as e:
+            if _is_timeout(e):
+                raise RequestTimeout('Timed out reading from {}'.format(self.host))
+            raise
+        finally:
+            if will_close or not complete:
+                self.close()
+
+    def _iter_exactly(self, size):
+        while size > 0:
+            chunk = self._stream.read(min(size, self.chunk_size))
+            if not chunk:
+                raise OSError('Connection closed by peer')
+            size -= len(chunk)
+            yield chunk
+
+
+# Keeps at most `size` idle connections per host, connections idle for longer than
+# `idle_timeout` seconds are closed instead of reused. A request on a reused connection
+# that the server has dropped is sent again on a fresh connection.
+class ConnectionPool:
+    def __init__(self, size=2, idle_timeout=60):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._idle = {}
+
+    def request(self, method, url, headers=None, json=None, data=None, stream=False, timeout=None):
+        secure, host, port, path = split_url(url)
+        headers, data = encode_body(headers, json, data)
+
+        connection = self._acquire(secure, host, port)
+        reused = connection.connected
+        try:
+            response = connection.request(method, path, headers, data, stream, timeout)
+        except RequestTimeout:
+            raise
+        except OSError:
+            connection.close()
+            if not reused:
+                raise
+            response = connection.request(method, path, headers, data, stream, timeout)
+
+        if response._body is not None:
+            response._body = self._release_after(connection, response._body)
+        elif connection.connected:
+            self._release(connection)
+        return response
+
+    def close(self):
+        for connections in self._idle.values():
+            for connection in connections:
+                connection.close()
+        self._idle = {}
+
+    def _acquire(self, secure, host, port):
+        connections = self._idle.get((secure, host, port))
+        now = time.time()
+        while connections:
+            connection = connections.pop()
+            if now - connection.last_used <= self.idle_timeout:
+                return connection
+            connection.close()
+        return HTTPConnection(host, port, secure)
+
+    def _release_after(self, connection, body):
+        for chunk in body:
+            yield chunk
+        if connection.connected:
+            self._release(connection)
+
+    def _release(self, connection):
+        connections = self._idle.setdefault((connection.secure, connection.host, connection.port), [])
+        if len(connections) < self.size:
+            connections.append(connection)
+        else:
+            connection.close()
+
+
+# CPython version of ConnectionPool, urllib3 already reconnects dropped connections.
+class RequestsPool:
+    def __init__(self, size=2, idle_timeout=60):
+        import requests
+
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.last_used = None
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+    def request(self, method, url, headers=None, json=None, data=None, stream=False, timeout=None):
+        import requests
+
+        now = time.time()
+        if self.last_used is not None and now - self.last_used > self.idle_timeout:
+            self._session.close()
+        self.last_used = now
+        try:
+            return self._session.request(
+                method,
+                url,
+                headers=headers,
+                json=json,
+                data=data,
+                stream=stream,
+                timeout=timeout,
+            )
+        except requests.exceptions.Timeout as e:
+            raise RequestTimeout(str(e))
+
+    def close(self):
+        self._session.close()
+
+
+# urequests version of ConnectionPool for MicroPython builds without it, urequests
+# opens a new connection for each request. size and idle_timeout are not used.
+class UrequestsPool:
+    def __init__(self, size=2, idle_timeout=60):
+        self.size = size
+        self.idle_timeout = idle_timeout
+
+    def request(self, method, url, headers=None, json=None, data=None, stream=False, timeout=None):
+        # noinspection PyUnresolvedReferences
+        import urequests
+
+        headers, data = encode_body(headers, json, data)
+        kwargs = {}
+        if timeout is not None:
+            # urequests has a single timeout for connecting and reading
+            kwargs['timeout'] = max(t for t in split_timeout(timeout) if t is not None)
+        try:
+            response = urequests.request(method, url, data=data, headers=headers or {}, **kwargs)
+        except OSError as e:
+            if _is_timeout(e):
+                raise RequestTimeout('Timed out waiting for {}'.format(url))
+            raise
+        # Older urequests versions do not parse the response headers
+        raw_headers = getattr(response, 'headers', None) or {}
+        response_headers = dict((name.lower(), value) for name, value in raw_headers.items())
+        if stream:
+            body = self._iter_raw(response)
+            return Response(response.status_code, response_headers, None, True, body, response.close)
+        try:
+            content = response.content
+        finally:
+            response.close()
+        return Response(response.status_code, response_headers, content, True)
+
+    @staticmethod
+    def _iter_raw(response):
+        try:
+            while True:
+                chunk = response.raw.read(256)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            response.close()
+
+    def close(self):
+        pass
+
+
+# Every back end implements request(method, url, headers=None, json=None, data=None,
+# stream=False, timeout=None) returning a Response like object and close(). backend is
+# 'socket' for ConnectionPool, 'requests' for RequestsPool or 'urequests' for
+# UrequestsPool, by default the socket transport is used on MicroPython and requests on
+# CPython. See also replay.RecordingPool and replay.ReplayPool.
+def default_pool(size=2, idle_timeout=60, backend=None):
+    if backend is None:
+        backend = 'socket' if sys.implementation.name == 'micropython' else 'requests'
+    if backend == 'socket':
+        return ConnectionPool(size, idle_timeout)
+    if backend == 'requests':
+        return RequestsPool(size, idle_timeout)
+    if backend == 'urequests':
+        return UrequestsPool(size, idle_timeout)
+    raise ValueError('Unknown backend {}'.format(backend))
+
+
+def request_head(method, path, host, headers, body):
+    head = ['{} {} HTTP/1.1\r\nHost: {}\r\n'.format(method, path, host)]
+    if body is not None or method in ('POST', 'PUT'):
+        head.append('Content-Length: {}\r\n'.format(len(body) if body else 0))
+    if isinstance(headers, Headers):
+        return b''.join((''.join(head).encode(), headers.encoded(), b'\r\n'))
+    if headers:
+        for name, value in headers.items():
+            head.append('{}: {}\r\n'.format(name, value))
+    head.append('\r\n')
+    return ''.join(head).encode()
+
+
+def encode_body(headers, json, data):
+    if json is not None:
+        data = dumps(json)
+        if not headers or 'Content-Type' not in headers:
+            headers = dict(headers) if headers else {}
+            headers['Content-Type'] = 'application/json'
+    if isinstance(data, str):
+        data = data.encode()
+    return headers, data
+
+
+def parse_status_line(line):
+    if not line:
+        raise OSError('Connection closed by peer')
+    version, status_code = line.split(None, 2)[:2]
+    return version, int(status_code)
+
+
+# Adds the header to headers if its lower case name is in names or names is None
+def parse_header_line(line, headers, names=None):
+    if not line or line == b'\r\n':
+        return False
+    colon = line.find(b':')
+    name = line[:colon].strip().lower()
+    if names is None or name in names:
+        headers[name.decode()] = line[colon + 1 :].strip().decode()
+    return True
+
+
+def has_body(method, status_code):
+    return not (method == 'HEAD' or status_code in (204, 304) or 100 <= status_code < 200)
+
+
+def split_url(url):
+    scheme, _, rest = url.partition('://')
+    host, slash, path = rest.partition('/')
+    secure = scheme == 'https'
+    port = 443 if secure else 80
+    if ':' in host:
+        host, port = host.split(':', 1)
+        port = int(port)
+    return secure, host, port, slash + path if slash else '/'
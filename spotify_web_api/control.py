@@ -0,0 +1,190 @@
+import sys
+
+from . import PLAYER_COMMANDS, SpotifyWebApiError
+from .clock import elapsed, monotonic
+from .connection import RequestTimeout
+from .server import HTTPServer
+
+if sys.implementation.name == 'micropython':
+    # noinspection PyUnresolvedReferences
+    import ujson as json
+else:
+    import json
+
+
+def _boolean(value):
+    return value in ('true', '1', 'on')
+
+
+# Converts the value of a command from the query string or form
+VALUE_TYPES = {
+    'seek': int,
+    'volume': int,
+    'shuffle': _boolean,
+}
+
+# Keyword arguments of SpotifyWebApiClient.play that can be given in a JSON body
+PLAY_ARGUMENTS = ('context_uri', 'uris', 'offset', 'position_ms')
+
+
+# Controls the player from the LAN over HTTP, e.g.
+#
+#   curl -X POST http://device:8082/pause
+#   curl -X POST http://device:8082/volume?volume_percent=40
+#   curl -X POST http://device:8082/play -d '{"context_uri": "spotify:album:..."}'
+#   curl http://device:8082/status
+#
+# Commands are POST or PUT /<command> for the commands in PLAYER_COMMANDS and /toggle,
+# the value is the query or form parameter of the command or `value`. With a CommandQueue
+# they are queued and answered with 202 at once, otherwise they are sent with the client
+# and answered when Spotify has. GET /status answers from the state of the
+# PlaybackWatcher, without a request to Spotify, and /stats with the counters of the
+# server, queue and watcher. With a token, requests need an "Authorization: Bearer
+# <token>" header. poll() serves requests and also runs the queue and the watcher, call
+# it from the main loop or use run().
+class ControlServer:
+    def __init__(self, client, commands=None, watcher=None, port=8082, token=None, clock=monotonic, **server_kwargs):
+        self.client = client
+        self.commands = commands
+        self.watcher = watcher
+        self.token = token
+        self.errors = 0
+        self.error = None
+        self._clock = clock
+        self.server = HTTPServer(self.handle, port=port, clock=clock, **server_kwargs)
+
+    def start(self):
+        self.server.start()
+        return self
+
+    def close(self):
+        self.server.close()
+
+    # Returns the number of requests served
+    def poll(self, timeout=1):
+        handled = self.server.poll(self._wait(timeout))
+        if self.commands is not None:
+            self.commands.run_pending()
+        if self.watcher is not None:
+            try:
+                self.watcher.poll_if_due()
+            except (SpotifyWebApiError, OSError) as e:
+                self.errors += 1
+                self.error = e
+        return handled
+
+    def run(self, until=None, timeout=1):
+        while until is None or not until():
+            self.poll(timeout)
+
+    # Shortens the timeout of the server poll to when the queue or the watcher is due
+    def _wait(self, timeout):
+        if self.commands is not None and self.commands.pending:
+            timeout = min(timeout, self.commands.debounce / 4)
+        if self.watcher is not None:
+            timeout = min(timeout, max(self.watcher.due_in(), 0))
+        return timeout
+
+    def handle(self, request, response):
+        if self.token is not None and request.headers.get('authorization') != 'Bearer ' + self.token:
+            response.send_json({'error': 'Unauthorized'}, 401)
+            return
+        name = request.path.strip('/')
+        if name == 'status':
+            response.send_json(self.status())
+        elif name == 'stats':
+            response.send_json(self.stats())
+        elif name in PLAYER_COMMANDS or name == 'toggle':
+            if request.method not in ('POST', 'PUT'):
+                response.send_json({'error': 'Use POST'}, 405)
+                return
+            try:
+                args, kwargs = self._arguments(name, request)
+            except (ValueError, KeyError, TypeError) as e:
+                response.send_json({'error': 'Invalid value: {}'.format(e)}, 400)
+                return
+            self._command(name, args, kwargs, response)
+        else:
+            response.send_json({'error': 'Not found'}, 404)
+
+    def status(self):
+        watcher = self.watcher
+        if watcher is None or watcher.polled_at is None:
+            return {'polled': False}
+        state = watcher.state
+        status = {'polled': True, 'age': elapsed(self._clock(), watcher.polled_at), 'active': state is not None}
+        if state is None:
+            return status
+        item = state.item
+        device = state.device
+        status.update(
+            is_playing=state.is_playing,
+            progress_ms=watcher.progress_ms(),
+            shuffle_state=state.shuffle_state,
+            repeat_state=state.repeat_state,
+            context_uri=state.context.get('uri') if state.context else None,
+            track=None
+            if item is None
+            else {
+                'id': item.id,
+                'name': item.name,
+                'uri': item.uri,
+                'duration_ms': item.duration_ms,
+                'artists': [artist.get('name') for artist in item.artists or ()],
+            },
+            device=None if device is None else device.as_dict(),
+        )
+        return status
+
+    def stats(self):
+        stats = {'server': self.server.stats(), 'errors': self.errors}
+        if self.commands is not None:
+            stats['commands'] = self.commands.stats()
+        if self.watcher is not None:
+            stats['watcher'] = {'polls': self.watcher.polls}
+        return stats
+
+    def _arguments(self, name, request):
+        if name == 'play':
+            if not request.body:
+                return (), {}
+            body = json.loads(request.body.decode())
+            return (), dict((key, body[key]) for key in PLAY_ARGUMENTS if key in body)
+        if name == 'transfer_playback':
+            values = self._values(request)
+            play = values.get('play')
+            return (values['device_id'][0],), {} if play is None else {'play': _boolean(play[0])}
+        if name == 'toggle' or PLAYER_COMMANDS[name][2] is None:
+            return (), {}
+        values = self._values(request)
+        value = values.get(PLAYER_COMMANDS[name][2]) or values['value']
+        return (VALUE_TYPES.get(name, str)(value[0]),), {}
+
+    @staticmethod
+    def _values(request):
+        values = request.params()
+        if request.body and request.headers.get('content-type', '').startswith('application/x-www-form-urlencoded'):
+            values.update(request.form())
+        return values
+
+    def _command(self, name, args, kwargs, response):
+        if name == 'toggle':
+            state = self.watcher.state if self.watcher is not None else None
+            name = 'pause' if state is not None and state.is_playing else 'play'
+        if self.commands is not None:
+            self.commands.submit(name, *args, **kwargs)
+            response.send_json({'command': name, 'queued': True}, 202)
+        else:
+            try:
+                getattr(self.client, name)(*args, **kwargs)
+            except (SpotifyWebApiError, OSError) as e:
+                self.errors += 1
+                self.error = e
+                response.send_json(
+                    {'error': str(e), 'status': getattr(e, 'status', None)},
+                    504 if isinstance(e, RequestTimeout) else 502,
+                )
+                return
+            response.send(204)
+        if self.watcher is not None:
+            self.watcher.poll_soon()
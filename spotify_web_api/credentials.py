@@ -0,0 +1,201 @@
+import os
+import sys
+
+from .clock import elapsed, monotonic
+
+if sys.implementation.name == 'micropython':
+    # noinspection PyUnresolvedReferences
+    import ujson as json
+else:
+    import json
+
+# The values that have to survive a restart, the access token is refreshed when missing
+FIELDS = ('refresh_token', 'client_id', 'client_secret', 'device_id')
+
+
+def valid(credentials):
+    return (
+        bool(credentials)
+        and all(credentials.get(name) for name in ('refresh_token', 'client_id', 'client_secret'))
+        and 'device_id' in credentials
+    )
+
+
+# Keeps the credentials as JSON in a file. A save writes a new file next to it and renames
+# it over the old one, so a power cut leaves either the old or the new credentials. Where
+# the old file was removed before the rename, load picks up the new file.
+class FileStore:
+    def __init__(self, path='credentials.json'):
+        self.path = path
+
+    def load(self):
+        for path in (self.path, self.path + '.tmp'):
+            try:
+                with open(path) as credentials_file:
+                    return json.loads(credentials_file.read())
+            except (OSError, ValueError):
+                pass
+        return None
+
+    def save(self, credentials):
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as credentials_file:
+            credentials_file.write(json.dumps(credentials))
+            credentials_file.flush()
+            if hasattr(os, 'fsync'):
+                os.fsync(credentials_file.fileno())
+        os.rename(temporary, self.path)
+
+
+# Keeps each value of FIELDS under its own key in an NVS-style key/value store, by default
+# esp32.NVS(namespace). Only the values that changed are written, None values are erased.
+class KeyValueStore:
+    def __init__(self, nvs=None, namespace='spotify', buffer_size=512):
+        if nvs is None:
+            # noinspection PyUnresolvedReferences
+            import esp32
+
+            nvs = esp32.NVS(namespace)
+        self.nvs = nvs
+        self._buffer = bytearray(buffer_size)
+        self._stored = {}
+
+    def load(self):
+        credentials = {}
+        for name in FIELDS:
+            try:
+                length = self.nvs.get_blob(name, self._buffer)
+                credentials[name] = str(self._buffer[:length], 'utf-8')
+            except OSError:
+                credentials[name] = None
+        self._stored = dict(credentials)
+        return credentials
+
+    def save(self, credentials):
+        changed = False
+        for name in FIELDS:
+            value = credentials.get(name)
+            if name in self._stored and self._stored[name] == value:
+                continue
+            if value is None:
+                try:
+                    self.nvs.erase_key(name)
+                except OSError:
+                    pass
+            else:
+                self.nvs.set_blob(name, value.encode())
+            self._stored[name] = value
+            changed = True
+        if changed:
+            self.nvs.commit()
+
+
+# Reads the values of FIELDS from environment variables, e.g. SPOTIFY_REFRESH_TOKEN, with
+# a prefix per account. Saved values only last as long as the process.
+class EnvironStore:
+    def __init__(self, prefix='SPOTIFY_', environ=None):
+        self.prefix = prefix
+        self.environ = os.environ if environ is None else environ
+
+    def load(self):
+        credentials = dict((name, self.environ.get(self.prefix + name.upper())) for name in FIELDS)
+        if credentials['device_id'] == '':
+            credentials['device_id'] = None
+        return credentials
+
+    def save(self, credentials):
+        for name in FIELDS:
+            key = self.prefix + name.upper()
+            value = credentials.get(name)
+            if value is None:
+                self.environ.pop(key, None)
+            else:
+                self.environ[key] = value
+
+
+# Keeps the saved credentials in memory, for accounts whose refreshed tokens need not
+# survive a restart.
+class MemoryStore:
+    def __init__(self, credentials=None):
+        self.credentials = dict(credentials) if credentials is not None else None
+
+    def load(self):
+        return dict(self.credentials) if self.credentials is not None else None
+
+    def save(self, credentials):
+        self.credentials = dict(credentials)
+
+
+# Loads and saves credentials with one of the stores above. A save is skipped when none of
+# FIELDS changed since the last load or save, which is the case for most token refreshes.
+# With flush_delay the write is deferred until flush_if_due() is called flush_delay seconds
+# later, so that a burst of changes is written once and the write stays off the path of a
+# request; a power cut before it loses the change. The loaded credentials are kept and
+# returned by later loads.
+class CredentialStore:
+    def __init__(self, backend=None, flush_delay=0, clock=monotonic):
+        self.backend = backend if backend is not None else FileStore()
+        self.flush_delay = flush_delay
+        self.writes = 0
+        self.skipped = 0
+        self._credentials = None
+        self._saved = {}
+        self._pending = None
+        self._dirty_since = None
+        self._clock = clock
+
+    # Returns None when the backend has no complete credentials
+    def load(self):
+        if self._credentials is None:
+            credentials = self.backend.load()
+            if not valid(credentials):
+                return None
+            if not credentials.get('access_token'):
+                credentials['access_token'] = ''
+                credentials['expires_at'] = 0
+            self._credentials = credentials
+            self._saved = self._snapshot(credentials)
+        return self._credentials
+
+    # Returns True when the credentials changed and were written or are waiting to be
+    def save(self, credentials):
+        self._credentials = credentials
+        if self._snapshot(credentials) == self._saved:
+            self.skipped += 1
+            return False
+        if self._pending is None:
+            self._dirty_since = self._clock()
+        self._pending = credentials
+        if not self.flush_delay:
+            self.flush()
+        return True
+
+    @property
+    def dirty(self):
+        return self._pending is not None
+
+    def flush(self):
+        if self._pending is None:
+            return False
+        credentials = self._pending
+        self.backend.save(credentials)
+        self._saved = self._snapshot(credentials)
+        self._pending = None
+        self.writes += 1
+        return True
+
+    def flush_if_due(self):
+        if self._pending is None or elapsed(self._clock(), self._dirty_since) < self.flush_delay:
+            return False
+        return self.flush()
+
+    def stats(self):
+        return {
+            'writes': self.writes,
+            'skipped': self.skipped,
+            'dirty': self.dirty,
+        }
+
+    @staticmethod
+    def _snapshot(credentials):
+        return dict((name, credentials.get(name)) for name in FIELDS)
@@ -0,0 +1,149 @@
+from . import Session, SpotifyWebApiClient, SpotifyWebApiError
+from .clock import allocate_lock, elapsed, monotonic
+from .connection import default_pool
+from .credentials import CredentialStore, FileStore, MemoryStore
+from .paging import Prefetch
+from .ratelimit import RequestScheduler
+from .retry import RetryPolicy
+
+
+class TargetResult:
+    __slots__ = ('name', 'value', 'error', 'seconds')
+
+    def __init__(self, name, value, error, seconds):
+        self.name = name
+        self.value = value
+        self.error = error
+        self.seconds = seconds
+
+    def __repr__(self):
+        return 'TargetResult({}, {})'.format(self.name, 'error={}'.format(self.error) if self.error else 'ok')
+
+
+# Results of a broadcast per target name, `seconds` is the time the whole broadcast took
+class FleetResult:
+    def __init__(self, results, seconds):
+        self.results = results
+        self.seconds = seconds
+
+    def __getitem__(self, name):
+        return self.results[name]
+
+    @property
+    def ok(self):
+        return all(result.error is None for result in self.results.values())
+
+    @property
+    def failed(self):
+        return dict((name, result.error) for name, result in self.results.items() if result.error is not None)
+
+    def latency(self):
+        seconds = [result.seconds for result in self.results.values()]
+        return {
+            'targets': len(seconds),
+            'failed': len(self.failed),
+            'seconds': self.seconds,
+            'mean': sum(seconds) / len(seconds) if seconds else 0,
+            'max': max(seconds) if seconds else 0,
+        }
+
+
+# Controls players on many accounts and devices from one process. Every target is a
+# SpotifyWebApiClient with its own Session, the sessions share one connection pool, one
+# RequestScheduler (Spotify rate limits per app) and one RetryPolicy. Targets on the same
+# account share the credentials dict and a refresh lock, so the access token is refreshed
+# once and used by all of them.
+# Broadcasts call the same client method for every target, at most max_threads at a time
+# on threads where they are available, one after the other otherwise.
+class FleetClient:
+    def __init__(self, pool=None, scheduler=None, retry_policy=None, max_threads=4, clock=monotonic):
+        self.pool = pool if pool is not None else default_pool(size=max_threads)
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.max_threads = max_threads
+        self.clients = {}
+        self._clock = clock
+        self._accounts = {}
+
+    # device_id overrides the device in the credentials. Refreshed tokens are saved to
+    # store, without one they are kept in memory only, see load().
+    def add(self, name, credentials, device_id=None, store=None, **session_kwargs):
+        memory_store, refresh_lock = self._account(credentials)
+        session = Session(
+            credentials,
+            pool=self.pool,
+            scheduler=self.scheduler,
+            retry_policy=self.retry_policy,
+            store=store if store is not None else memory_store,
+            refresh_lock=refresh_lock,
+            **session_kwargs
+        )
+        if device_id is not None:
+            session.device_id = device_id
+        client = self.clients[name] = SpotifyWebApiClient(session)
+        return client
+
+    # Adds the account in store, a credentials.CredentialStore or the path of a credentials
+    # file. Refreshed tokens are saved back to the same store.
+    def load(self, name, store, device_id=None, **session_kwargs):
+        if isinstance(store, str):
+            store = CredentialStore(FileStore(store))
+        credentials = store.load()
+        if credentials is None:
+            raise ValueError('No valid credentials for {}'.format(name))
+        return self.add(name, credentials, device_id, store=store, **session_kwargs)
+
+    def remove(self, name):
+        credentials = self.clients.pop(name).session.credentials
+        if not any(client.session.credentials is credentials for client in self.clients.values()):
+            self._accounts.pop(id(credentials), None)
+
+    # Calls getattr(client, method)(*args, **kwargs) for each target, all of them by default
+    def broadcast(self, method, *args, targets=None, **kwargs):
+        names = list(self.clients) if targets is None else list(targets)
+        start = self._clock()
+        results = {}
+        for i in range(0, len(names), self.max_threads):
+            running = [
+                (name, Prefetch(self._call, name, method, args, kwargs)) for name in names[i : i + self.max_threads]
+            ]
+            for name, call in running:
+                results[name] = call.result()
+        return FleetResult(results, elapsed(self._clock(), start))
+
+    def play(self, context_uri=None, uris=None, offset=None, position_ms=None, targets=None):
+        body = SpotifyWebApiClient.prepare_play(context_uri, uris, offset, position_ms)
+        return self.broadcast('play', body=body, targets=targets)
+
+    def pause(self, targets=None):
+        return self.broadcast('pause', targets=targets)
+
+    def volume(self, volume_percent, targets=None):
+        return self.broadcast('volume', volume_percent, targets=targets)
+
+    def playback_state(self, targets=None):
+        return self.broadcast('playback_state', targets=targets)
+
+    # Refreshes the access tokens that expire within margin seconds, once per account
+    def refresh_if_needed(self, margin=None):
+        accounts = {}
+        for name, client in self.clients.items():
+            accounts.setdefault(id(client.session.credentials), name)
+        return self.broadcast('refresh_if_needed', margin, targets=accounts.values())
+
+    # The in-memory store and the refresh lock shared by the targets on an account
+    def _account(self, credentials):
+        account = self._accounts.get(id(credentials))
+        if account is None:
+            account = self._accounts[id(credentials)] = (CredentialStore(MemoryStore()), allocate_lock())
+        return account
+
+    def _call(self, name, method, args, kwargs):
+        client = self.clients[name]
+        target = client.session if method == 'refresh_if_needed' else client
+        start = self._clock()
+        try:
+            value = getattr(target, method)(*args, **kwargs)
+        except (SpotifyWebApiError, OSError) as e:
+            return TargetResult(name, None, e, elapsed(self._clock(), start))
+        return TargetResult(name, value, None, elapsed(self._clock(), start))
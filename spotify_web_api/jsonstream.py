@@ -0,0 +1,136 @@
+import sys
+
+if sys.implementation.name == 'micropython':
+    # noinspection PyUnresolvedReferences
+    from ujson import loads
+else:
+    from json import loads
+
+
+_QUOTE = ord('"')
+_BACKSLASH = ord('\\')
+_COLON = ord(':')
+_COMMA = ord(',')
+_OPEN = (ord('{'), ord('['))
+_CLOSE = (ord('}'), ord(']'))
+_WHITESPACE = (ord(' '), ord('\t'), ord('\r'), ord('\n'))
+
+
+# Yields the items of the array found at `path` in a JSON document that is read from
+# `chunks`, an iterable of bytes. Only one item is held in memory at a time. Paths are
+# object keys separated by dots and end with "[*]", e.g. "devices[*]", "tracks.items[*]"
+# or "[*]" for a document that is an array. Nothing is yielded if the path is missing.
+def iter_items(chunks, path):
+    if not path.endswith('[*]'):
+        raise ValueError('Path must end with [*]: {}'.format(path))
+    reader = _Reader(chunks)
+    keys = path[:-3]
+    for key in keys.split('.') if keys else ():
+        if not reader.find_key(key):
+            return
+    if reader.peek() != _OPEN[1]:
+        reader.read_value(keep=False)  # null
+        return
+    reader.advance()
+    if reader.peek() == _CLOSE[1]:
+        return
+    while True:
+        yield loads(reader.read_value())
+        c = reader.peek()
+        reader.advance()
+        if c == _CLOSE[1]:
+            return
+        if c != _COMMA:
+            raise ValueError('Expected , or ] in array')
+
+
+class _Reader:
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = b''
+        self._pos = 0
+
+    def _fill(self):
+        while self._pos >= len(self._buf):
+            try:
+                self._buf = next(self._chunks)
+            except StopIteration:
+                raise ValueError('Unexpected end of JSON document')
+            self._pos = 0
+
+    def peek(self):
+        while True:
+            self._fill()
+            c = self._buf[self._pos]
+            if c not in _WHITESPACE:
+                return c
+            self._pos += 1
+
+    def advance(self):
+        self._pos += 1
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError('Expected {}'.format(chr(char)))
+        self._pos += 1
+
+    def find_key(self, key):
+        if self.peek() != _OPEN[0]:
+            return False
+        self.advance()
+        while self.peek() != _CLOSE[0]:
+            name = loads(self.read_value())
+            self.expect(_COLON)
+            if name == key:
+                return True
+            self.read_value(keep=False)
+            if self.peek() == _COMMA:
+                self.advance()
+        return False
+
+    # Returns the raw bytes of the next value, or None when keep is False
+    def read_value(self, keep=True):
+        parts = [] if keep else None
+        depth = 0
+        in_string = False
+        escape = False
+        self.peek()
+        start = self._pos
+        while True:
+            buf = self._buf
+            end = None
+            for i in range(self._pos, len(buf)):
+                c = buf[i]
+                if in_string:
+                    if escape:
+                        escape = False
+                    elif c == _BACKSLASH:
+                        escape = True
+                    elif c == _QUOTE:
+                        in_string = False
+                        if depth == 0:
+                            end = i + 1
+                            break
+                elif c == _QUOTE:
+                    in_string = True
+                elif c in _OPEN:
+                    depth += 1
+                elif c in _CLOSE:
+                    depth -= 1
+                    if depth <= 0:
+                        end = i + 1 if depth == 0 else i
+                        break
+                elif depth == 0 and (c == _COMMA or c == _COLON or c in _WHITESPACE):
+                    end = i
+                    break
+            if end is not None:
+                self._pos = end
+                if keep:
+                    parts.append(buf[start:end])
+                    return b''.join(parts)
+                return None
+            if keep:
+                parts.append(buf[start:])
+            self._pos = len(buf)
+            self._fill()
+            start = self._pos
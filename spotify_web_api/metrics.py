@@ -0,0 +1,183 @@
+import gc
+import sys
+
+from .connection import split_url
+from .histogram import BUCKETS, Histogram
+
+if sys.implementation.name == 'micropython':
+    # noinspection PyUnresolvedReferences
+    import ujson as json
+
+    # noinspection PyUnresolvedReferences
+    import usocket as socket
+
+    heap_used = gc.mem_alloc
+
+
+else:
+    import json
+    import socket
+    import tracemalloc
+
+    def heap_used():
+        if not tracemalloc.is_tracing():
+            return None
+        return tracemalloc.get_traced_memory()[0]
+
+
+METRICS_RESPONSE_TEMPLATE = """\
+HTTP/1.0 200 OK
+Content-Type: {content_type}
+
+{body}"""
+
+
+class Endpoint:
+    __slots__ = ('requests', 'latency', 'duration', 'bytes', 'heap_before', 'heap_after')
+
+    def __init__(self, buckets=BUCKETS):
+        self.requests = 0
+        self.latency = Histogram(buckets)
+        self.duration = Histogram(buckets)
+        self.bytes = 0
+        self.heap_before = None
+        self.heap_after = None
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'latency': self.latency.as_dict(),
+            'duration': self.duration.as_dict(),
+            'bytes': self.bytes,
+            'heap_before': self.heap_before,
+            'heap_after': self.heap_after,
+        }
+
+
+# Collects request metrics from the hooks of a Session, per endpoint (method and url
+# path): the number of requests, a histogram of the time until the response headers were
+# read (latency) and of the whole call including retries and parsing (duration), the
+# body bytes and the heap in use before and after the last call. Heap use is only known
+# on MicroPython and when tracemalloc is tracing on CPython.
+class Metrics:
+    def __init__(self, buckets=BUCKETS, heap_used=heap_used):
+        self.buckets = buckets
+        self.endpoints = {}
+        self.refreshes = 0
+        self.refresh_time = 0
+        self.retries = 0
+        self.errors = {}
+        self._heap_used = heap_used
+        self._heap_before = None
+
+    def install(self, session):
+        session.add_hook('request', self.on_request)
+        session.add_hook('response', self.on_response)
+        session.add_hook('parsed', self.on_parsed)
+        session.add_hook('refresh', self.on_refresh)
+        session.add_hook('retry', self.on_retry)
+        session.add_hook('error', self.on_error)
+        return self
+
+    def endpoint(self, method, url):
+        key = '{} {}'.format(method, split_url(url)[3].split('?', 1)[0])
+        endpoint = self.endpoints.get(key)
+        if endpoint is None:
+            endpoint = self.endpoints[key] = Endpoint(self.buckets)
+        return endpoint
+
+    def on_request(self, method, url):
+        if self._heap_before is None:
+            self._heap_before = self._heap_used()
+        self.endpoint(method, url).requests += 1
+
+    def on_response(self, method, url, response, seconds):
+        self.endpoint(method, url).latency.add(seconds)
+
+    def on_parsed(self, method, url, size, seconds):
+        endpoint = self.endpoint(method, url)
+        endpoint.duration.add(seconds)
+        endpoint.bytes += size
+        endpoint.heap_before = self._heap_before
+        endpoint.heap_after = self._heap_used()
+        self._heap_before = None
+
+    def on_refresh(self, seconds):
+        self.refreshes += 1
+        self.refresh_time += seconds
+
+    def on_retry(self, method, url, attempt, error):
+        self.retries += 1
+
+    def on_error(self, method, url, error):
+        key = str(error) if isinstance(error, int) else type(error).__name__
+        self.errors[key] = self.errors.get(key, 0) + 1
+        self._heap_before = None
+
+    def as_dict(self):
+        return {
+            'endpoints': {key: endpoint.as_dict() for key, endpoint in self.endpoints.items()},
+            'refreshes': self.refreshes,
+            'refresh_time': self.refresh_time,
+            'retries': self.retries,
+            'errors': self.errors,
+        }
+
+    def dumps(self):
+        return json.dumps(self.as_dict())
+
+    def format(self):
+        lines = []
+        for key in sorted(self.endpoints):
+            endpoint = self.endpoints[key]
+            lines.append(
+                '{}: {} requests, {} bytes, heap {} -> {}'.format(
+                    key, endpoint.requests, endpoint.bytes, endpoint.heap_before, endpoint.heap_after
+                )
+            )
+            for name in ('latency', 'duration'):
+                histogram = getattr(endpoint, name)
+                lines.append(
+                    '  {}: mean {:.3f}s, max {:.3f}s, p50 <= {}, p99 <= {}'.format(
+                        name,
+                        histogram.total / histogram.count if histogram.count else 0,
+                        histogram.max,
+                        histogram.quantile(0.5),
+                        histogram.quantile(0.99),
+                    )
+                )
+        lines.append('refreshes: {} ({:.3f}s)'.format(self.refreshes, self.refresh_time))
+        lines.append('retries: {}'.format(self.retries))
+        lines.append('errors: {}'.format(', '.join('{}={}'.format(k, v) for k, v in sorted(self.errors.items()))))
+        return '\n'.join(lines) + '\n'
+
+    # /metrics.json gives the metrics as JSON and any other path as plain text
+    def http_response(self, path):
+        if path.startswith('/metrics.json'):
+            return METRICS_RESPONSE_TEMPLATE.format(content_type='application/json', body=self.dumps())
+        return METRICS_RESPONSE_TEMPLATE.format(content_type='text/plain', body=self.format())
+
+
+# Serves the metrics over HTTP until the process ends, run it in a thread on a device
+# that has them, e.g. _thread.start_new_thread(serve, (metrics,)).
+def serve(metrics, port=8081):
+    s = socket.socket()
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    s.bind(socket.getaddrinfo('0.0.0.0', port)[0][-1])
+    s.listen(2)
+    micropython_optimize = sys.implementation.name == 'micropython'
+    while True:
+        client_sock, _ = s.accept()
+        client_stream = client_sock if micropython_optimize else client_sock.makefile('rwb')
+        try:
+            request_line = client_stream.readline().decode()
+            while client_stream.readline() not in (b'', b'\r\n'):
+                pass
+            path = request_line.split(' ')[1] if request_line.count(' ') >= 2 else '/'
+            client_stream.write(metrics.http_response(path).encode())
+        except OSError:
+            pass
+        finally:
+            client_stream.close()
+            if not micropython_optimize:
+                client_sock.close()
@@ -0,0 +1,162 @@
+import sys
+
+
+# Models are compact replacements for a plain object per API object. On CPython every
+# field is a slot, on MicroPython (which ignores __slots__) the values are kept in one
+# tuple instead of an attribute dict per instance. Unknown keys in API responses are
+# ignored and missing keys are None. Model.fields(...) returns a variant of the model
+# that only keeps the named fields, e.g. Device.fields('id', 'name'). It is a model of its
+# own with the same name rather than a subclass, so its objects are smaller but not
+# instances of the model.
+
+
+class _ModelBase:
+    __slots__ = ()
+    _fields = ()
+    _nested = {}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data)
+
+    @classmethod
+    def fields(cls, *names):
+        key = (cls, names)
+        projection = _projections.get(key)
+        if projection is None:
+            for name in names:
+                if name not in cls._fields:
+                    raise ValueError('{} has no field {}'.format(cls.__name__, name))
+            # Not a subclass of cls, on CPython it would inherit a slot for every field
+            if issubclass(cls, SlotsModel):
+                base, slots = SlotsModel, names
+            else:
+                base, slots = TupleModel, ()
+            projection = type(cls.__name__, (base,), {'__slots__': slots, '_fields': names, '_nested': cls._nested})
+            _projections[key] = projection
+        return projection
+
+    @classmethod
+    def _extract(cls, data):
+        nested = cls._nested
+        for name in cls._fields:
+            value = data.get(name)
+            if value is not None and name in nested:
+                model = nested[name]
+                value = [model(v) for v in value] if isinstance(value, list) else model(value)
+            yield value
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.as_dict() == other.as_dict()
+
+    def as_dict(self):
+        return dict(zip(self._fields, self._values_tuple()))
+
+    def __repr__(self):
+        shown = [name for name in ('name', 'type', 'id') if name in self._fields]
+        return '{}({})'.format(
+            type(self).__name__,
+            ', '.join('{}={}'.format(name, getattr(self, name)) for name in shown),
+        )
+
+
+class SlotsModel(_ModelBase):
+    __slots__ = ()
+
+    def __init__(self, data=None, **kwargs):
+        for name, value in zip(self._fields, self._extract(kwargs if data is None else data)):
+            setattr(self, name, value)
+
+    def _values_tuple(self):
+        return tuple(getattr(self, name) for name in self._fields)
+
+
+class TupleModel(_ModelBase):
+    __slots__ = ('_values',)
+
+    def __init__(self, data=None, **kwargs):
+        self._values = tuple(self._extract(kwargs if data is None else data))
+
+    def __getattr__(self, name):
+        try:
+            return self._values[self._fields.index(name)]
+        except ValueError:
+            raise AttributeError(name)
+
+    def _values_tuple(self):
+        return self._values
+
+
+Model = TupleModel if sys.implementation.name == 'micropython' else SlotsModel
+
+_projections = {}
+
+
+class Device(Model):
+    __slots__ = _fields = (
+        'id',
+        'is_active',
+        'is_private_session',
+        'is_restricted',
+        'name',
+        'type',
+        'volume_percent',
+    )
+
+
+class Album(Model):
+    __slots__ = _fields = (
+        'id',
+        'name',
+        'uri',
+        'album_type',
+        'artists',
+        'images',
+        'release_date',
+        'total_tracks',
+    )
+
+
+class Track(Model):
+    __slots__ = _fields = (
+        'id',
+        'name',
+        'uri',
+        'album',
+        'artists',
+        'duration_ms',
+        'explicit',
+        'is_local',
+        'popularity',
+        'track_number',
+    )
+    _nested = {'album': Album}
+
+
+class Playlist(Model):
+    __slots__ = _fields = (
+        'id',
+        'name',
+        'uri',
+        'collaborative',
+        'description',
+        'owner',
+        'public',
+        'snapshot_id',
+        'tracks',
+    )
+
+
+class PlaybackState(Model):
+    __slots__ = _fields = (
+        'device',
+        'context',
+        'currently_playing_type',
+        'is_playing',
+        'item',
+        'progress_ms',
+        'repeat_state',
+        'shuffle_state',
+        'timestamp',
+    )
+    _nested = {'device': Device, 'item': Track}
@@ -0,0 +1,75 @@
+from .clock import allocate_lock, start_new_thread
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Runs function(*args) in a background thread where threads are available, so the next
+# page can be fetched while the current one is consumed. Without threads the call is
+# made when the result is first needed.
+class Prefetch:
+    def __init__(self, function, *args):
+        self._function = function
+        self._args = args
+        self._result = None
+        self._error = None
+        self._lock = None
+        if start_new_thread is not None:
+            self._lock = allocate_lock()
+            self._lock.acquire()
+            start_new_thread(self._run, ())
+
+    def _call(self):
+        try:
+            self._result = self._function(*self._args)
+        except Exception as e:
+            self._error = e
+        self._function = None
+
+    def _run(self):
+        try:
+            self._call()
+        finally:
+            self._lock.release()
+
+    # Whether result() returns without waiting for the thread, without threads the first
+    # result() makes the call
+    def done(self):
+        return self._lock is None or not self._lock.locked()
+
+    # Returns the result or raises the error of the call, the same each time
+    def result(self):
+        if self._lock is None:
+            if self._function is not None:
+                self._call()
+        else:
+            with self._lock:
+                pass
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+# Yields function(argument) for each argument. With prefetch the call for the next
+# argument is started before the current result is handed to the caller.
+def prefetched(function, arguments, prefetch=True):
+    if not prefetch:
+        for argument in arguments:
+            yield function(argument)
+        return
+    pending = None
+    for argument in arguments:
+        upcoming = Prefetch(function, argument)
+        if pending is not None:
+            yield pending.result()
+        pending = upcoming
+    if pending is not None:
+        yield pending.result()
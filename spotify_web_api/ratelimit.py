@@ -0,0 +1,114 @@
+from .clock import allocate_lock, elapsed, later, monotonic, sleep
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 5
+PRIORITY_BACKGROUND = 10
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity, clock=monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def delay(self):
+        self._refill()
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def _refill(self):
+        now = self._clock()
+        seconds = elapsed(now, self._updated)
+        # Negative when ticks_ms wrapped around since the last refill, long enough to fill up
+        self.tokens = self.capacity if seconds < 0 else min(self.capacity, self.tokens + seconds * self.rate)
+        self._updated = now
+
+
+# Lets requests through at `rate` per second with bursts of up to `burst` requests,
+# highest priority (lowest number) first. pause() stops all requests, e.g. for the
+# Retry-After of a 429 response. Counts requests that were throttled by the server and
+# requests that were delayed here, the total time spent waiting and the requests that
+# gave up waiting.
+class RequestScheduler:
+    def __init__(self, rate=10, burst=10, max_retry_after=30, clock=monotonic, sleep=sleep):
+        self.bucket = TokenBucket(rate, burst, clock)
+        self.max_retry_after = max_retry_after
+        self.paused_until = None
+        self.requests = 0
+        self.throttled = 0
+        self.delayed = 0
+        self.delay_total = 0
+        self.timed_out = 0
+        self._clock = clock
+        self._sleep = sleep
+        self._waiting = []
+        self._sequence = 0
+        self._lock = allocate_lock()
+
+    # Waits for the turn of a request. With a timeout returns False without letting the
+    # request through when it would have to wait longer.
+    def acquire(self, priority=PRIORITY_DEFAULT, timeout=None):
+        start = self._clock()
+        with self._lock:
+            self._sequence += 1
+            ticket = (priority, self._sequence)
+            self._waiting.append(ticket)
+            self._waiting.sort()
+        waited = False
+        acquired = False
+        while True:
+            with self._lock:
+                if self._waiting[0] == ticket:
+                    wait = max(self._paused(), self.bucket.delay())
+                    # Waits shorter than the millisecond resolution of ticks_ms are not waited for
+                    if wait < 0.001:
+                        self.bucket.take()
+                        self._waiting.pop(0)
+                        self.requests += 1
+                        acquired = True
+                        break
+                else:
+                    wait = 0.005
+                if timeout is not None and elapsed(self._clock(), start) + wait > timeout:
+                    self._waiting.remove(ticket)
+                    self.timed_out += 1
+                    break
+            waited = True
+            self._sleep(wait)
+        if waited:
+            with self._lock:
+                self.delayed += 1
+                self.delay_total += elapsed(self._clock(), start)
+        return acquired
+
+    def pause(self, seconds):
+        with self._lock:
+            self.throttled += 1
+            if self._paused() < seconds:
+                self.paused_until = later(self._clock(), seconds)
+
+    # Seconds left of the pause, forgets it when it is over
+    def _paused(self):
+        if self.paused_until is None:
+            return 0
+        remaining = elapsed(self.paused_until, self._clock())
+        if remaining <= 0:
+            self.paused_until = None
+            return 0
+        return remaining
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'throttled': self.throttled,
+            'delayed': self.delayed,
+            'delay_total': self.delay_total,
+            'timed_out': self.timed_out,
+        }
@@ -0,0 +1,108 @@
+import sys
+
+from . import TOKEN_ENDPOINT
+from .connection import Response
+
+if sys.implementation.name == 'micropython':
+    # noinspection PyUnresolvedReferences
+    import ujson as json
+else:
+    import json
+
+# Values of token endpoint responses that are replaced by REDACTED in recordings
+TOKEN_FIELDS = ('access_token', 'refresh_token')
+REDACTED = 'redacted'
+
+
+# Sends requests with `pool` and appends each exchange as a line of JSON to the file at
+# `path`, to be replayed with ReplayPool. Request headers and form encoded request bodies
+# are not recorded since they hold the access token and client secret, and the tokens in
+# responses from the token endpoint are recorded as REDACTED. Other responses are
+# recorded as they are. Response bodies are read completely, also for stream=True.
+class RecordingPool:
+    def __init__(self, pool, path):
+        self.pool = pool
+        self.path = path
+
+    def request(self, method, url, headers=None, json=None, data=None, stream=False, timeout=None):
+        response = self.pool.request(
+            method,
+            url,
+            headers=headers,
+            json=json,
+            data=data,
+            stream=stream,
+            timeout=timeout,
+        )
+        content = response.content
+        response_headers = dict((name.lower(), value) for name, value in response.headers.items())
+        body = content.decode('utf-8')
+        if url == TOKEN_ENDPOINT:
+            body = _redacted(body)
+        self._record(
+            {
+                'method': method,
+                'url': url,
+                'json': json,
+                'status': response.status_code,
+                'headers': response_headers,
+                'body': body,
+            }
+        )
+        return Response(response.status_code, response_headers, content)
+
+    def close(self):
+        self.pool.close()
+
+    def _record(self, exchange):
+        with open(self.path, 'a') as recording:
+            recording.write(json.dumps(exchange))
+            recording.write('\n')
+
+
+def _redacted(body):
+    try:
+        tokens = json.loads(body)
+    except ValueError:
+        return body
+    if not isinstance(tokens, dict):
+        return body
+    for name in TOKEN_FIELDS:
+        if name in tokens:
+            tokens[name] = REDACTED
+    return json.dumps(tokens)
+
+
+# Answers requests with the responses recorded by RecordingPool, without a network.
+# Responses are matched on method and url and given in the recorded order, with
+# loop=True they start over when all of them have been given, otherwise a request
+# without a recorded response raises KeyError.
+class ReplayPool:
+    def __init__(self, path, loop=False):
+        self.path = path
+        self.loop = loop
+        self.requests = []
+        self._responses = {}
+        self._next = {}
+        with open(path) as recording:
+            for line in recording:
+                if line.strip():
+                    exchange = json.loads(line)
+                    key = exchange['method'] + ' ' + exchange['url']
+                    self._responses.setdefault(key, []).append(exchange)
+
+    def request(self, method, url, headers=None, json=None, data=None, stream=False, timeout=None):
+        self.requests.append((method, url, json))
+        key = method + ' ' + url
+        responses = self._responses.get(key, ())
+        i = self._next.get(key, 0)
+        if i >= len(responses):
+            if not self.loop or not responses:
+                raise KeyError('No recorded response for {}'.format(key))
+            i = 0
+        self._next[key] = i + 1
+        exchange = responses[i]
+        return Response(exchange['status'], exchange['headers'], exchange['body'].encode('utf-8'))
+
+    def close(self):
+        pass
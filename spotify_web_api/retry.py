@@ -0,0 +1,73 @@
+import sys
+
+from .clock import elapsed, monotonic, sleep
+
+if sys.implementation.name == 'micropython':
+    # noinspection PyUnresolvedReferences
+    from urandom import getrandbits
+else:
+    from random import getrandbits
+
+
+# Retries requests that failed with a connection error or one of `statuses`, at most
+# `max_attempts` attempts in total and not after `deadline` seconds from the first one.
+# Waits a random time up to backoff * 2 ** retry (capped at max_backoff) between
+# attempts. Only `methods` are retried unless a request is explicitly marked as safe to
+# retry. Counts retries and the time spent waiting for them.
+class RetryPolicy:
+    def __init__(
+        self,
+        max_attempts=3,
+        backoff=0.2,
+        max_backoff=5,
+        deadline=10,
+        jitter=True,
+        statuses=(500, 502, 503, 504),
+        methods=('GET', 'HEAD', 'PUT', 'DELETE'),
+        clock=monotonic,
+        sleep=sleep,
+    ):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self.jitter = jitter
+        self.statuses = statuses
+        self.methods = methods
+        self.clock = clock
+        self.retries = 0
+        self.gave_up = 0
+        self.retry_delay = 0
+        self._sleep = sleep
+
+    def delay(self, retry):
+        delay = min(self.max_backoff, self.backoff * 2 ** retry)
+        if self.jitter:
+            delay *= getrandbits(16) / 65536
+        return delay
+
+    # Called after a failed attempt, waits and returns True if the request should be sent
+    # again. remaining is what is left of the deadline of the call, the request is not sent
+    # again when the wait would take longer.
+    def retry(self, method, attempt, start, force=None, remaining=None):
+        if not (force or (force is None and method in self.methods)):
+            return False
+        delay = self.delay(attempt - 1)
+        if (
+            attempt >= self.max_attempts
+            or elapsed(self.clock(), start) + delay > self.deadline
+            or (remaining is not None and delay >= remaining)
+        ):
+            self.gave_up += 1
+            return False
+        self._sleep(delay)
+        self.retries += 1
+        self.retry_delay += delay
+        return True
+
+    def stats(self):
+        return {
+            'retries': self.retries,
+            'gave_up': self.gave_up,
+            'retry_delay': self.retry_delay,
+        }
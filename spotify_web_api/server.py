@@ -0,0 +1,417 @@
+import sys
+
+from .clock import elapsed, monotonic
+from .urls import parse_qs
+
+if sys.implementation.name == 'micropython':
+    # noinspection PyUnresolvedReferences
+    import uerrno as errno
+
+    # noinspection PyUnresolvedReferences
+    import ujson as json
+
+    # noinspection PyUnresolvedReferences
+    import uselect as select
+
+    # noinspection PyUnresolvedReferences
+    import usocket as socket
+
+    # Frozen into firmware the templates are looked for in spotify_web_api/templates on the filesystem
+    TEMPLATE_DIR = __file__.rsplit('/', 1)[0] + '/templates' if '/' in __file__ else 'templates'
+
+    # poll() returns the socket objects
+    def _key(sock):
+        return sock
+
+
+else:
+    import errno
+    import json
+    import os
+    import select
+    import socket
+
+    TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+    # poll() returns file descriptors
+    def _key(sock):
+        return sock.fileno()
+
+
+_TCP_NODELAY = getattr(socket, 'TCP_NODELAY', None)
+
+REASONS = {
+    200: 'OK',
+    202: 'Accepted',
+    204: 'No Content',
+    302: 'Found',
+    400: 'Bad Request',
+    401: 'Unauthorized',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    408: 'Request Timeout',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+    501: 'Not Implemented',
+    502: 'Bad Gateway',
+    503: 'Service Unavailable',
+    504: 'Gateway Timeout',
+}
+
+# Streamed responses are sent in chunks of about this many bytes, smaller bodies are sent
+# in one write with the head. Every write of a response after the first one waits for the
+# ACK of the previous one where Nagle's algorithm can not be turned off, which the client
+# may delay by up to 200 ms.
+CHUNK_SIZE = 1024
+
+
+# Yields the lines of a template in TEMPLATE_DIR with its {placeholders} filled in from
+# values, so that pages are never held in RAM as a whole
+def render_template(name, **values):
+    with open(TEMPLATE_DIR + '/' + name) as template:
+        for line in template:
+            yield line.format(**values) if '{' in line else line
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(REASONS.get(status, ''))
+        self.status = status
+
+
+class Request:
+    __slots__ = ('method', 'path', 'query', 'version', 'headers', 'body')
+
+    def __init__(self, method, path, query, version, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.version = version
+        self.headers = headers
+        self.body = body
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.1':
+            return connection != 'close'
+        return connection == 'keep-alive'
+
+    def params(self):
+        return parse_qs(self.query)
+
+    def form(self):
+        return parse_qs(self.body.decode())
+
+
+# Writes the response to one request, with a Content-Length or, for streams, in chunks
+class ResponseWriter:
+    def __init__(self, sock, request):
+        self.sock = sock
+        self.request = request
+        self.keep_alive = request.keep_alive
+        self.status = None
+
+    @property
+    def sent(self):
+        return self.status is not None
+
+    def send(self, status, body=b'', content_type='text/plain', headers=None):
+        if isinstance(body, str):
+            body = body.encode()
+        head = self._head(status, content_type, headers, 'Content-Length: {}\r\n'.format(len(body)))
+        if len(body) <= CHUNK_SIZE:
+            self.sock.sendall(head + body)
+        else:
+            self.sock.sendall(head)
+            self.sock.sendall(body)
+
+    def send_json(self, value, status=200):
+        self.send(status, json.dumps(value), 'application/json')
+
+    def redirect(self, url, status=302):
+        self.send(status, headers={'Location': url})
+
+    # Sends the strings or bytes from chunks as they come, chunked for HTTP/1.1 and
+    # until the connection is closed for HTTP/1.0
+    def stream(self, chunks, status=200, content_type='text/html; charset=utf-8', headers=None):
+        chunked = self.request.version == 'HTTP/1.1'
+        if not chunked:
+            self.keep_alive = False
+        framing = 'Transfer-Encoding: chunked\r\n' if chunked else ''
+        # The head goes out with the first chunk and the end of the body with the last one
+        head = self._head(status, content_type, headers, framing)
+        pending = []
+        size = 0
+        for chunk in chunks:
+            pending.append(chunk.encode() if isinstance(chunk, str) else chunk)
+            size += len(pending[-1])
+            if size >= CHUNK_SIZE:
+                self.sock.sendall(head + self._chunk(b''.join(pending), chunked))
+                head = b''
+                pending = []
+                size = 0
+        last = self._chunk(b''.join(pending), chunked) if size else b''
+        self.sock.sendall(head + last + (b'0\r\n\r\n' if chunked else b''))
+
+    def template(self, name, status=200, **values):
+        self.stream(render_template(name, **values), status)
+
+    @staticmethod
+    def _chunk(data, chunked):
+        if chunked:
+            return '{:x}\r\n'.format(len(data)).encode() + data + b'\r\n'
+        return data
+
+    def _head(self, status, content_type, headers, framing):
+        self.status = status
+        lines = ['HTTP/1.1 {} {}\r\n'.format(status, REASONS.get(status, '')), framing]
+        if status != 204:
+            lines.append('Content-Type: {}\r\n'.format(content_type))
+        if headers:
+            for name, value in headers.items():
+                lines.append('{}: {}\r\n'.format(name, value))
+        lines.append('Connection: keep-alive\r\n\r\n' if self.keep_alive else 'Connection: close\r\n\r\n')
+        return ''.join(lines).encode()
+
+
+class _Connection:
+    __slots__ = ('sock', 'buffer', 'last_active')
+
+    def __init__(self, sock, now):
+        self.sock = sock
+        self.buffer = b''
+        self.last_active = now
+
+
+# A small HTTP/1.1 server for a single thread: one poll() waits on the listening socket
+# and every open connection, so a browser that opens a connection and sends nothing does
+# not hold up the others. Requests are read without blocking into a buffer of at most
+# max_request_size bytes, a connection that has been quiet for `timeout` seconds is closed,
+# and keep-alive connections beyond max_connections make room for new ones, oldest
+# first. handler(request, response) is called for each request and writes the response
+# with a ResponseWriter; the socket blocks for at most `timeout` seconds while it does.
+# Call poll() from a loop that does other work as well, or run().
+class HTTPServer:
+    def __init__(
+        self,
+        handler,
+        port=8080,
+        host='0.0.0.0',
+        max_connections=4,
+        timeout=10,
+        max_request_size=2048,
+        clock=monotonic,
+    ):
+        self.handler = handler
+        self.port = port
+        self.host = host
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_request_size = max_request_size
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self._clock = clock
+        self._listener = None
+        self._listener_key = None
+        self._poller = None
+        self._connections = {}
+
+    def start(self):
+        listener = socket.socket()
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(socket.getaddrinfo(self.host, self.port)[0][-1])
+        listener.listen(self.max_connections)
+        listener.setblocking(False)
+        if self.port == 0:
+            self.port = listener.getsockname()[1]
+        self._poller = select.poll()
+        self._poller.register(listener, select.POLLIN)
+        self._listener = listener
+        self._listener_key = _key(listener)
+        return self
+
+    # Handles what is ready within timeout seconds, returns the number of requests handled
+    def poll(self, timeout=1):
+        handled = 0
+        for event in self._poller.poll(int(timeout * 1000)):
+            if event[0] == self._listener_key:
+                self._accept()
+                continue
+            connection = self._connections.get(event[0])
+            if connection is not None:
+                handled += self._receive(connection, event[1])
+        self._expire()
+        return handled
+
+    # Serves until until() returns true, or forever
+    def run(self, until=None, poll_timeout=1):
+        while until is None or not until():
+            self.poll(poll_timeout)
+
+    def close(self):
+        for connection in list(self._connections.values()):
+            self._close(connection)
+        if self._listener is not None:
+            self._poller.unregister(self._listener)
+            self._listener.close()
+            self._listener = None
+
+    @property
+    def connections(self):
+        return len(self._connections)
+
+    def stats(self):
+        return {
+            'connections': self.connections,
+            'requests': self.requests,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'rejected': self.rejected,
+        }
+
+    def _accept(self):
+        try:
+            sock, _ = self._listener.accept()
+        except OSError:
+            return
+        if len(self._connections) >= self.max_connections and not self._evict():
+            self.rejected += 1
+            try:
+                sock.send(b'HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            except OSError:
+                pass
+            sock.close()
+            return
+        if _TCP_NODELAY is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, _TCP_NODELAY, 1)
+        sock.setblocking(False)
+        self._connections[_key(sock)] = _Connection(sock, self._clock())
+        self._poller.register(sock, select.POLLIN)
+
+    # Closes the connection that has waited longest for a next request
+    def _evict(self):
+        idle = [connection for connection in self._connections.values() if not connection.buffer]
+        if not idle:
+            return False
+        now = self._clock()
+        oldest = idle[0]
+        for connection in idle:
+            if elapsed(now, connection.last_active) > elapsed(now, oldest.last_active):
+                oldest = connection
+        self._close(oldest)
+        return True
+
+    def _receive(self, connection, flags):
+        try:
+            data = connection.sock.recv(self.max_request_size)
+        except OSError as e:
+            if e.args and e.args[0] == errno.EAGAIN:
+                return 0
+            data = b''
+        if not data:
+            self._close(connection)
+            return 0
+        connection.buffer += data
+        connection.last_active = self._clock()
+        handled = 0
+        while True:
+            try:
+                request = self._parse(connection)
+                if request is None and len(connection.buffer) > self.max_request_size:
+                    raise HTTPError(413)
+            except HTTPError as e:
+                self._reject(connection, e.status)
+                return handled
+            if request is None:
+                return handled
+            handled += 1
+            if not self._handle(connection, request):
+                self._close(connection)
+                return handled
+
+    def _parse(self, connection):
+        buffer = connection.buffer
+        end = buffer.find(b'\r\n\r\n')
+        if end < 0:
+            return None
+        try:
+            lines = buffer[:end].decode().split('\r\n')
+            method, target, version = lines[0].split(' ')
+        except (UnicodeError, ValueError):
+            raise HTTPError(400)
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if 'transfer-encoding' in headers:
+            raise HTTPError(501)
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(400)
+        if length < 0:
+            raise HTTPError(400)
+        if end + 4 + length > self.max_request_size:
+            raise HTTPError(413)
+        if len(buffer) < end + 4 + length:
+            return None
+        body = buffer[end + 4 : end + 4 + length]
+        connection.buffer = buffer[end + 4 + length :]
+        path, _, query = target.partition('?')
+        return Request(method, path, query, version, headers, body)
+
+    # Returns whether the connection stays open
+    def _handle(self, connection, request):
+        self.requests += 1
+        response = ResponseWriter(connection.sock, request)
+        connection.sock.settimeout(self.timeout)
+        try:
+            try:
+                self.handler(request, response)
+            except OSError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                if response.sent:
+                    return False
+                response.keep_alive = False
+                response.send(500, '{}: {}'.format(type(e).__name__, e))
+            if not response.sent:
+                response.send(204)
+        except OSError:
+            self.errors += 1
+            return False
+        finally:
+            connection.sock.setblocking(False)
+        connection.last_active = self._clock()
+        return response.keep_alive
+
+    def _reject(self, connection, status):
+        connection.sock.settimeout(self.timeout)
+        try:
+            response = ResponseWriter(connection.sock, Request('', '', '', 'HTTP/1.1', {'connection': 'close'}, b''))
+            response.send(status, REASONS.get(status, ''))
+        except OSError:
+            pass
+        self._close(connection)
+
+    def _expire(self):
+        now = self._clock()
+        for connection in list(self._connections.values()):
+            if elapsed(now, connection.last_active) > self.timeout:
+                self.timeouts += 1
+                if connection.buffer:
+                    self._reject(connection, 408)
+                else:
+                    self._close(connection)
+
+    def _close(self, connection):
+        self._connections.pop(_key(connection.sock), None)
+        try:
+            self._poller.unregister(connection.sock)
+        except (OSError, ValueError, KeyError):
+            pass
+        connection.sock.close()
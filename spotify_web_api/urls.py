@@ -0,0 +1,104 @@
+# urllib replacements: quoting, query strings and form bodies
+
+# Byte tables indexed by byte value: the bytes that are never quoted and the value of
+# hexadecimal digits (16 for anything else).
+_ALWAYS_SAFE = bytearray(256)
+for _c in b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_.-~':
+    _ALWAYS_SAFE[_c] = 1
+_HEX_DIGITS = b'0123456789ABCDEF'
+_HEX_VALUES = bytearray(b'\x10' * 256)
+for _c in range(16):
+    _HEX_VALUES[_HEX_DIGITS[_c]] = _c
+    _HEX_VALUES[b'0123456789abcdef'[_c]] = _c
+del _c
+
+
+def parse_qs(qs):
+    parsed_result = {}
+    for name, value in parse_qsl(qs):
+        if name in parsed_result:
+            parsed_result[name].append(value)
+        else:
+            parsed_result[name] = [value]
+    return parsed_result
+
+
+def parse_qsl(qs):
+    r = []
+    for field in qs.split('&'):
+        for name_value in field.split(';') if ';' in field else (field,):
+            name, separator, value = name_value.partition('=')
+            if value:
+                r.append((unquote_plus(name), unquote_plus(value)))
+    return r
+
+
+# Percent-encodes everything but ASCII letters, digits and "_.-~" in the UTF-8 encoding
+# of s, with plus=True spaces are encoded as "+". Strings that need no quoting are
+# returned as they are, otherwise one buffer is filled from the first unsafe byte on.
+def quote(s, plus=False):
+    data = s.encode() if isinstance(s, str) else s
+    safe = _ALWAYS_SAFE
+    i = 0
+    for c in data:
+        if not safe[c]:
+            break
+        i += 1
+    else:
+        return s if isinstance(s, str) else str(data, 'ascii')
+
+    digits = _HEX_DIGITS
+    buffer = bytearray(memoryview(data)[:i])
+    for c in memoryview(data)[i:]:
+        if safe[c]:
+            buffer.append(c)
+        elif plus and c == 32:
+            buffer.append(43)  # +
+        else:
+            buffer.append(37)  # %
+            buffer.append(digits[c >> 4])
+            buffer.append(digits[c & 15])
+    return str(buffer, 'ascii')
+
+
+def quote_plus(s):
+    return quote(s, True)
+
+
+# Decodes percent escapes as UTF-8, invalid escapes are left as they are
+def unquote(s, plus=False):
+    if plus and '+' in s:
+        s = s.replace('+', ' ')
+    if '%' not in s:
+        return s
+
+    values = _HEX_VALUES
+    parts = s.encode().split(b'%')
+    buffer = bytearray(parts[0])
+    for i in range(1, len(parts)):
+        part = parts[i]
+        if len(part) > 1 and values[part[0]] < 16 and values[part[1]] < 16:
+            buffer.append(values[part[0]] << 4 | values[part[1]])
+            buffer += memoryview(part)[2:]
+        else:
+            buffer.append(37)  # %
+            buffer += part
+    return str(buffer, 'utf-8', 'replace')
+
+
+def unquote_plus(s):
+    return unquote(s, True)
+
+
+def urlencode(query):
+    if isinstance(query, dict):
+        query = query.items()
+    li = []
+    for k, v in query:
+        k = quote_plus(str(k))
+        if isinstance(v, list):
+            for value in v:
+                li.append(k + '=' + quote_plus(str(value)))
+        else:
+            li.append(k + '=' + quote_plus(str(v)))
+    return '&'.join(li)
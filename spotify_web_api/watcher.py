@@ -0,0 +1,153 @@
+from .clock import elapsed, later, monotonic, sleep
+
+# Events sent to the subscribers of a PlaybackWatcher
+ACTIVE = 'active'  # playback started or ended on any device, state is None when it ended
+TRACK = 'track'
+PLAYING = 'playing'  # play or pause, see state.is_playing
+DEVICE = 'device'
+VOLUME = 'volume'
+SHUFFLE = 'shuffle'
+REPEAT = 'repeat'
+CONTEXT = 'context'
+SEEK = 'seek'  # progress jumped by more than seek_tolerance seconds from what was predicted
+
+
+# Polls SpotifyWebApiClient.playback_state() and calls the subscribers with
+# (event, state, previous) for each change between two polls. While playing it polls every
+# playing_interval seconds, but also right after the track is predicted to end from
+# progress_ms and duration_ms, while paused every paused_interval and without an active
+# device every inactive_interval seconds. After a change it polls again within
+# change_interval seconds, since more changes tend to follow. A failed poll is not
+# retried before the next interval.
+class PlaybackWatcher:
+    def __init__(
+        self,
+        client,
+        playing_interval=10,
+        paused_interval=20,
+        inactive_interval=60,
+        change_interval=2,
+        track_end_delay=1,
+        seek_tolerance=3,
+        clock=monotonic,
+        sleep=sleep,
+    ):
+        self.client = client
+        self.playing_interval = playing_interval
+        self.paused_interval = paused_interval
+        self.inactive_interval = inactive_interval
+        self.change_interval = change_interval
+        self.track_end_delay = track_end_delay
+        self.seek_tolerance = seek_tolerance
+        self.state = None
+        self.polled_at = None
+        self.next_poll = clock()
+        self.polls = 0
+        self._subscribers = []
+        self._clock = clock
+        self._sleep = sleep
+
+    def subscribe(self, subscriber):
+        self._subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber):
+        self._subscribers.remove(subscriber)
+
+    # Progress of the current track now, predicted from the last poll
+    def progress_ms(self):
+        state = self.state
+        if state is None or state.progress_ms is None:
+            return None
+        if not state.is_playing:
+            return state.progress_ms
+        return state.progress_ms + int(elapsed(self._clock(), self.polled_at) * 1000)
+
+    # E.g. after sending a player command, to pick up its effect
+    def poll_soon(self, delay=0.5):
+        if self.due_in() > delay:
+            self.next_poll = later(self._clock(), delay)
+
+    # Seconds until the next poll, negative when it is overdue
+    def due_in(self):
+        return elapsed(self.next_poll, self._clock())
+
+    # For loops that do other things between polls, returns the events of the poll
+    def poll_if_due(self):
+        if self.due_in() > 0:
+            return []
+        return self.poll()
+
+    def poll(self):
+        now = self._clock()
+        self.next_poll = later(now, self.paused_interval)
+        predicted_progress = self.progress_ms()
+        state = self.client.playback_state()
+        previous = self.state
+        self.state = state
+        self.polled_at = now
+        self.polls += 1
+        events = changes(previous, state, predicted_progress, self.seek_tolerance * 1000)
+        self.next_poll = later(now, self.interval(events))
+        for event in events:
+            for subscriber in self._subscribers:
+                subscriber(event, state, previous)
+        return events
+
+    def interval(self, events=()):
+        state = self.state
+        if state is None:
+            interval = self.inactive_interval
+        elif not state.is_playing:
+            interval = self.paused_interval
+        else:
+            interval = self.playing_interval
+            item = state.item
+            if item is not None and item.duration_ms and state.progress_ms is not None:
+                remaining = (item.duration_ms - state.progress_ms) / 1000
+                interval = min(interval, max(remaining, 0) + self.track_end_delay)
+        if events:
+            interval = min(interval, self.change_interval)
+        return interval
+
+    # Polls until `polls` polls have been made, or forever
+    def run(self, polls=None):
+        while polls is None or self.polls < polls:
+            wait = self.due_in()
+            if wait > 0:
+                self._sleep(wait)
+            self.poll()
+
+
+def changes(previous, state, predicted_progress=None, seek_tolerance_ms=3000):
+    if previous is None or state is None:
+        return [ACTIVE] if previous is not state else []
+    events = []
+    if _id(previous.item) != _id(state.item):
+        events.append(TRACK)
+    elif (
+        predicted_progress is not None
+        and state.progress_ms is not None
+        and abs(state.progress_ms - predicted_progress) > seek_tolerance_ms
+    ):
+        events.append(SEEK)
+    if previous.is_playing != state.is_playing:
+        events.append(PLAYING)
+    if _id(previous.device) != _id(state.device):
+        events.append(DEVICE)
+    elif previous.device is not None and previous.device.volume_percent != state.device.volume_percent:
+        events.append(VOLUME)
+    if previous.shuffle_state != state.shuffle_state:
+        events.append(SHUFFLE)
+    if previous.repeat_state != state.repeat_state:
+        events.append(REPEAT)
+    if _uri(previous.context) != _uri(state.context):
+        events.append(CONTEXT)
+    return events
+
+
+def _id(model):
+    return model.id if model is not None else None
+
+
+def _uri(context):
+    return context.get('uri') if context else None
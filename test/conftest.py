@@ -0,0 +1,33 @@
+import pytest
+
+
+# Stands in for the `clock` and `sleep` arguments, time only moves with sleep() or by
+# setting `now`
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+# Credentials of a session without a device, a new dict for each test as sessions change it
+@pytest.fixture
+def credentials():
+    return dict(
+        refresh_token='refresh_token',
+        access_token='access_token',
+        client_id='client_id',
+        client_secret='client_secret',
+        device_id=None,
+    )
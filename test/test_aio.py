@@ -0,0 +1,250 @@
+import asyncio
+from json import dumps
+
+import pytest
+
+from spotify_web_api import SpotifyWebApiError
+from spotify_web_api.aio import AsyncConnection, AsyncConnectionPool, AsyncSession, AsyncSpotifyWebApiClient
+from spotify_web_api.connection import DeadlineExceeded, RequestTimeout, Response
+
+
+class FakePool:
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+        self.timeouts = []
+
+    async def request(self, method, url, headers=None, json=None, data=None, timeout=None):
+        self.timeouts.append(timeout)
+        self.requests.append((method, url, headers, json, data))
+        await asyncio.sleep(0)
+        status_code, body = self.responses[url.split('?')[0]].pop(0)
+        return Response(status_code, {}, b'' if body is None else dumps(body).encode())
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_play(credentials):
+    pool = FakePool({'https://api.spotify.com/v1/me/player/play': [(204, None)]})
+    client = AsyncSpotifyWebApiClient(AsyncSession(dict(credentials, device_id='device_id'), pool=pool))
+    run(client.play(uris=['spotify:track:471sXvN5C5vfMSBdKrGpo7']))
+    method, url, headers, body, _ = pool.requests[0]
+    assert method == 'PUT'
+    assert url == 'https://api.spotify.com/v1/me/player/play?device_id=device_id'
+    assert headers == {'Authorization': 'Bearer access_token'}
+    assert body == {'uris': ['spotify:track:471sXvN5C5vfMSBdKrGpo7']}
+
+
+@pytest.mark.parametrize(
+    'call, method, url',
+    [
+        (lambda client: client.next(), 'POST', '/next?device_id=device_id'),
+        (lambda client: client.previous(), 'POST', '/previous?device_id=device_id'),
+        (lambda client: client.seek(1000), 'PUT', '/seek?device_id=device_id&position_ms=1000'),
+        (lambda client: client.volume(40), 'PUT', '/volume?device_id=device_id&volume_percent=40'),
+        (lambda client: client.shuffle(True), 'PUT', '/shuffle?device_id=device_id&state=true'),
+        (lambda client: client.repeat('track'), 'PUT', '/repeat?device_id=device_id&state=track'),
+        (
+            lambda client: client.add_to_queue('spotify:track:1'),
+            'POST',
+            '/queue?device_id=device_id&uri=spotify%3Atrack%3A1',
+        ),
+        (lambda client: client.transfer_playback('kitchen'), 'PUT', ''),
+    ],
+)
+def test_player_commands(call, method, url, credentials):
+    pool = FakePool({'https://api.spotify.com/v1/me/player' + url.split('?')[0]: [(204, None)]})
+    client = AsyncSpotifyWebApiClient(AsyncSession(dict(credentials, device_id='device_id'), pool=pool))
+    run(call(client))
+    assert pool.requests[0][:2] == (method, 'https://api.spotify.com/v1/me/player' + url)
+
+
+def test_prepared_play(credentials):
+    pool = FakePool({'https://api.spotify.com/v1/me/player/play': [(204, None)]})
+    client = AsyncSpotifyWebApiClient(AsyncSession(credentials, pool=pool))
+    run(client.play(body=client.prepare_play(context_uri='spotify:album:1')))
+    assert pool.requests[0][3:] == (None, b'{"context_uri": "spotify:album:1"}')
+
+
+def test_error(credentials):
+    pool = FakePool(
+        {
+            'https://api.spotify.com/v1/me/player/pause': [
+                (403, {'error': {'status': 403, 'message': 'Restriction violated', 'reason': 'UNKNOWN'}})
+            ]
+        }
+    )
+    client = AsyncSpotifyWebApiClient(AsyncSession(credentials, pool=pool))
+    with pytest.raises(SpotifyWebApiError) as excinfo:
+        run(client.pause())
+    assert excinfo.value.status == 403
+    assert excinfo.value.reason == 'UNKNOWN'
+
+
+def test_concurrent_requests_share_token_refresh(credentials):
+    expired = (401, {'error': {'status': 401, 'message': 'The access token expired'}})
+    pool = FakePool(
+        {
+            'https://api.spotify.com/v1/me/player/pause': [expired, expired, (204, None), (204, None)],
+            'https://accounts.spotify.com/api/token': [(200, {'access_token': 'new', 'expires_in': 3600})],
+        }
+    )
+    client = AsyncSpotifyWebApiClient(AsyncSession(credentials, pool=pool))
+
+    async def pause_twice():
+        await asyncio.gather(client.pause(), client.pause())
+
+    run(pause_twice())
+    assert [url for _, url, _, _, _ in pool.requests].count('https://accounts.spotify.com/api/token') == 1
+    assert pool.requests[-1][2] == {'Authorization': 'Bearer new'}
+
+
+def test_post_and_request(credentials):
+    pool = FakePool(
+        {
+            'https://api.spotify.com/v1/me/player/queue': [(204, None)],
+            'https://api.spotify.com/v1/me/player/next': [(204, None)],
+        }
+    )
+    session = AsyncSession(dict(credentials, device_id='device_id'), pool=pool)
+    run(session.request('POST', 'https://api.spotify.com/v1/me/player/queue', query='uri=spotify%3Atrack%3A1'))
+    run(session.post('https://api.spotify.com/v1/me/player/next', device=False))
+    assert [(method, url) for method, url, _, _, _ in pool.requests] == [
+        ('POST', 'https://api.spotify.com/v1/me/player/queue?device_id=device_id&uri=spotify%3Atrack%3A1'),
+        ('POST', 'https://api.spotify.com/v1/me/player/next'),
+    ]
+    assert pool.requests[1][3] == {}
+
+
+def test_no_blocking_methods(credentials):
+    session = AsyncSession(credentials, pool=FakePool({}))
+    for method in ('get_items', 'paginate', 'get_batched', '_attempt', '_request_tokens'):
+        assert not hasattr(session, method)
+
+
+# Returns the data in the packets it arrived in, like a uasyncio Stream
+class PacketReader:
+    def __init__(self, packets):
+        self.packets = list(packets)
+
+    async def readline(self):
+        line, _, rest = self.packets[0].partition(b'\n')
+        self.packets[0] = rest
+        if not rest:
+            self.packets.pop(0)
+        return line + b'\n'
+
+    async def read(self, n):
+        if not self.packets:
+            return b''
+        packet = self.packets.pop(0)
+        if 0 <= n < len(packet):
+            self.packets.insert(0, packet[n:])
+            packet = packet[:n]
+        return packet
+
+
+def test_body_until_close():
+    connection = AsyncConnection('api.spotify.com')
+    connection._reader = PacketReader([b'HTTP/1.1 200 OK\r\nConnection: close\r\n\r\n{"a": ', b'1}'])
+    response = run(connection._read_response('GET'))
+    assert response.json() == {'a': 1}
+    assert response.will_close
+
+
+async def serve(handler):
+    async def handle(reader, writer):
+        peer = writer.get_extra_info('peername')
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line == b'\r\n':
+                    break
+                name, _, value = line.decode().partition(':')
+                headers[name.lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+            writer.write(handler(peer, request_line.decode().split()[1], body))
+            await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(handle, '127.0.0.1', 0)
+
+
+def test_connection_pool_keep_alive():
+    peers = []
+
+    def handler(peer, path, body):
+        peers.append(peer)
+        content = dumps({'path': path, 'body': body.decode()}).encode()
+        return b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s' % (len(content), content)
+
+    async def requests():
+        server = await serve(handler)
+        url = 'http://127.0.0.1:{}'.format(server.sockets[0].getsockname()[1])
+        pool = AsyncConnectionPool()
+        first = await pool.request('GET', url + '/a')
+        second = await pool.request('PUT', url + '/b', json={'uris': []})
+        concurrent = await asyncio.gather(*[pool.request('GET', url + '/c') for _ in range(3)])
+        await pool.close()
+        server.close()
+        await server.wait_closed()
+        return first, second, concurrent
+
+    first, second, concurrent = run(requests())
+    assert first.json() == {'path': '/a', 'body': ''}
+    assert second.json() == {'path': '/b', 'body': '{"uris": []}'}
+    assert [response.status_code for response in concurrent] == [200, 200, 200]
+    assert peers[0] == peers[1]
+    assert len(set(peers)) == 3
+
+
+def test_session_timeouts(credentials):
+    expired = (401, {'error': {'status': 401, 'message': 'The access token expired'}})
+    pool = FakePool(
+        {
+            'https://api.spotify.com/v1/me/player/pause': [(204, None)],
+            'https://api.spotify.com/v1/me/player/devices': [expired],
+            'https://accounts.spotify.com/api/token': [(200, {'access_token': 'new', 'expires_in': 3600})],
+        }
+    )
+    client = AsyncSpotifyWebApiClient(AsyncSession(credentials, pool=pool, timeout=(2, 4), deadline=3))
+    run(client.pause())
+    assert pool.timeouts[0][0] == 2
+    assert 2.9 < pool.timeouts[0][1] <= 3
+
+    async def slow_request(*args, **kwargs):
+        await asyncio.sleep(0.06)
+        return await FakePool.request(pool, *args, **kwargs)
+
+    pool.request = slow_request
+    session = AsyncSession(credentials, pool=pool, deadline=0.05)
+    with pytest.raises(DeadlineExceeded):
+        run(session.get('https://api.spotify.com/v1/me/player/devices'))
+    assert len(pool.requests) == 2
+
+
+def test_connection_pool_read_timeout():
+    async def stalled():
+        async def handle(reader, writer):
+            await reader.readline()
+            await asyncio.sleep(0.3)
+            writer.close()
+
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        url = 'http://127.0.0.1:{}/'.format(server.sockets[0].getsockname()[1])
+        pool = AsyncConnectionPool()
+        try:
+            with pytest.raises(RequestTimeout):
+                await pool.request('GET', url, timeout=(1, 0.05))
+        finally:
+            await pool.close()
+            server.close()
+            await server.wait_closed()
+
+    run(stalled())
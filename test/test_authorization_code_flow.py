@@ -0,0 +1,107 @@
+import http.client
+import threading
+import time
+
+import pytest
+
+from spotify_web_api.authorization_code_flow import SetupWizard
+from spotify_web_api.credentials import CredentialStore, FileStore
+from spotify_web_api.server import HTTPServer, render_template
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CredentialStore(FileStore(str(tmp_path / 'credentials.json')))
+
+
+@pytest.fixture
+def wizard(requests_mock, store):
+    requests_mock.post(
+        'https://accounts.spotify.com/api/token',
+        json={'access_token': 'access_token', 'refresh_token': 'refresh_token', 'expires_in': 3600},
+    )
+    requests_mock.get(
+        'https://api.spotify.com/v1/me/player/devices',
+        json={'devices': [{'id': 'kitchen', 'name': 'Kitchen', 'type': 'Speaker'}]},
+    )
+    wizard = SetupWizard(default_device_id='kitchen', store=store)
+    server = HTTPServer(wizard.handle, port=0, host='127.0.0.1').start()
+    thread = threading.Thread(target=server.run, args=(lambda: wizard.done, 0.05))
+    thread.start()
+    wizard.port = server.port
+    yield wizard
+    wizard.done = True
+    thread.join()
+    server.close()
+
+
+def get(connection, method, path, body=None):
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'} if body else {}
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    return response, response.read().decode()
+
+
+def test_render_template():
+    page = ''.join(
+        render_template(
+            'setup.html',
+            redirect_uri='http://device:8080/auth-response/',
+            default_client_id='17c',
+            default_client_secret='',
+        )
+    )
+    assert page.startswith('<h1>Authenticate with Spotify</h1>')
+    assert 'add "http://device:8080/auth-response/" as a Redirect URI' in page
+    assert 'name="client_id" size="34" value="17c"' in page
+    assert '{' not in page
+
+
+def test_setup(wizard):
+    connection = http.client.HTTPConnection('127.0.0.1', wizard.port, timeout=5)
+    # A second connection the browser opened and never used
+    speculative = http.client.HTTPConnection('127.0.0.1', wizard.port, timeout=5)
+    speculative.connect()
+
+    response, page = get(connection, 'GET', '/')
+    redirect_uri = 'http://127.0.0.1:{}/auth-response/'.format(wizard.port)
+    assert '"{}"'.format(redirect_uri) in page
+
+    response, _ = get(connection, 'POST', '/auth-request', 'client_id=17c&client_secret=29f')
+    assert response.status == 302
+    assert response.getheader('Location').startswith('https://accounts.spotify.com/authorize?client_id=17c')
+
+    response, _ = get(connection, 'GET', '/auth-response/?code=AQD')
+    assert response.getheader('Location') == '/devices'
+    for _ in range(50):
+        response, page = get(connection, 'GET', '/devices')
+        if 'Looking up' not in page:
+            break
+        time.sleep(0.05)
+    assert '<input type="radio" name="device_id" value="kitchen" checked> Kitchen<br>' in page
+
+    response, page = get(connection, 'POST', '/select-device', 'device_id=kitchen')
+    assert 'Setup completed successfully!' in page
+    assert wizard.done
+    assert wizard.client.session.device_id == 'kitchen'
+    speculative.close()
+
+    credentials = wizard.client.session.credentials
+    assert credentials['refresh_token'] == 'refresh_token'
+    assert credentials['client_secret'] == '29f'
+    assert credentials['device_id'] == 'kitchen'
+
+
+def test_failed_token_exchange(wizard, requests_mock):
+    requests_mock.post('https://accounts.spotify.com/api/token', status_code=400, json={'error': 'invalid_grant'})
+    connection = http.client.HTTPConnection('127.0.0.1', wizard.port, timeout=5)
+    get(connection, 'POST', '/auth-request', 'client_id=17c&client_secret=29f')
+    get(connection, 'GET', '/auth-response/?code=AQD')
+    for _ in range(50):
+        response, page = get(connection, 'GET', '/devices')
+        if 'Looking up' not in page:
+            break
+        time.sleep(0.05)
+    assert response.status == 502
+    assert 'Start over' in page
+    assert not wizard.done
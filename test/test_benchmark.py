@@ -0,0 +1,81 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmark'))
+
+from fake_spotify import FakeSpotifyServer  # noqa: E402
+from run import format_results, LocalPool, make_pool, run  # noqa: E402
+
+from spotify_web_api import Session, SpotifyWebApiClient  # noqa: E402
+from spotify_web_api.retry import RetryPolicy  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    server = FakeSpotifyServer(playlist_size=250).start()
+    yield server
+    server.stop()
+
+
+@pytest.mark.parametrize('pool', ['connection', 'requests'])
+def test_benchmark_runs(server, pool):
+    results = run(server.url, pool, iterations=2)
+    assert set(results) == {
+        'devices',
+        'play',
+        'pause',
+        'next',
+        'volume',
+        'playback_state',
+        'tracks',
+        'playlist_tracks',
+        'refresh',
+    }
+    assert all(result['calls_per_second'] > 0 for result in results.values())
+    assert 'playlist_tracks' in format_results(results)
+
+
+def test_injected_errors_are_handled(server, credentials):
+    server.error_rate = 0.1
+    session = Session(
+        dict(credentials, access_token='access_token_0'),
+        pool=LocalPool(make_pool('connection'), server.url),
+        retry_policy=RetryPolicy(max_attempts=10, statuses=(429, 503), sleep=lambda seconds: None),
+    )
+    tracks = list(SpotifyWebApiClient(session).playlist_tracks('benchmark', limit=10))
+    assert len(tracks) == 250
+    session.pool.close()
+
+
+def test_boot_benchmark_keeps_the_button_path_lean():
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmark', 'boot_bench.py')
+    output = subprocess.check_output([sys.executable, script, '--json'])
+    results = dict((result['step'], result) for result in json.loads(output.decode()))
+    assert list(results)[0] == 'import spotify_web_api'
+    # spotify_web_api, clock, connection, ratelimit, urls, buttons and histogram
+    assert results['first command']['modules'] == 7
+    assert results['render setup page']['modules'] == 11
+
+
+def test_lazy_names():
+    import spotify_web_api
+    from spotify_web_api import models, urls
+
+    assert spotify_web_api.Track is models.Track
+    assert spotify_web_api.parse_qs is urls.parse_qs
+    with pytest.raises(AttributeError):
+        spotify_web_api.NotAName
+
+
+@pytest.mark.parametrize('queue', [False, True])
+def test_control_benchmark_runs(queue):
+    from control_bench import format_results as format_control_results, run as run_control
+
+    results = run_control(connections=2, requests=10, queue=queue)
+    assert set(results) == {'status', 'pause', 'volume'}
+    assert all(result['errors'] == 0 and result['requests'] == 10 for result in results.values())
+    assert 'requests/s' in format_control_results(results)
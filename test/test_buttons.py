@@ -0,0 +1,209 @@
+import pytest
+
+from spotify_web_api import Session, SpotifyWebApiClient, SpotifyWebApiError
+from spotify_web_api.buttons import Buttons, DOUBLE, LONG, SINGLE
+
+
+class FakePin:
+    IRQ_FALLING = 1
+    IRQ_RISING = 2
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.level = 1
+        self.handler = None
+        self.trigger = None
+
+    def value(self):
+        return self.level
+
+    def irq(self, handler, trigger):
+        self.handler = handler
+        self.trigger = trigger
+
+    def set(self, level):
+        if level != self.level:
+            self.level = level
+            self.handler(self)
+
+    def bounce(self, level, times=3):
+        for _ in range(times):
+            self.set(1 - level)
+            self.set(level)
+
+
+class Rig:
+    def __init__(self, clock, actions=(SINGLE, DOUBLE, LONG), on_error=None):
+        self.clock = clock
+        self.pin = FakePin(self.clock)
+        self.calls = []
+        self.buttons = Buttons(on_error=on_error, clock=self.clock, idle=self.idle)
+        self.button = self.buttons.add(
+            self.pin, dict((gesture, self.action(gesture)) for gesture in actions), debounce=0.02
+        )
+        self.idled = []
+
+    def action(self, gesture):
+        return lambda: self.calls.append(gesture)
+
+    def idle(self, seconds, light_sleep):
+        self.idled.append(seconds)
+        self.clock.now += seconds
+
+    def advance(self, seconds, step=0.01):
+        end = self.clock.now + seconds
+        while self.clock.now < end - 1e-9:
+            self.clock.now += step
+            self.buttons.process()
+
+    def press(self, hold=0.05):
+        self.pin.bounce(0)
+        self.advance(hold)
+        self.pin.bounce(1)
+
+
+def test_irq_on_both_edges(clock):
+    rig = Rig(clock)
+    assert rig.pin.trigger == FakePin.IRQ_FALLING | FakePin.IRQ_RISING
+    assert not rig.button.pressed
+    assert rig.buttons.idle
+
+
+def test_single_press(clock):
+    rig = Rig(clock)
+    rig.press()
+    rig.advance(0.2)
+    assert rig.calls == []
+    rig.advance(0.2)
+    assert rig.calls == [SINGLE]
+    assert rig.buttons.idle
+
+
+def test_single_fires_on_press_without_other_gestures(clock):
+    rig = Rig(clock, actions=(SINGLE,))
+    rig.pin.bounce(0)
+    rig.advance(0.03)
+    assert rig.calls == [SINGLE]
+    rig.advance(1)
+    rig.pin.bounce(1)
+    rig.advance(1)
+    assert rig.calls == [SINGLE]
+
+
+def test_single_fires_on_release_without_double(clock):
+    rig = Rig(clock, actions=(SINGLE, LONG))
+    rig.press()
+    rig.advance(0.03)
+    assert rig.calls == [SINGLE]
+
+
+def test_double_press(clock):
+    rig = Rig(clock)
+    rig.press()
+    rig.advance(0.1)
+    rig.press()
+    rig.advance(1)
+    assert rig.calls == [DOUBLE]
+
+
+def test_long_press(clock):
+    rig = Rig(clock)
+    rig.pin.bounce(0)
+    rig.advance(0.7)
+    assert rig.calls == []
+    rig.advance(0.2)
+    assert rig.calls == [LONG]
+    rig.advance(2)
+    rig.pin.bounce(1)
+    rig.advance(1)
+    assert rig.calls == [LONG]
+
+
+def test_bounce_shorter_than_debounce_is_ignored(clock):
+    rig = Rig(clock)
+    rig.pin.set(0)
+    rig.pin.set(1)
+    rig.advance(1)
+    assert rig.calls == []
+    assert rig.buttons.idle
+
+
+def test_several_buttons(clock):
+    rig = Rig(clock, actions=(SINGLE,))
+    other = FakePin(rig.clock)
+    rig.buttons.add(other, {SINGLE: rig.action('other')}, debounce=0.02)
+    other.bounce(0)
+    rig.pin.bounce(0)
+    rig.advance(0.03)
+    assert sorted(rig.calls) == ['other', SINGLE]
+    assert rig.buttons.stats()['gestures'] == 2
+
+
+def test_wait_returns_on_edge_or_deadline(clock):
+    rig = Rig(clock)
+    rig.buttons.wait(5)
+    assert rig.clock.now == pytest.approx(5)
+
+    rig.pin.set(0)
+    rig.buttons.wait(5)
+    assert rig.clock.now == pytest.approx(5)
+    rig.buttons.process()
+
+    # The debounce timer is due
+    rig.buttons.wait(5)
+    assert rig.clock.now == pytest.approx(5.02)
+    rig.buttons.process()
+
+    # The long press is due
+    rig.buttons.wait(5)
+    assert rig.clock.now == pytest.approx(5.8)
+    rig.buttons.process()
+    assert rig.calls == [LONG]
+
+
+def test_press_to_request_latency(requests_mock, clock, credentials):
+    requests_mock.put('https://api.spotify.com/v1/me/player/pause', status_code=204)
+    client = SpotifyWebApiClient(Session(dict(credentials, device_id='kitchen')))
+    rig = Rig(clock, actions=(SINGLE,))
+    rig.buttons.buttons[0].actions[SINGLE] = client.pause
+    client.session.add_hook('request', rig.buttons.on_request)
+    rig.pin.bounce(0)
+    rig.advance(0.05)
+    assert requests_mock.call_count == 1
+    assert rig.buttons.last_latency == pytest.approx(0.02, abs=0.011)
+    latency = rig.buttons.stats()['latency']
+    assert latency['count'] == 1
+    assert latency['p50'] == 0.025
+
+    # Requests without a gesture are not counted
+    client.pause()
+    assert rig.buttons.stats()['latency']['count'] == 1
+
+
+def test_errors(clock):
+    errors = []
+    rig = Rig(clock, actions=(SINGLE,), on_error=errors.append)
+
+    def fail():
+        raise SpotifyWebApiError('No device', 404, 'NO_ACTIVE_DEVICE')
+
+    rig.buttons.buttons[0].actions[SINGLE] = fail
+    rig.pin.bounce(0)
+    rig.advance(0.05)
+    assert len(errors) == 1
+    assert rig.buttons.last_latency is None
+
+
+def test_light_sleep_picks_up_presses_without_irq(clock):
+    rig = Rig(clock)
+    rig.buttons.light_sleep = True
+    # The pin changes while asleep, the wake source ends the sleep
+    rig.pin.level = 0
+    rig.buttons.wait(5)
+    assert not rig.buttons.idle
+    rig.advance(1)
+    assert rig.calls == [LONG]
+    rig.pin.level = 1
+    rig.buttons.wait(5)
+    rig.advance(0.05)
+    assert rig.button.idle
@@ -0,0 +1,75 @@
+import pytest
+
+from spotify_web_api import Session, SpotifyWebApiClient
+from spotify_web_api.cache import ResponseCache
+
+DEVICES_URL = 'https://api.spotify.com/v1/me/player/devices'
+PLAYER_URL = 'https://api.spotify.com/v1/me/player'
+
+
+def test_fresh_response_is_served_from_cache(requests_mock, credentials):
+    requests_mock.get(PLAYER_URL, json={'is_playing': True})
+    spotify = Session(credentials, cache=ResponseCache(ttl=10))
+    first = spotify.get(PLAYER_URL)
+    assert spotify.get(PLAYER_URL) is first
+    assert requests_mock.call_count == 1
+    assert spotify.cache.hits == 1
+
+
+def test_etag_revalidation(requests_mock, credentials):
+    requests_mock.get(
+        PLAYER_URL,
+        [
+            {'json': {'is_playing': True}, 'headers': {'ETag': '"v1"'}},
+            {'status_code': 304},
+        ],
+    )
+    spotify = Session(credentials, cache=ResponseCache(ttl=0))
+    first = spotify.get(PLAYER_URL)
+    assert 'If-None-Match' not in requests_mock.last_request.headers
+    assert spotify.get(PLAYER_URL) is first
+    assert requests_mock.last_request.headers['If-None-Match'] == '"v1"'
+    assert spotify.cache.revalidations == 1
+
+
+def test_per_endpoint_ttl(requests_mock, credentials):
+    requests_mock.get(PLAYER_URL, json={'is_playing': True})
+    requests_mock.get(DEVICES_URL, json={'devices': []})
+    spotify = Session(credentials, cache=ResponseCache(ttl=None, ttls={DEVICES_URL: 60}))
+    spotify.get(PLAYER_URL)
+    spotify.get(PLAYER_URL)
+    spotify.get(DEVICES_URL)
+    spotify.get(DEVICES_URL)
+    assert [request.url for request in requests_mock.request_history] == [PLAYER_URL, PLAYER_URL, DEVICES_URL]
+
+
+def test_streamed_items_are_cached(requests_mock, credentials):
+    requests_mock.get(DEVICES_URL, json={'devices': [{'id': 'a', 'name': 'Kitchen'}]}, headers={'ETag': '"d1"'})
+    client = SpotifyWebApiClient(Session(credentials, cache=ResponseCache(ttls={DEVICES_URL: 60})))
+    assert [device.name for device in client.devices()] == ['Kitchen']
+    assert [device.name for device in client.devices()] == ['Kitchen']
+    assert requests_mock.call_count == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2, ttl=60)
+    cache.store('a', 'a', None, 1)
+    cache.store('b', 'b', None, 2)
+    cache.lookup('a')
+    cache.store('c', 'c', None, 3)
+    assert cache.lookup('b') is None
+    assert cache.lookup('a').value == 1
+    assert cache.lookup('c').value == 3
+
+
+@pytest.mark.parametrize('ttl', [0, 60])
+def test_persisted_entries_are_revalidated(tmp_path, requests_mock, ttl, credentials):
+    path = str(tmp_path / 'cache.json')
+    cache = ResponseCache(ttl=ttl, path=path)
+    cache.store(PLAYER_URL, PLAYER_URL, '"v1"', {'is_playing': False})
+    cache.save()
+
+    requests_mock.get(PLAYER_URL, status_code=304)
+    spotify = Session(credentials, cache=ResponseCache(ttl=ttl, path=path))
+    assert spotify.get(PLAYER_URL) == {'is_playing': False}
+    assert requests_mock.last_request.headers['If-None-Match'] == '"v1"'
@@ -0,0 +1,102 @@
+import pytest
+
+from spotify_web_api import connection, ratelimit, watcher
+from spotify_web_api.connection import Deadline, DeadlineExceeded
+from spotify_web_api.ratelimit import RequestScheduler, TokenBucket
+from spotify_web_api.watcher import PlaybackWatcher
+
+# time.ticks_ms on MicroPython
+PERIOD = 2 ** 30
+
+
+def ticks_diff(a, b):
+    return (a - b + PERIOD // 2) % PERIOD - PERIOD // 2
+
+
+def elapsed(now, then):
+    return ticks_diff(now, then) / 1000
+
+
+def later(then, seconds):
+    return (then + int(seconds * 1000)) % PERIOD
+
+
+class TicksClock:
+    def __init__(self, before_wrap=1):
+        self.now = PERIOD - int(before_wrap * 1000)
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now = later(self.now, seconds)
+
+
+# Uses the MicroPython clock helpers in the modules under test
+@pytest.fixture
+def ticks(monkeypatch):
+    for module in (connection, ratelimit, watcher):
+        monkeypatch.setattr(module, 'elapsed', elapsed, raising=False)
+        monkeypatch.setattr(module, 'later', later, raising=False)
+    return TicksClock()
+
+
+def test_token_bucket_across_wrap(ticks):
+    bucket = TokenBucket(rate=2, capacity=2, clock=ticks)
+    bucket.take()
+    bucket.take()
+    assert bucket.delay() == 0.5
+    ticks.sleep(2)
+    assert ticks.now < 2000
+    assert bucket.delay() == 0
+    assert bucket.tokens == 2
+
+
+def test_token_bucket_idle_longer_than_half_the_period(ticks):
+    bucket = TokenBucket(rate=2, capacity=2, clock=ticks)
+    bucket.take()
+    bucket.take()
+    ticks.now = later(ticks.now, PERIOD / 1000 * 0.75)
+    assert bucket.delay() == 0
+
+
+def test_scheduler_pause_across_wrap(ticks):
+    scheduler = RequestScheduler(rate=100, burst=10, clock=ticks, sleep=ticks.sleep)
+    scheduler.pause(3)
+    start = ticks.now
+    scheduler.acquire()
+    assert 3 <= elapsed(ticks.now, start) < 3.1
+    assert scheduler.paused_until is None
+    start = ticks.now
+    scheduler.acquire()
+    assert ticks.now == start
+
+
+class FakeClient:
+    def playback_state(self):
+        return None
+
+
+def test_watcher_polls_across_wrap(ticks):
+    playback_watcher = PlaybackWatcher(FakeClient(), inactive_interval=60, clock=ticks, sleep=ticks.sleep)
+    playback_watcher.poll()
+    assert playback_watcher.poll_if_due() == []
+    assert playback_watcher.polls == 1
+    ticks.sleep(59)
+    playback_watcher.poll_if_due()
+    assert playback_watcher.polls == 1
+    ticks.sleep(1)
+    playback_watcher.poll_if_due()
+    assert playback_watcher.polls == 2
+    playback_watcher.poll_soon(0.5)
+    assert playback_watcher.due_in() == 0.5
+
+
+def test_deadline_across_wrap(ticks):
+    deadline = Deadline((5, 10), 3, clock=ticks)
+    assert deadline.timeout() == (3, 3)
+    ticks.sleep(2)
+    assert deadline.timeout() == (1, 1)
+    ticks.sleep(1)
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout()
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from spotify_web_api import SpotifyWebApiError
+from spotify_web_api.commands import CommandQueue
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    def play(self, uris=None, body=None):
+        self.calls.append(('play', uris))
+
+    def pause(self):
+        self.calls.append(('pause', None))
+
+    def next(self):
+        self.calls.append(('next', None))
+
+    def volume(self, volume_percent):
+        if volume_percent > 100:
+            raise SpotifyWebApiError('Invalid volume', 400)
+        self.calls.append(('volume', volume_percent))
+
+
+def queue(clock, **kwargs):
+    client = FakeClient()
+    return CommandQueue(client, debounce=0.1, max_delay=0.5, clock=clock, **kwargs), client
+
+
+def test_superseded_commands_are_dropped(clock):
+    commands, client = queue(clock)
+    commands.play(uris=['a'])
+    commands.pause()
+    commands.play(uris=['b'])
+    assert commands.run_pending() == 0
+    clock.now += 0.1
+    assert commands.run_pending() == 1
+    assert client.calls == [('play', ['b'])]
+    assert commands.stats() == {'sent': 1, 'dropped': 2, 'pending': 0}
+
+
+def test_order_is_kept_and_volume_merged(clock):
+    commands, client = queue(clock)
+    commands.volume(10)
+    commands.next()
+    commands.volume(30)
+    commands.pause()
+    clock.now += 0.1
+    commands.run_pending()
+    assert client.calls == [('next', None), ('volume', 30), ('pause', None)]
+
+
+def test_latency_is_bounded(clock):
+    commands, client = queue(clock)
+    for _ in range(10):
+        commands.volume(clock.now * 100)
+        clock.now += 0.0625
+        commands.run_pending()
+    assert client.calls == [('volume', 43.75)]
+    assert commands.pending == 1
+
+
+def test_errors(clock):
+    commands, client = queue(clock)
+    commands.volume(200)
+    commands.next()
+    clock.now += 0.1
+    commands.run_pending()
+    assert commands.error.status == 400
+    assert client.calls == [('next', None)]
+    with pytest.raises(AttributeError):
+        commands.rewind()
+
+
+def test_thread():
+    client = FakeClient()
+    commands = CommandQueue(client, debounce=0.01)
+    commands.start()
+    commands.pause()
+    commands.play(uris=['a'])
+    deadline = time.time() + 2
+    while not client.calls and time.time() < deadline:
+        time.sleep(0.01)
+    assert client.calls == [('play', ['a'])]
@@ -0,0 +1,225 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import requests
+
+from spotify_web_api import Session
+from spotify_web_api.connection import (
+    ConnectionPool,
+    Deadline,
+    default_pool,
+    DeadlineExceeded,
+    Headers,
+    request_head,
+    RequestsPool,
+    RequestTimeout,
+    split_url,
+)
+from spotify_web_api.retry import RetryPolicy
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.peers.append(self.client_address)
+        if self.path == '/chunked':
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for chunk in (b'{"devices": ', b'[]}'):
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write(b'0\r\n\r\n')
+            return
+        if self.path == '/slow':
+            time.sleep(0.5)
+        body = json.dumps({'path': self.path}).encode()
+        self.send_response(200)
+        self.send_header('ETag', '"etag"')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.path == '/drop':
+            self.close_connection = True
+
+    def do_PUT(self):
+        self.server.peers.append(self.client_address)
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.bodies.append(body)
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.peers = []
+    httpd.bodies = []
+    # Timed out clients hang up before the response is written
+    httpd.handle_error = lambda request, client_address: None
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url(server, path):
+    return 'http://127.0.0.1:{}{}'.format(server.server_address[1], path)
+
+
+def test_split_url():
+    assert split_url('https://api.spotify.com/v1/me?x=1') == (True, 'api.spotify.com', 443, '/v1/me?x=1')
+    assert split_url('http://localhost:8080') == (False, 'localhost', 8080, '/')
+
+
+def test_connection_is_reused(server):
+    pool = ConnectionPool()
+    assert pool.request('GET', url(server, '/a')).json() == {'path': '/a'}
+    assert pool.request('GET', url(server, '/b')).json() == {'path': '/b'}
+    pool.request('PUT', url(server, '/c'), json={'uris': []})
+    assert len(set(server.peers)) == 1
+    assert server.bodies == [b'{"uris": []}']
+    pool.close()
+
+
+def test_idle_connection_is_not_reused(server):
+    pool = ConnectionPool(idle_timeout=-1)
+    pool.request('GET', url(server, '/a'))
+    pool.request('GET', url(server, '/b'))
+    assert len(set(server.peers)) == 2
+    pool.close()
+
+
+def test_reconnect_on_dropped_connection(server):
+    pool = ConnectionPool()
+    pool.request('GET', url(server, '/drop'))
+    assert pool.request('GET', url(server, '/b')).json() == {'path': '/b'}
+    assert len(set(server.peers)) == 2
+    pool.close()
+
+
+def test_pool_size_limits_idle_connections(server):
+    pool = ConnectionPool(size=1)
+    first = pool._acquire(False, '127.0.0.1', server.server_address[1])
+    second = pool._acquire(False, '127.0.0.1', server.server_address[1])
+    first.request('GET', '/a')
+    second.request('GET', '/b')
+    pool._release(first)
+    pool._release(second)
+    assert not second.connected
+    assert len(pool._idle[(False, '127.0.0.1', server.server_address[1])]) == 1
+    pool.close()
+
+
+def test_chunked_response(server):
+    pool = ConnectionPool()
+    assert pool.request('GET', url(server, '/chunked')).json() == {'devices': []}
+    assert pool.request('GET', url(server, '/b')).json() == {'path': '/b'}
+    assert len(set(server.peers)) == 1
+    pool.close()
+
+
+def test_session_shares_pool(requests_mock, credentials):
+    requests_mock.put('https://api.spotify.com/v1/me/player/pause', status_code=204)
+    session = Session(credentials)
+    assert isinstance(session.pool, RequestsPool)
+    requests_session = session.pool._session
+    session.put('https://api.spotify.com/v1/me/player/pause')
+    session.put('https://api.spotify.com/v1/me/player/pause')
+    assert session.pool._session is requests_session
+    assert requests_mock.call_count == 2
+
+
+def test_streamed_response(server):
+    pool = ConnectionPool()
+    response = pool.request('GET', url(server, '/chunked'), stream=True)
+    assert b''.join(response.iter_content()) == b'{"devices": []}'
+    pool.request('GET', url(server, '/a'))
+    assert len(set(server.peers)) == 1
+
+    response = pool.request('GET', url(server, '/a'), stream=True)
+    response.close()
+    assert pool.request('GET', url(server, '/b')).json() == {'path': '/b'}
+    assert len(set(server.peers)) == 2
+    pool.close()
+
+
+def test_read_timeout(server):
+    pool = ConnectionPool()
+    with pytest.raises(RequestTimeout):
+        pool.request('GET', url(server, '/slow'), timeout=(1, 0.1))
+    assert pool.request('GET', url(server, '/a'), timeout=1).json() == {'path': '/a'}
+    pool.close()
+
+
+def test_requests_pool_timeout(server):
+    pool = RequestsPool()
+    with pytest.raises(RequestTimeout):
+        pool.request('GET', url(server, '/slow'), timeout=0.1)
+    pool.close()
+
+
+def test_deadline_shortens_timeout():
+    now = [0.0]
+    deadline = Deadline((5, 10), 7, clock=lambda: now[0])
+    assert deadline.timeout() == (5, 7)
+    now[0] = 6.5
+    assert deadline.timeout() == (0.5, 0.5)
+    now[0] = 7
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout()
+    assert Deadline(3).timeout() == 3
+
+
+def test_session_timeout_is_passed_to_pool(requests_mock, credentials):
+    requests_mock.put('https://api.spotify.com/v1/me/player/pause', status_code=204)
+    Session(credentials, timeout=(2, 3), deadline=None).put('https://api.spotify.com/v1/me/player/pause')
+    assert requests_mock.last_request.timeout == (2, 3)
+
+
+def test_session_timeout_is_not_retried_past_deadline(requests_mock, credentials):
+    requests_mock.get('https://api.spotify.com/v1/me/player/devices', exc=requests.exceptions.ReadTimeout)
+    retry_policy = RetryPolicy(max_attempts=10, backoff=0.05, jitter=False, deadline=60)
+    session = Session(credentials, retry_policy=retry_policy, deadline=0.2)
+    with pytest.raises(RequestTimeout):
+        session.get('https://api.spotify.com/v1/me/player/devices')
+    assert 1 < requests_mock.call_count < 10
+
+
+def test_token_refresh_has_timeout(requests_mock, credentials):
+    requests_mock.post('https://accounts.spotify.com/api/token', exc=requests.exceptions.ConnectTimeout)
+    expiring = Session(credentials)
+    expiring.credentials['expires_at'] = 0
+    with pytest.raises(RequestTimeout):
+        expiring.put('https://api.spotify.com/v1/me/player/pause')
+
+
+def test_request_head_with_encoded_headers():
+    headers = Headers()
+    headers['Authorization'] = 'Bearer token'
+    expected = b'PUT /a HTTP/1.1\r\nHost: h\r\nContent-Length: 2\r\nAuthorization: Bearer token\r\n\r\n'
+    assert request_head('PUT', '/a', 'h', headers, b'{}') == expected
+    assert request_head('PUT', '/a', 'h', dict(headers), b'{}') == expected
+    assert headers.encoded() is headers.encoded()
+
+
+def test_only_known_response_headers_are_kept(server):
+    pool = ConnectionPool()
+    response = pool.request('GET', url(server, '/a'))
+    assert response.headers == {'content-length': '14', 'etag': '"etag"'}
+    pool.close()
+
+
+def test_default_pool_backend():
+    assert isinstance(default_pool(), RequestsPool)
+    assert isinstance(default_pool(backend='socket'), ConnectionPool)
+    with pytest.raises(ValueError):
+        default_pool(backend='curl')
@@ -0,0 +1,157 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from spotify_web_api import Session, SpotifyWebApiClient
+from spotify_web_api.commands import CommandQueue
+from spotify_web_api.control import ControlServer
+from spotify_web_api.watcher import PlaybackWatcher
+
+PLAYER_URL = 'https://api.spotify.com/v1/me/player'
+
+STATE = {
+    'device': {'id': 'kitchen', 'name': 'Kitchen', 'type': 'Speaker', 'volume_percent': 30},
+    'context': {'uri': 'spotify:album:1'},
+    'is_playing': True,
+    'progress_ms': 1000,
+    'repeat_state': 'off',
+    'shuffle_state': False,
+    'item': {
+        'id': 'track1',
+        'name': 'Seagulls',
+        'uri': 'spotify:track:track1',
+        'duration_ms': 200000,
+        'artists': [{'name': 'Jim Henson'}],
+    },
+}
+
+
+@pytest.fixture
+def client(credentials):
+    return SpotifyWebApiClient(Session(dict(credentials, device_id='kitchen')))
+
+
+def start(control):
+    control.start()
+    stopped = []
+    thread = threading.Thread(target=control.run, args=(lambda: stopped, 0.05))
+    thread.start()
+
+    def stop():
+        stopped.append(True)
+        thread.join()
+        control.close()
+
+    return stop
+
+
+@pytest.fixture
+def control(client):
+    control = ControlServer(client, port=0, host='127.0.0.1', token=None)
+    stop = start(control)
+    yield control
+    stop()
+
+
+def call(control, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection('127.0.0.1', control.server.port, timeout=5)
+    connection.request(method, path, body=body, headers=headers or {})
+    response = connection.getresponse()
+    content = response.read()
+    connection.close()
+    return response.status, json.loads(content.decode()) if content else None
+
+
+def test_status_from_the_watcher(requests_mock, client):
+    requests_mock.get(PLAYER_URL, json=STATE)
+    watcher = PlaybackWatcher(client)
+    control = ControlServer(client, watcher=watcher, port=0, host='127.0.0.1')
+    assert control.status() == {'polled': False}
+    watcher.poll()
+    stop = start(control)
+    try:
+        for _ in range(3):
+            status, body = call(control, 'GET', '/status')
+    finally:
+        stop()
+    assert status == 200
+    assert requests_mock.call_count == 1
+    assert body['is_playing'] is True
+    assert body['progress_ms'] >= 1000
+    assert body['track'] == {
+        'id': 'track1',
+        'name': 'Seagulls',
+        'uri': 'spotify:track:track1',
+        'duration_ms': 200000,
+        'artists': ['Jim Henson'],
+    }
+    assert body['device']['volume_percent'] == 30
+    assert body['context_uri'] == 'spotify:album:1'
+
+
+def test_commands(requests_mock, control):
+    requests_mock.put(PLAYER_URL + '/pause', status_code=204)
+    requests_mock.put(PLAYER_URL + '/volume', status_code=204)
+    requests_mock.put(PLAYER_URL + '/play', status_code=204)
+    requests_mock.put(PLAYER_URL, status_code=204)
+
+    assert call(control, 'POST', '/pause') == (204, None)
+    assert call(control, 'PUT', '/volume?volume_percent=40') == (204, None)
+    form = {'Content-Type': 'application/x-www-form-urlencoded'}
+    assert call(control, 'POST', '/volume', 'value=50', form) == (204, None)
+    assert call(control, 'POST', '/play', json.dumps({'context_uri': 'spotify:album:1'})) == (204, None)
+    assert call(control, 'POST', '/transfer_playback?device_id=garden&play=true') == (204, None)
+
+    history = requests_mock.request_history
+    assert [request.qs.get('volume_percent') for request in history[1:3]] == [['40'], ['50']]
+    assert history[3].json() == {'context_uri': 'spotify:album:1'}
+    assert history[4].json() == {'device_ids': ['garden'], 'play': True}
+
+
+def test_invalid_commands(control):
+    assert call(control, 'GET', '/pause')[0] == 405
+    assert call(control, 'POST', '/volume')[0] == 400
+    assert call(control, 'POST', '/volume?volume_percent=loud')[0] == 400
+    assert call(control, 'POST', '/explode')[0] == 404
+
+
+def test_spotify_error(requests_mock, control):
+    requests_mock.put(PLAYER_URL + '/pause', status_code=404, json={'error': {'status': 404, 'message': 'No device'}})
+    status, body = call(control, 'POST', '/pause')
+    assert status == 502
+    assert body['status'] == 404
+    assert control.errors == 1
+
+
+def test_queued_toggle(requests_mock, client):
+    requests_mock.get(PLAYER_URL, json=STATE)
+    requests_mock.put(PLAYER_URL + '/pause', status_code=204)
+    watcher = PlaybackWatcher(client)
+    watcher.poll()
+    commands = CommandQueue(client, debounce=0.01)
+    control = ControlServer(client, commands=commands, watcher=watcher, port=0, host='127.0.0.1')
+    stop = start(control)
+    try:
+        assert call(control, 'POST', '/toggle') == (202, {'command': 'pause', 'queued': True})
+        for _ in range(100):
+            if commands.sent:
+                break
+            threading.Event().wait(0.01)
+    finally:
+        stop()
+    assert commands.sent == 1
+    assert requests_mock.request_history[1].method == 'PUT'
+
+
+def test_token(client):
+    control = ControlServer(client, port=0, host='127.0.0.1', token='secret')
+    stop = start(control)
+    try:
+        assert call(control, 'GET', '/stats')[0] == 401
+        status, body = call(control, 'GET', '/stats', headers={'Authorization': 'Bearer secret'})
+    finally:
+        stop()
+    assert status == 200
+    assert body['server']['requests'] == 2
@@ -1,6 +1,12 @@
+import json
 import os
+import time
 
-from spotify_web_api import load_credentials
+import pytest
+
+from spotify_web_api import authorization_code_flow, load_credentials, Session, spotify_client, SpotifyWebApiClient
+from spotify_web_api.connection import ConnectionPool
+from spotify_web_api.credentials import CredentialStore, EnvironStore, FileStore, KeyValueStore, MemoryStore
 
 
 def test_device_id_can_be_none(tmp_path):
@@ -19,3 +25,169 @@ def test_device_id_can_be_none(tmp_path):
     credentials = load_credentials()
     assert credentials['device_id'] is None
 
+
+# Credentials as they are saved after the setup
+@pytest.fixture
+def stored(credentials):
+    return dict(credentials, expires_at=time.time() + 3600, device_id='device_id')
+
+
+# esp32.NVS without the flash
+class FakeNVS:
+    def __init__(self):
+        self.values = {}
+        self.writes = []
+        self.commits = 0
+
+    def set_blob(self, key, value):
+        self.values[key] = bytes(value)
+        self.writes.append(key)
+
+    def get_blob(self, key, buffer):
+        if key not in self.values:
+            raise OSError(2)
+        value = self.values[key]
+        buffer[: len(value)] = value
+        return len(value)
+
+    def erase_key(self, key):
+        if key not in self.values:
+            raise OSError(2)
+        del self.values[key]
+        self.writes.append(key)
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_file_store_replaces_the_file(tmp_path, stored):
+    path = str(tmp_path / 'credentials.json')
+    store = FileStore(path)
+    store.save(stored)
+    store.save(dict(stored, refresh_token='rotated'))
+    assert store.load()['refresh_token'] == 'rotated'
+    assert os.listdir(str(tmp_path)) == ['credentials.json']
+
+
+def test_file_store_recovers_the_new_file(tmp_path, stored):
+    # A power cut after the old file was removed but before the rename
+    path = str(tmp_path / 'credentials.json')
+    with open(path + '.tmp', 'w') as f:
+        f.write(json.dumps(stored))
+    assert FileStore(path).load() == stored
+
+
+def test_load_credentials_without_access_token(tmp_path):
+    path = str(tmp_path / 'credentials.json')
+    FileStore(path).save(dict(refresh_token='r', client_id='c', client_secret='s', device_id=None))
+    credentials = load_credentials(path)
+    assert credentials['access_token'] == ''
+    assert credentials['expires_at'] == 0
+
+
+def test_load_credentials_incomplete(tmp_path):
+    path = str(tmp_path / 'credentials.json')
+    FileStore(path).save(dict(refresh_token='r', client_id='c', device_id=None))
+    assert load_credentials(path) is None
+
+
+def test_unchanged_credentials_are_not_written(tmp_path, stored):
+    path = str(tmp_path / 'credentials.json')
+    FileStore(path).save(stored)
+    store = CredentialStore(FileStore(path))
+    credentials = store.load()
+    credentials['access_token'] = 'new access token'
+    assert not store.save(credentials)
+    credentials['refresh_token'] = 'rotated'
+    assert store.save(credentials)
+    assert store.stats() == {'writes': 1, 'skipped': 1, 'dirty': False}
+    assert FileStore(path).load()['refresh_token'] == 'rotated'
+
+
+def test_deferred_flush(clock, stored):
+    nvs = FakeNVS()
+    store = CredentialStore(KeyValueStore(nvs), flush_delay=5, clock=clock)
+    store.save(dict(stored))
+    clock.now = 3
+    store.save(dict(stored, refresh_token='rotated'))
+    assert store.dirty
+    assert not store.flush_if_due()
+    clock.now = 5
+    assert store.flush_if_due()
+    assert not store.dirty
+    assert nvs.values['refresh_token'] == b'rotated'
+    assert store.writes == 1
+
+
+def test_key_value_store_writes_changed_values(stored):
+    nvs = FakeNVS()
+    store = KeyValueStore(nvs)
+    store.save(stored)
+    assert sorted(nvs.writes) == ['client_id', 'client_secret', 'device_id', 'refresh_token']
+    del nvs.writes[:]
+
+    store.save(dict(stored, refresh_token='rotated', device_id=None))
+    assert sorted(nvs.writes) == ['device_id', 'refresh_token']
+    assert nvs.commits == 2
+
+    loaded = KeyValueStore(nvs).load()
+    assert loaded == dict(refresh_token='rotated', client_id='client_id', client_secret='client_secret', device_id=None)
+
+
+def test_environ_store():
+    environ = {
+        'KITCHEN_REFRESH_TOKEN': 'refresh_token',
+        'KITCHEN_CLIENT_ID': 'client_id',
+        'KITCHEN_CLIENT_SECRET': 'client_secret',
+    }
+    store = CredentialStore(EnvironStore('KITCHEN_', environ))
+    credentials = store.load()
+    assert credentials['device_id'] is None
+    credentials['refresh_token'] = 'rotated'
+    store.save(credentials)
+    assert environ['KITCHEN_REFRESH_TOKEN'] == 'rotated'
+
+
+def test_session_saves_rotated_refresh_token(requests_mock, stored):
+    nvs = FakeNVS()
+    store = CredentialStore(KeyValueStore(nvs))
+    store.save(dict(stored))
+    del nvs.writes[:]
+    credentials = CredentialStore(KeyValueStore(nvs)).load()
+    session = Session(credentials, store=store)
+    requests_mock.post(
+        'https://accounts.spotify.com/api/token',
+        [
+            {'json': {'access_token': 'a1', 'refresh_token': 'refresh_token', 'expires_in': 3600}},
+            {'json': {'access_token': 'a2', 'refresh_token': 'rotated', 'expires_in': 3600}},
+        ],
+    )
+    requests_mock.get('https://api.spotify.com/v1/me/player', status_code=204)
+
+    # The store has no access token, so it is refreshed before the first request
+    session.get('https://api.spotify.com/v1/me/player')
+    assert session.credentials['access_token'] == 'a1'
+    assert nvs.writes == []
+
+    session.refresh_if_needed(margin=3600)
+    assert nvs.writes == ['refresh_token']
+
+
+def test_spotify_client_is_the_same_on_first_boot(monkeypatch, stored):
+    pools = []
+
+    def setup_wizard(pool=None, store=None):
+        pools.append(pool)
+        store.save(dict(stored))
+        return SpotifyWebApiClient(Session(dict(stored), pool=pool, store=store))
+
+    monkeypatch.setattr(authorization_code_flow, 'setup_wizard', setup_wizard)
+    store = CredentialStore(MemoryStore())
+    first = spotify_client(backend='socket', store=store)
+    assert first.session.pool is pools[0]
+    later = spotify_client(backend='socket', store=store)
+    assert len(pools) == 1
+    for client in (first, later):
+        assert isinstance(client.session.pool, ConnectionPool)
+        assert client.session.retry_policy is not None
+        assert client.session.store is store
@@ -0,0 +1,157 @@
+import json
+import time
+
+import pytest
+
+from spotify_web_api.fleet import FleetClient
+
+
+# The credentials of another Spotify account with the same application
+def account(credentials, name, device_id=None, expires_at=None):
+    return dict(
+        credentials,
+        refresh_token='refresh_{}'.format(name),
+        access_token='access_{}'.format(name),
+        device_id=device_id,
+        expires_at=expires_at if expires_at is not None else time.time() + 3600,
+    )
+
+
+@pytest.fixture
+def fleet(credentials):
+    fleet = FleetClient(max_threads=2)
+    kitchen = account(credentials, 'a', 'kitchen')
+    fleet.add('kitchen', kitchen)
+    fleet.add('garden', kitchen, device_id='garden')
+    fleet.add('office', account(credentials, 'b', 'office'))
+    return fleet
+
+
+def test_sessions_share_pool_and_scheduler(fleet):
+    sessions = [client.session for client in fleet.clients.values()]
+    assert all(session.pool is fleet.pool for session in sessions)
+    assert all(session.scheduler is fleet.scheduler for session in sessions)
+    assert [session.device_id for session in sessions] == ['kitchen', 'garden', 'office']
+
+
+def test_pause_broadcast(requests_mock, fleet):
+    requests_mock.put('https://api.spotify.com/v1/me/player/pause', status_code=204)
+
+    result = fleet.pause()
+
+    assert result.ok
+    assert sorted(result.results) == ['garden', 'kitchen', 'office']
+    devices = sorted(request.qs['device_id'][0] for request in requests_mock.request_history)
+    assert devices == ['garden', 'kitchen', 'office']
+    tokens = sorted(request.headers['Authorization'] for request in requests_mock.request_history)
+    assert tokens == ['Bearer access_a', 'Bearer access_a', 'Bearer access_b']
+    latency = result.latency()
+    assert latency['targets'] == 3
+    assert latency['failed'] == 0
+    assert latency['max'] >= latency['mean'] >= 0
+
+
+def test_play_sends_the_same_body(requests_mock, fleet):
+    requests_mock.put('https://api.spotify.com/v1/me/player/play', status_code=204)
+
+    result = fleet.play(context_uri='spotify:album:1', targets=['kitchen', 'office'])
+
+    assert sorted(result.results) == ['kitchen', 'office']
+    bodies = [request.json() for request in requests_mock.request_history]
+    assert bodies == [{'context_uri': 'spotify:album:1'}] * 2
+
+
+def test_errors_are_reported_per_target(requests_mock, fleet):
+    def volume(request, context):
+        if request.qs['device_id'] == ['office']:
+            context.status_code = 404
+            return {'error': {'status': 404, 'message': 'Device not found'}}
+        context.status_code = 204
+        return None
+
+    requests_mock.put('https://api.spotify.com/v1/me/player/volume', json=volume)
+
+    result = fleet.volume(30)
+
+    assert not result.ok
+    assert list(result.failed) == ['office']
+    assert result.failed['office'].status == 404
+    assert result['kitchen'].error is None
+
+
+def test_refresh_once_per_account(requests_mock, credentials):
+    fleet = FleetClient()
+    expired = account(credentials, 'a', 'kitchen', expires_at=time.time() - 1)
+    fleet.add('kitchen', expired)
+    fleet.add('garden', expired, device_id='garden')
+    fleet.add('office', account(credentials, 'b', 'office'))
+    requests_mock.post('https://accounts.spotify.com/api/token', json={'access_token': 'new', 'expires_in': 3600})
+
+    result = fleet.refresh_if_needed()
+
+    assert list(result.results) == ['kitchen', 'office']
+    assert requests_mock.call_count == 1
+    assert fleet.clients['garden'].session.credentials['access_token'] == 'new'
+
+
+def test_expired_account_is_refreshed_once_by_concurrent_targets(requests_mock, credentials):
+    fleet = FleetClient(max_threads=4)
+    expired = account(credentials, 'a', expires_at=time.time() - 1)
+    for device_id in ('kitchen', 'garden', 'office', 'hall'):
+        fleet.add(device_id, expired, device_id=device_id)
+    refresh_tokens = iter(['rotated_1', 'rotated_2', 'rotated_3', 'rotated_4'])
+
+    def tokens(request, context):
+        time.sleep(0.05)
+        return {'access_token': 'new', 'refresh_token': next(refresh_tokens), 'expires_in': 3600}
+
+    token_endpoint = requests_mock.post('https://accounts.spotify.com/api/token', json=tokens)
+    requests_mock.put('https://api.spotify.com/v1/me/player/pause', status_code=204)
+
+    assert fleet.pause().ok
+
+    assert token_endpoint.call_count == 1
+    assert expired['refresh_token'] == 'rotated_1'
+    assert fleet.clients['hall'].session.store.load()['refresh_token'] == 'rotated_1'
+
+
+def test_add_keeps_rotated_tokens_in_memory(requests_mock, tmp_path, monkeypatch, credentials):
+    monkeypatch.chdir(tmp_path)
+    fleet = FleetClient()
+    fleet.add('kitchen', account(credentials, 'a', 'kitchen', expires_at=time.time() - 1))
+    fleet.add('office', account(credentials, 'b', 'office', expires_at=time.time() - 1))
+    requests_mock.post(
+        'https://accounts.spotify.com/api/token',
+        [
+            {'json': {'access_token': 'new_a', 'refresh_token': 'rotated_a', 'expires_in': 3600}},
+            {'json': {'access_token': 'new_b', 'refresh_token': 'rotated_b', 'expires_in': 3600}},
+        ],
+    )
+
+    assert fleet.refresh_if_needed().ok
+
+    assert list(tmp_path.iterdir()) == []
+    stored = sorted(client.session.store.load()['refresh_token'] for client in fleet.clients.values())
+    assert stored == ['rotated_a', 'rotated_b']
+
+
+def test_load_saves_refreshed_tokens_to_the_same_file(requests_mock, tmp_path, credentials):
+    path = str(tmp_path / 'office.json')
+    with open(path, 'w') as f:
+        f.write(json.dumps(account(credentials, 'b', 'office', expires_at=time.time() - 1)))
+    fleet = FleetClient()
+    fleet.load('office', path)
+    requests_mock.post(
+        'https://accounts.spotify.com/api/token',
+        json={'access_token': 'new', 'refresh_token': 'rotated', 'expires_in': 3600},
+    )
+
+    assert fleet.refresh_if_needed().ok
+
+    with open(path) as f:
+        assert json.loads(f.read())['refresh_token'] == 'rotated'
+
+
+def test_load_invalid_file(tmp_path):
+    with pytest.raises(ValueError):
+        FleetClient().load('office', str(tmp_path / 'missing.json'))
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from spotify_web_api.jsonstream import iter_items
+
+
+def chunked(document, size):
+    data = json.dumps(document).encode()
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+DOCUMENT = {
+    'href': 'https://api.spotify.com/v1/me/player/queue?x=[1]',
+    'currently_playing': {'name': 'skip {me}', 'items': [1, 2]},
+    'tracks': {
+        'total': 3,
+        'items': [
+            {'name': 'Seagulls! "Stop it now"', 'artists': [{'name': 'Bad Lip Reading'}]},
+            {'name': 'Escaped \\ ] } , :', 'popularity': 0.5},
+            {'name': 'Åäö', 'explicit': False, 'preview_url': None},
+        ],
+    },
+    'numbers': [1, -2.5e3, True, None, 'four'],
+}
+
+
+@pytest.mark.parametrize('size', [1, 2, 7, 4096])
+def test_nested_path(size):
+    items = list(iter_items(chunked(DOCUMENT, size), 'tracks.items[*]'))
+    assert items == DOCUMENT['tracks']['items']
+
+
+@pytest.mark.parametrize('size', [1, 3, 4096])
+def test_scalar_items(size):
+    assert list(iter_items(chunked(DOCUMENT, size), 'numbers[*]')) == DOCUMENT['numbers']
+
+
+def test_top_level_array():
+    assert list(iter_items(chunked([{'id': 1}, {'id': 2}], 3), '[*]')) == [{'id': 1}, {'id': 2}]
+
+
+def test_missing_null_and_empty():
+    assert list(iter_items(chunked(DOCUMENT, 5), 'devices[*]')) == []
+    assert list(iter_items(chunked({'devices': None}, 5), 'devices[*]')) == []
+    assert list(iter_items(chunked({'devices': []}, 5), 'devices[*]')) == []
+
+
+def test_items_are_yielded_before_document_is_read():
+    chunks = iter(chunked(DOCUMENT, 16))
+    items = iter_items(chunks, 'tracks.items[*]')
+    next(items)
+    assert next(chunks, None) is not None
+
+
+def test_truncated_document():
+    with pytest.raises(ValueError):
+        list(iter_items([b'{"devices": [{"id": 1}, '], 'devices[*]'))
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from spotify_web_api import Session, SpotifyWebApiClient, SpotifyWebApiError
+from spotify_web_api.metrics import Histogram, Metrics
+from spotify_web_api.retry import RetryPolicy
+
+PAUSE_URL = 'https://api.spotify.com/v1/me/player/pause'
+DEVICES_URL = 'https://api.spotify.com/v1/me/player/devices'
+TOKEN_URL = 'https://accounts.spotify.com/api/token'
+
+
+@pytest.fixture
+def session(credentials):
+    return Session(credentials, retry_policy=RetryPolicy(sleep=lambda seconds: None))
+
+
+def test_histogram():
+    histogram = Histogram((0.1, 1))
+    for seconds in (0.05, 0.05, 0.5, 3):
+        histogram.add(seconds)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1
+    assert histogram.quantile(0.99) is None
+    assert histogram.max == 3
+
+
+def test_hooks(requests_mock, session):
+    requests_mock.get(DEVICES_URL, json={'devices': [{'id': 'a'}]})
+    events = []
+    for event in ('request', 'response', 'parsed'):
+        session.add_hook(event, lambda *args, event=event: events.append((event,) + args[:2]))
+    list(SpotifyWebApiClient(session).devices())
+    assert events == [
+        ('request', 'GET', DEVICES_URL),
+        ('response', 'GET', DEVICES_URL),
+        ('parsed', 'GET', DEVICES_URL),
+    ]
+
+
+def test_metrics(requests_mock, session):
+    metrics = Metrics(heap_used=lambda: 1000).install(session)
+    requests_mock.get(DEVICES_URL, json={'devices': [{'id': 'a'}]})
+    requests_mock.put(
+        PAUSE_URL,
+        [
+            {'status_code': 503, 'json': {'error': {'status': 503, 'message': 'Service unavailable'}}},
+            {'status_code': 401, 'json': {'error': {'status': 401, 'message': 'The access token expired'}}},
+            {'status_code': 204},
+            {'status_code': 404, 'json': {'error': {'status': 404, 'message': 'Not found'}}},
+        ],
+    )
+    requests_mock.post(TOKEN_URL, json={'access_token': 'new_access_token'})
+    spotify = SpotifyWebApiClient(session)
+    list(spotify.devices())
+    spotify.pause()
+    with pytest.raises(SpotifyWebApiError):
+        spotify.pause()
+
+    devices = metrics.endpoints['GET /v1/me/player/devices']
+    assert devices.requests == 1
+    assert devices.bytes == len(b'{"devices": [{"id": "a"}]}')
+    assert devices.duration.count == 1
+    assert devices.heap_before == devices.heap_after == 1000
+    pause = metrics.endpoints['PUT /v1/me/player/pause']
+    assert pause.requests == 4
+    assert pause.latency.count == 4
+    assert pause.duration.count == 1
+    assert metrics.refreshes == 1
+    assert metrics.retries == 1
+    assert metrics.errors == {'404': 1}
+
+    dumped = json.loads(metrics.dumps())
+    assert dumped['endpoints']['PUT /v1/me/player/pause']['requests'] == 4
+    assert 'PUT /v1/me/player/pause: 4 requests' in metrics.format()
+    assert metrics.http_response('/metrics.json').startswith('HTTP/1.0 200 OK\nContent-Type: application/json')
@@ -0,0 +1,95 @@
+import json
+import sys
+import tracemalloc
+
+import pytest
+
+from spotify_web_api import Device, PlaybackState, Track
+from spotify_web_api.models import TupleModel
+
+DEVICE = {
+    "id": "5fbb3ba6aa454b5534c4ba43a8c7e8e45a63ad0e",
+    "is_active": False,
+    "is_private_session": True,
+    "is_restricted": False,
+    "name": "My fridge",
+    "type": "Computer",
+    "volume_percent": 100,
+}
+
+
+def test_unknown_fields_are_ignored():
+    device = Device.from_dict(dict(DEVICE, supports_volume=True))
+    assert device.as_dict() == DEVICE
+    assert repr(device) == 'Device(name=My fridge, type=Computer, id=5fbb3ba6aa454b5534c4ba43a8c7e8e45a63ad0e)'
+    with pytest.raises(AttributeError):
+        device.supports_volume
+
+
+def test_keyword_arguments():
+    assert Device(**DEVICE) == Device.from_dict(DEVICE)
+    assert Device(id='abc').name is None
+
+
+def test_projection():
+    model = Device.fields('id', 'name')
+    assert model is Device.fields('id', 'name')
+    device = model(DEVICE)
+    assert type(device).__name__ == 'Device'
+    assert sys.getsizeof(device) < sys.getsizeof(Device(DEVICE))
+    assert (device.id, device.name) == (DEVICE['id'], DEVICE['name'])
+    with pytest.raises(AttributeError):
+        device.volume_percent
+    with pytest.raises(ValueError):
+        Device.fields('colour')
+
+
+def test_nested_models():
+    state = PlaybackState.from_dict(
+        {
+            'device': DEVICE,
+            'is_playing': True,
+            'progress_ms': 1000,
+            'item': {'id': '471sXvN5C5vfMSBdKrGpo7', 'name': 'Seagulls!', 'album': {'name': 'BLR'}},
+            'actions': {'disallows': {'resuming': True}},
+        }
+    )
+    assert state.device.name == 'My fridge'
+    assert isinstance(state.item, Track)
+    assert state.item.album.name == 'BLR'
+    assert state.shuffle_state is None
+
+
+def test_memory_per_object():
+    class PlainDevice:
+        def __init__(self, **kwargs):
+            for name, value in kwargs.items():
+                setattr(self, name, value)
+
+    def allocated(factory):
+        # Memory kept alive by objects built from freshly parsed responses
+        responses = [json.dumps(dict(DEVICE, id=str(i))) for i in range(200)]
+        tracemalloc.start()
+        objects = [factory(json.loads(response)) for response in responses]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        assert len(objects) == 200
+        return size
+
+    plain = allocated(lambda device: PlainDevice(**device))
+    compact = allocated(Device)
+    projected = allocated(Device.fields('id', 'name'))
+    assert compact < plain
+    assert projected < compact
+
+
+def test_tuple_model():
+    class TupleDevice(TupleModel):
+        __slots__ = ()
+        _fields = Device._fields
+
+    device = TupleDevice.fields('id', 'name')(DEVICE)
+    assert (device.id, device.name) == (DEVICE['id'], DEVICE['name'])
+    assert device.as_dict() == {'id': DEVICE['id'], 'name': DEVICE['name']}
+    with pytest.raises(AttributeError):
+        device.type
@@ -0,0 +1,102 @@
+import pytest
+
+from spotify_web_api import Session, SpotifyWebApiClient
+from spotify_web_api import paging
+from spotify_web_api.paging import chunked, prefetched, Prefetch
+
+PLAYLIST_URL = 'https://api.spotify.com/v1/playlists/37i9dQZF1DXcBWIGoYBM5M/tracks'
+
+
+@pytest.fixture
+def spotify_web_api_client(credentials):
+    return SpotifyWebApiClient(Session(credentials))
+
+
+def test_chunked():
+    assert list(chunked(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked([], 2)) == []
+
+
+@pytest.mark.parametrize('prefetch', [False, True])
+def test_prefetched(prefetch):
+    assert list(prefetched(lambda x: x * 2, range(4), prefetch)) == [0, 2, 4, 6]
+
+
+@pytest.mark.parametrize('threads', [False, True])
+def test_prefetch_calls_once(monkeypatch, threads):
+    if not threads:
+        monkeypatch.setattr(paging, 'start_new_thread', None)
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise ValueError(len(calls))
+
+    prefetch = Prefetch(fail)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            prefetch.result()
+    assert calls == [1]
+    succeeding = Prefetch(lambda: calls.append(2) or 'a')
+    assert succeeding.result() == succeeding.result() == 'a'
+    assert calls == [1, 2]
+
+
+def test_prefetched_error():
+    def fail(x):
+        raise ValueError(x)
+
+    with pytest.raises(ValueError):
+        list(prefetched(fail, [1]))
+
+
+@pytest.mark.parametrize('prefetch', [False, True])
+def test_playlist_tracks_follows_next(requests_mock, spotify_web_api_client, prefetch):
+    def page(offset, total=5, limit=2):
+        items = [{'track': {'id': str(i), 'name': 'Track {}'.format(i)}} for i in range(offset, min(offset + limit, total))]
+        next_url = None
+        if offset + limit < total:
+            next_url = '{}?offset={}&limit={}'.format(PLAYLIST_URL, offset + limit, limit)
+        return {'items': items, 'next': next_url, 'total': total}
+
+    requests_mock.get(PLAYLIST_URL + '?limit=2', json=page(0), complete_qs=True)
+    requests_mock.get(PLAYLIST_URL + '?offset=2&limit=2', json=page(2), complete_qs=True)
+    requests_mock.get(PLAYLIST_URL + '?offset=4&limit=2', json=page(4), complete_qs=True)
+
+    tracks = spotify_web_api_client.playlist_tracks('37i9dQZF1DXcBWIGoYBM5M', limit=2, prefetch=prefetch)
+    assert [track.id for track in tracks] == ['0', '1', '2', '3', '4']
+    assert requests_mock.call_count == 3
+
+
+def test_paging_key(requests_mock, spotify_web_api_client):
+    requests_mock.get(
+        'https://api.spotify.com/v1/search?q=seagulls&type=track',
+        json={'tracks': {'items': [{'id': '471sXvN5C5vfMSBdKrGpo7'}], 'next': None}},
+    )
+    items = spotify_web_api_client.session.paginate(
+        'https://api.spotify.com/v1/search', params={'q': 'seagulls', 'type': 'track'}, paging_key='tracks'
+    )
+    assert list(items) == [{'id': '471sXvN5C5vfMSBdKrGpo7'}]
+
+
+@pytest.mark.parametrize('prefetch', [False, True])
+def test_tracks_are_batched(requests_mock, spotify_web_api_client, prefetch):
+    def response(request, context):
+        return {'tracks': [{'id': track_id} for track_id in request.qs['ids'][0].split(',')]}
+
+    requests_mock.get('https://api.spotify.com/v1/tracks', json=response)
+    ids = ('{:022d}'.format(i) for i in range(120))
+    tracks = list(spotify_web_api_client.tracks(ids, fields=('id',), prefetch=prefetch))
+
+    assert [track.id for track in tracks] == ['{:022d}'.format(i) for i in range(120)]
+    assert sorted(len(request.qs['ids'][0].split(',')) for request in requests_mock.request_history) == [20, 50, 50]
+
+
+def test_audio_features_are_batched(requests_mock, spotify_web_api_client):
+    requests_mock.get(
+        'https://api.spotify.com/v1/audio-features',
+        json=lambda request, context: {'audio_features': [{'id': i} for i in request.qs['ids'][0].split(',')]},
+    )
+    features = list(spotify_web_api_client.audio_features(str(i) for i in range(250)))
+    assert len(features) == 250
+    assert requests_mock.call_count == 3
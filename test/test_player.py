@@ -1,3 +1,5 @@
+import time
+
 import pytest
 
 from spotify_web_api import (
@@ -8,33 +10,13 @@ from spotify_web_api import (
 
 
 @pytest.fixture
-def spotify_web_api_client():
-    return SpotifyWebApiClient(
-        Session(
-            credentials=dict(
-                refresh_token='refresh_token',
-                access_token='access_token',
-                client_id='client_id',
-                client_secret='client_secret',
-                device_id=None,
-            )
-        )
-    )
+def spotify_web_api_client(credentials):
+    return SpotifyWebApiClient(Session(credentials))
 
 
 @pytest.fixture
-def spotify_web_api_client_device_id():
-    return SpotifyWebApiClient(
-        Session(
-            credentials=dict(
-                refresh_token='refresh_token',
-                access_token='access_token',
-                client_id='client_id',
-                client_secret='client_secret',
-                device_id='device_id',
-            )
-        )
-    )
+def spotify_web_api_client_device_id(credentials):
+    return SpotifyWebApiClient(Session(dict(credentials, device_id='device_id')))
 
 
 def test_non_json_error(requests_mock, spotify_web_api_client):
@@ -223,4 +205,101 @@ def test_devices(requests_mock, spotify_web_api_client):
     assert requests_mock.last_request.text is None
 
 
-#
+def test_access_token_refreshed_before_expiry(requests_mock, spotify_web_api_client):
+    new_access_token = "NgA6ZcYI...ixn8bUQ"
+    session = spotify_web_api_client.session
+    session.credentials['expires_at'] = time.time() + session.refresh_margin - 1
+    requests_mock.post(
+        "https://accounts.spotify.com/api/token",
+        status_code=200,
+        json={"access_token": new_access_token, "token_type": "Bearer", "expires_in": 3600},
+    )
+    requests_mock.put(
+        'https://api.spotify.com/v1/me/player/pause',
+        status_code=204,
+        request_headers={'Authorization': 'Bearer {}'.format(new_access_token)},
+    )
+    spotify_web_api_client.pause()
+
+    assert requests_mock.call_count == 2
+    assert requests_mock.request_history[0].url == "https://accounts.spotify.com/api/token"
+    assert session.credentials['expires_at'] > time.time() + 3500
+
+
+def test_refresh_if_needed(requests_mock, spotify_web_api_client):
+    session = spotify_web_api_client.session
+    assert not session.refresh_if_needed()
+
+    session.credentials['expires_at'] = time.time() + 200
+    assert not session.refresh_if_needed()
+    assert requests_mock.call_count == 0
+
+    requests_mock.post(
+        "https://accounts.spotify.com/api/token",
+        status_code=200,
+        json={"access_token": "new", "token_type": "Bearer", "expires_in": 3600},
+    )
+    assert session.refresh_if_needed(margin=300)
+    assert session.credentials['access_token'] == 'new'
+
+
+def test_prepared_play(requests_mock, spotify_web_api_client):
+    requests_mock.put('https://api.spotify.com/v1/me/player/play', status_code=204)
+    body = spotify_web_api_client.prepare_play(uris=['spotify:track:471sXvN5C5vfMSBdKrGpo7'])
+    spotify_web_api_client.play(body=body)
+    assert requests_mock.last_request.json() == {'uris': ['spotify:track:471sXvN5C5vfMSBdKrGpo7']}
+    assert requests_mock.last_request.headers['Content-Type'] == 'application/json'
+
+
+def test_headers_are_cached_until_token_changes(spotify_web_api_client_device_id):
+    session = spotify_web_api_client_device_id.session
+    assert session._headers() is session._headers()
+    assert session._headers(json=True)['Content-Type'] == 'application/json'
+    session.credentials['access_token'] = 'new_access_token'
+    assert session._headers() == {'Authorization': 'Bearer new_access_token'}
+
+    url = 'https://api.spotify.com/v1/me/player/pause'
+    assert session._add_device_id(url) is session._add_device_id(url)
+    session.device_id = 'other_device_id'
+    assert session._add_device_id(url) == url + '?device_id=other_device_id'
+
+
+@pytest.mark.parametrize(
+    'command, args, method, path, qs',
+    [
+        ('next', (), 'POST', '/v1/me/player/next', {}),
+        ('previous', (), 'POST', '/v1/me/player/previous', {}),
+        ('seek', (25000,), 'PUT', '/v1/me/player/seek', {'position_ms': ['25000']}),
+        ('volume', (40,), 'PUT', '/v1/me/player/volume', {'volume_percent': ['40']}),
+        ('shuffle', (True,), 'PUT', '/v1/me/player/shuffle', {'state': ['true']}),
+        ('repeat', ('context',), 'PUT', '/v1/me/player/repeat', {'state': ['context']}),
+        ('add_to_queue', ('spotify:track:1',), 'POST', '/v1/me/player/queue', {'uri': ['spotify:track:1']}),
+    ],
+)
+def test_player_commands(requests_mock, spotify_web_api_client_device_id, command, args, method, path, qs):
+    requests_mock.register_uri(method, 'https://api.spotify.com' + path, status_code=204)
+    getattr(spotify_web_api_client_device_id, command)(*args)
+    request = requests_mock.last_request
+    assert request.method == method
+    assert request.qs == dict(qs, device_id=['device_id'])
+    assert request.url.startswith('https://api.spotify.com{}?device_id=device_id'.format(path))
+
+
+def test_transfer_playback(requests_mock, spotify_web_api_client_device_id):
+    requests_mock.put('https://api.spotify.com/v1/me/player', status_code=204)
+    requests_mock.put('https://api.spotify.com/v1/me/player/pause', status_code=204)
+    spotify_web_api_client_device_id.transfer_playback('other_device', play=True)
+    assert requests_mock.last_request.qs == {}
+    assert requests_mock.last_request.json() == {'device_ids': ['other_device'], 'play': True}
+    spotify_web_api_client_device_id.pause()
+    assert requests_mock.last_request.qs == {'device_id': ['other_device']}
+
+
+def test_queue(requests_mock, spotify_web_api_client):
+    requests_mock.get(
+        'https://api.spotify.com/v1/me/player/queue',
+        json={'currently_playing': {'id': 'a', 'name': 'A'}, 'queue': [{'id': 'b', 'name': 'B'}]},
+    )
+    current, upcoming = spotify_web_api_client.queue(fields=('id',))
+    assert current.id == 'a'
+    assert [track.id for track in upcoming] == ['b']
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+from spotify_web_api import Session, SpotifyWebApiClient, SpotifyWebApiError
+from spotify_web_api.connection import DeadlineExceeded
+from spotify_web_api.ratelimit import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    RequestScheduler,
+    TokenBucket,
+)
+
+
+def client(credentials, scheduler):
+    return SpotifyWebApiClient(Session(credentials, scheduler=scheduler))
+
+
+def test_token_bucket(clock):
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+    bucket.take()
+    bucket.take()
+    assert bucket.delay() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.delay() == 0
+
+
+def test_scheduler_delays_requests_over_rate(clock):
+    scheduler = RequestScheduler(rate=10, burst=2, clock=clock, sleep=clock.sleep)
+    for _ in range(4):
+        scheduler.acquire()
+    assert clock.now == pytest.approx(0.2)
+    assert scheduler.stats() == {
+        'requests': 4,
+        'throttled': 0,
+        'delayed': 2,
+        'delay_total': pytest.approx(0.2),
+        'timed_out': 0,
+    }
+
+
+def test_pause(clock):
+    scheduler = RequestScheduler(clock=clock, sleep=clock.sleep)
+    scheduler.pause(3)
+    scheduler.acquire()
+    assert clock.now == pytest.approx(3)
+    assert scheduler.throttled == 1
+
+
+def test_acquire_timeout(clock):
+    scheduler = RequestScheduler(clock=clock, sleep=clock.sleep)
+    scheduler.pause(3)
+    assert not scheduler.acquire(timeout=1)
+    assert clock.now == 0
+    assert scheduler.timed_out == 1
+    assert scheduler.acquire(timeout=5)
+    assert clock.now == pytest.approx(3)
+    assert scheduler.requests == 1
+
+
+def test_interactive_requests_go_first():
+    scheduler = RequestScheduler()
+    scheduler.pause(0.2)
+    order = []
+
+    def acquire(name, priority):
+        scheduler.acquire(priority)
+        order.append(name)
+
+    threads = [
+        threading.Thread(target=acquire, args=('background', PRIORITY_BACKGROUND)),
+        threading.Thread(target=acquire, args=('interactive', PRIORITY_INTERACTIVE)),
+    ]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+    assert order == ['interactive', 'background']
+
+
+def test_retry_after_is_honored(requests_mock, credentials):
+    requests_mock.put(
+        'https://api.spotify.com/v1/me/player/pause',
+        [
+            {'status_code': 429, 'headers': {'Retry-After': '0'}, 'json': {'error': {'status': 429, 'message': 'API rate limit exceeded'}}},
+            {'status_code': 204},
+        ],
+    )
+    scheduler = RequestScheduler()
+    client(credentials, scheduler).pause()
+    assert requests_mock.call_count == 2
+    assert scheduler.throttled == 1
+
+
+def test_long_retry_after_raises(requests_mock, credentials):
+    requests_mock.put(
+        'https://api.spotify.com/v1/me/player/pause',
+        status_code=429,
+        headers={'Retry-After': '3600'},
+        json={'error': {'status': 429, 'message': 'API rate limit exceeded'}},
+    )
+    scheduler = RequestScheduler(max_retry_after=30)
+    with pytest.raises(SpotifyWebApiError) as excinfo:
+        client(credentials, scheduler).pause()
+    assert excinfo.value.status == 429
+    assert requests_mock.call_count == 1
+    assert scheduler.paused_until > time.monotonic() + 3000
+
+
+def test_retry_after_longer_than_deadline_raises_at_once(requests_mock, clock, credentials):
+    requests_mock.put(
+        'https://api.spotify.com/v1/me/player/pause',
+        status_code=429,
+        headers={'Retry-After': '3'},
+        json={'error': {'status': 429, 'message': 'API rate limit exceeded'}},
+    )
+    spotify = client(credentials, RequestScheduler(clock=clock, sleep=clock.sleep))
+    spotify.session.deadline = 0.5
+    with pytest.raises(SpotifyWebApiError) as excinfo:
+        spotify.pause()
+    assert excinfo.value.status == 429
+    assert requests_mock.call_count == 1
+    assert clock.sleeps == []
+
+    # The next call does not wait for the pause either
+    with pytest.raises(DeadlineExceeded):
+        spotify.pause()
+    assert requests_mock.call_count == 1
+    assert clock.sleeps == []
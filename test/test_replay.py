@@ -0,0 +1,89 @@
+import sys
+
+import pytest
+
+from spotify_web_api import Session, SpotifyWebApiClient
+from spotify_web_api.authorization_code_flow import refresh_token
+from spotify_web_api.connection import RequestsPool, UrequestsPool
+from spotify_web_api.replay import RecordingPool, ReplayPool
+
+DEVICES_URL = 'https://api.spotify.com/v1/me/player/devices'
+PAUSE_URL = 'https://api.spotify.com/v1/me/player/pause'
+TOKEN_URL = 'https://accounts.spotify.com/api/token'
+
+
+def client(credentials, pool):
+    return SpotifyWebApiClient(Session(credentials, pool=pool))
+
+
+def test_record_and_replay(requests_mock, tmp_path, credentials):
+    path = str(tmp_path / 'recording.jsonl')
+    requests_mock.get(DEVICES_URL, json={'devices': [{'id': 'a', 'name': 'Speaker'}]}, headers={'ETag': '"1"'})
+    requests_mock.put(PAUSE_URL, [{'status_code': 204}, {'status_code': 404, 'json': {'error': {'message': 'x'}}}])
+    recorded = client(credentials, RecordingPool(RequestsPool(), path))
+    assert [device.name for device in recorded.devices()] == ['Speaker']
+    recorded.pause()
+    with open(path) as recording:
+        assert 'Bearer' not in recording.read()
+
+    replayed = client(credentials, ReplayPool(path))
+    assert [device.name for device in replayed.devices()] == ['Speaker']
+    replayed.pause()
+    assert replayed.session.pool.requests[-1] == ('PUT', PAUSE_URL, None)
+    with pytest.raises(KeyError):
+        replayed.pause()
+    looped = client(credentials, ReplayPool(path, loop=True))
+    looped.pause()
+    looped.pause()
+
+
+def test_recorded_tokens_are_redacted(requests_mock, tmp_path):
+    path = str(tmp_path / 'recording.jsonl')
+    requests_mock.post(
+        TOKEN_URL, json={'access_token': 'live_access', 'refresh_token': 'live_refresh', 'expires_in': 3600}
+    )
+    credentials = refresh_token(
+        'code', 'http://localhost/', 'client_id', 'client_secret', pool=RecordingPool(RequestsPool(), path)
+    )
+    assert credentials['access_token'] == 'live_access'
+    with open(path) as recording:
+        recorded = recording.read()
+    assert 'live_' not in recorded
+
+    replayed = refresh_token('code', 'http://localhost/', 'client_id', 'client_secret', pool=ReplayPool(path))
+    assert replayed['access_token'] == replayed['refresh_token'] == 'redacted'
+    assert replayed['expires_at'] > 0
+
+
+def test_refresh_token_uses_pool(tmp_path):
+    path = tmp_path / 'recording.jsonl'
+    path.write_text(
+        '{"method": "POST", "url": "%s", "json": null, "status": 200, "headers": {}, '
+        '"body": "{\\"access_token\\": \\"a\\", \\"refresh_token\\": \\"r\\", \\"expires_in\\": 3600}"}\n' % TOKEN_URL
+    )
+    credentials = refresh_token('code', 'http://localhost/', 'client_id', 'client_secret', pool=ReplayPool(str(path)))
+    assert credentials['access_token'] == 'a'
+    assert credentials['refresh_token'] == 'r'
+
+
+class FakeUrequestsResponse:
+    status_code = 200
+    headers = {'Content-Type': 'application/json'}
+    content = b'{"devices": []}'
+
+    def close(self):
+        pass
+
+
+def test_urequests_pool(monkeypatch, credentials):
+    requests = []
+
+    class FakeUrequests:
+        @staticmethod
+        def request(method, url, data=None, headers=None, timeout=None):
+            requests.append((method, url, data, headers, timeout))
+            return FakeUrequestsResponse()
+
+    monkeypatch.setitem(sys.modules, 'urequests', FakeUrequests)
+    assert client(credentials, UrequestsPool()).session.get(DEVICES_URL, timeout=(3, 5)) == {'devices': []}
+    assert requests == [('GET', DEVICES_URL, None, {'Authorization': 'Bearer access_token'}, 5)]
@@ -0,0 +1,88 @@
+import pytest
+import requests
+
+from spotify_web_api import Session, SpotifyWebApiClient, SpotifyWebApiError
+from spotify_web_api.retry import RetryPolicy
+
+PAUSE_URL = 'https://api.spotify.com/v1/me/player/pause'
+DEVICES_URL = 'https://api.spotify.com/v1/me/player/devices'
+UNAVAILABLE = {'status_code': 503, 'json': {'error': {'status': 503, 'message': 'Service unavailable'}}}
+
+
+def client(credentials, policy):
+    return SpotifyWebApiClient(Session(credentials, retry_policy=policy))
+
+
+def policy(clock, **kwargs):
+    return RetryPolicy(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_backoff_is_exponential_and_capped(clock):
+    retry_policy = policy(clock, backoff=0.5, max_backoff=3, jitter=False)
+    assert [retry_policy.delay(retry) for retry in range(5)] == [0.5, 1, 2, 3, 3]
+    jittered = RetryPolicy(backoff=0.5)
+    assert all(0 <= jittered.delay(2) < 2 for _ in range(20))
+
+
+def test_server_errors_are_retried(requests_mock, clock, credentials):
+    requests_mock.put(PAUSE_URL, [UNAVAILABLE, UNAVAILABLE, {'status_code': 204}])
+    retry_policy = policy(clock)
+    client(credentials, retry_policy).pause()
+    assert requests_mock.call_count == 3
+    assert retry_policy.retries == 2
+    assert retry_policy.retry_delay == clock.now
+
+
+def test_connection_errors_are_retried(requests_mock, clock, credentials):
+    requests_mock.get(
+        DEVICES_URL,
+        [{'exc': requests.exceptions.ConnectionError}, {'json': {'devices': [{'id': 'a'}]}}],
+    )
+    assert [device.id for device in client(credentials, policy(clock)).devices()] == ['a']
+
+
+def test_gives_up_after_max_attempts(requests_mock, clock, credentials):
+    requests_mock.put(PAUSE_URL, [UNAVAILABLE] * 5)
+    retry_policy = policy(clock, max_attempts=3)
+    with pytest.raises(SpotifyWebApiError) as excinfo:
+        client(credentials, retry_policy).pause()
+    assert excinfo.value.status == 503
+    assert requests_mock.call_count == 3
+    assert retry_policy.gave_up == 1
+
+
+def test_deadline(requests_mock, clock, credentials):
+    requests_mock.put(PAUSE_URL, [UNAVAILABLE] * 5)
+    retry_policy = policy(clock, max_attempts=5, backoff=1, jitter=False, deadline=2.5)
+    with pytest.raises(SpotifyWebApiError):
+        client(credentials, retry_policy).pause()
+    assert requests_mock.call_count == 2
+
+
+def test_backoff_longer_than_call_deadline_is_not_waited_for(requests_mock, clock, credentials):
+    requests_mock.put(PAUSE_URL, [UNAVAILABLE, {'status_code': 204}])
+    retry_policy = policy(clock, backoff=1, jitter=False)
+    spotify = client(credentials, retry_policy)
+    spotify.session.deadline = 0.5
+    with pytest.raises(SpotifyWebApiError) as excinfo:
+        spotify.pause()
+    assert excinfo.value.status == 503
+    assert requests_mock.call_count == 1
+    assert clock.sleeps == []
+    assert retry_policy.gave_up == 1
+
+
+def test_non_idempotent_methods_are_not_retried(requests_mock, clock, credentials):
+    requests_mock.put(PAUSE_URL, [UNAVAILABLE, UNAVAILABLE, {'status_code': 204}])
+    spotify = client(credentials, policy(clock, methods=('GET',)))
+    with pytest.raises(SpotifyWebApiError):
+        spotify.pause()
+    spotify.session.put(PAUSE_URL, retry=True)
+    assert requests_mock.call_count == 3
+
+
+def test_client_errors_are_not_retried(requests_mock, clock, credentials):
+    requests_mock.put(PAUSE_URL, status_code=404, json={'error': {'status': 404, 'message': 'Not found'}})
+    with pytest.raises(SpotifyWebApiError):
+        client(credentials, policy(clock)).pause()
+    assert requests_mock.call_count == 1
@@ -0,0 +1,155 @@
+import http.client
+import socket
+import threading
+import time
+
+import pytest
+
+from spotify_web_api.server import HTTPServer, render_template
+
+
+def handler(request, response):
+    if request.path == '/echo':
+        response.send_json({'method': request.method, 'params': request.params(), 'body': request.body.decode()})
+    elif request.path == '/page':
+        response.template('error.html', error='x' * 1000)
+    elif request.path == '/fail':
+        raise RuntimeError('broken')
+    elif request.path == '/empty':
+        pass
+    else:
+        response.send(404, 'Not found')
+
+
+@pytest.fixture
+def server():
+    server = HTTPServer(handler, port=0, host='127.0.0.1', max_connections=3, timeout=0.5, max_request_size=512)
+    server.start()
+    stop = threading.Event()
+    thread = threading.Thread(target=server.run, args=(stop.is_set, 0.05))
+    thread.start()
+    yield server
+    stop.set()
+    thread.join()
+    server.close()
+
+
+def connect(server):
+    return http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+
+
+def test_keep_alive(server):
+    connection = connect(server)
+    for i in range(3):
+        connection.request('POST', '/echo?i={}'.format(i), body='a=b')
+        response = connection.getresponse()
+        assert response.status == 200
+        assert response.getheader('Connection') == 'keep-alive'
+        assert response.read() == '{{"method": "POST", "params": {{"i": ["{}"]}}, "body": "a=b"}}'.format(i).encode()
+    connection.close()
+    assert server.requests == 3
+
+
+def test_streamed_template(server):
+    connection = connect(server)
+    connection.request('GET', '/page')
+    response = connection.getresponse()
+    assert response.getheader('Transfer-Encoding') == 'chunked'
+    page = response.read().decode()
+    assert page == ''.join(render_template('error.html', error='x' * 1000))
+    connection.request('GET', '/empty')
+    assert connection.getresponse().status == 204
+
+
+def test_idle_connection_does_not_block_others(server):
+    idle = socket.create_connection(('127.0.0.1', server.port))
+    idle.sendall(b'GET /echo HTTP/1.1\r\nHost: ')
+    connection = connect(server)
+    connection.request('GET', '/echo')
+    assert connection.getresponse().status == 200
+    # The incomplete request times out
+    idle.settimeout(5)
+    assert idle.recv(100).startswith(b'HTTP/1.1 408 Request Timeout')
+    idle.close()
+    assert server.timeouts >= 1
+
+
+def test_oldest_idle_connection_is_evicted(server):
+    connections = [connect(server) for _ in range(4)]
+    for connection in connections:
+        connection.request('GET', '/echo')
+        assert connection.getresponse().read()
+    assert server.connections == 3
+    assert server.rejected == 0
+
+
+def test_request_too_large(server):
+    connection = connect(server)
+    connection.request('POST', '/echo', body='x' * 1000)
+    response = connection.getresponse()
+    assert response.status == 413
+    assert response.getheader('Connection') == 'close'
+
+
+@pytest.mark.parametrize(
+    'head',
+    [
+        b'nonsense\r\n\r\n',
+        b'GET /\xff HTTP/1.1\r\n\r\n',
+        b'POST /echo HTTP/1.1\r\nContent-Length: -5\r\n\r\nGET /echo HTTP/1.1\r\n\r\n',
+    ],
+)
+def test_bad_request(server, head):
+    sock = socket.create_connection(('127.0.0.1', server.port))
+    sock.sendall(head)
+    sock.settimeout(5)
+    received = b''
+    while True:
+        data = sock.recv(4096)
+        if not data:
+            break
+        received += data
+    sock.close()
+    assert received.startswith(b'HTTP/1.1 400 Bad Request')
+    assert received.count(b'HTTP/1.1') == 1
+    assert server.requests == 0
+
+
+def test_handler_error(server):
+    connection = connect(server)
+    connection.request('GET', '/fail')
+    response = connection.getresponse()
+    assert response.status == 500
+    assert response.read() == b'RuntimeError: broken'
+    assert server.errors == 1
+
+
+def test_http_10_closes(server):
+    sock = socket.create_connection(('127.0.0.1', server.port))
+    sock.sendall(b'GET /page HTTP/1.0\r\n\r\n')
+    sock.settimeout(5)
+    received = b''
+    while True:
+        data = sock.recv(4096)
+        if not data:
+            break
+        received += data
+    sock.close()
+    head, _, body = received.partition(b'\r\n\r\n')
+    assert b'Connection: close' in head
+    assert body.decode() == ''.join(render_template('error.html', error='x' * 1000))
+
+
+def test_pipelined_requests(server):
+    sock = socket.create_connection(('127.0.0.1', server.port))
+    sock.sendall(b'GET /empty HTTP/1.1\r\n\r\nGET /empty HTTP/1.1\r\nConnection: close\r\n\r\n')
+    sock.settimeout(5)
+    deadline = time.time() + 5
+    received = b''
+    while time.time() < deadline:
+        data = sock.recv(4096)
+        if not data:
+            break
+        received += data
+    sock.close()
+    assert received.count(b'HTTP/1.1 204 No Content') == 2
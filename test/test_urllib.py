@@ -0,0 +1,51 @@
+import urllib.parse
+
+import pytest
+
+from spotify_web_api import parse_qs, parse_qsl, quote, quote_plus, unquote, unquote_plus, urlencode
+
+STRINGS = [
+    '',
+    'abc',
+    'a b',
+    'a+b',
+    'spotify:track:471sXvN5C5vfMSBdKrGpo7',
+    'http://127.0.0.1:8080/auth-response/',
+    'user-read-playback-state user-modify-playback-state',
+    'Sigur Rós',
+    'ÅÄÖ € 🎵',
+    '~_.-!*\'();:@&=+$,/?#[]%',
+]
+
+
+@pytest.mark.parametrize('s', STRINGS)
+def test_quote_matches_stdlib(s):
+    assert quote(s) == urllib.parse.quote(s, safe='')
+    assert quote_plus(s) == urllib.parse.quote_plus(s, safe='')
+    assert quote(s.encode()) == urllib.parse.quote(s, safe='')
+
+
+@pytest.mark.parametrize('s', STRINGS)
+def test_unquote_matches_stdlib(s):
+    assert unquote(urllib.parse.quote(s, safe='')) == s
+    assert unquote_plus(urllib.parse.quote_plus(s, safe='')) == s
+    assert unquote(s) == urllib.parse.unquote(s)
+    assert unquote_plus(s) == urllib.parse.unquote_plus(s)
+
+
+def test_unquote_invalid_escapes():
+    for s in ('%', '%4', '%zz', '100%', '%C3%A5%2', '%FF'):
+        assert unquote(s) == urllib.parse.unquote(s)
+
+
+def test_urlencode():
+    query = {'grant_type': 'refresh_token', 'ids': ['a b', 'å'], 'limit': 50}
+    assert urlencode(query) == urllib.parse.urlencode(query, doseq=True)
+    assert urlencode([('a', 1), ('a', 2)]) == 'a=1&a=2'
+
+
+def test_parse_qs():
+    qs = 'code=AQD%2Fx+y&state=&redirect_uri=http%3A%2F%2Fhost%2F&code=2'
+    assert parse_qsl(qs) == urllib.parse.parse_qsl(qs)
+    assert parse_qs(qs) == urllib.parse.parse_qs(qs)
+    assert parse_qsl('a=1;b=2') == [('a', '1'), ('b', '2')]
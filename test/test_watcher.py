@@ -0,0 +1,102 @@
+import pytest
+
+from spotify_web_api import PlaybackState, Session, SpotifyWebApiClient
+from spotify_web_api.watcher import (
+    ACTIVE,
+    changes,
+    CONTEXT,
+    PLAYING,
+    PlaybackWatcher,
+    SEEK,
+    TRACK,
+    VOLUME,
+)
+
+PLAYER_URL = 'https://api.spotify.com/v1/me/player'
+
+
+class FakeClient:
+    def __init__(self, states):
+        self.states = list(states)
+
+    def playback_state(self):
+        state = self.states.pop(0)
+        return PlaybackState(state) if state else None
+
+
+def state(track='a', is_playing=True, progress_ms=0, duration_ms=200000, volume=50, context='spotify:album:x'):
+    return {
+        'device': {'id': 'device', 'volume_percent': volume},
+        'context': {'uri': context},
+        'is_playing': is_playing,
+        'item': {'id': track, 'duration_ms': duration_ms},
+        'progress_ms': progress_ms,
+        'repeat_state': 'off',
+        'shuffle_state': False,
+    }
+
+
+def watcher(clock, states, **kwargs):
+    return PlaybackWatcher(FakeClient(states), clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_playback_state(requests_mock, credentials):
+    requests_mock.get(PLAYER_URL, [{'json': state()}, {'status_code': 204}])
+    client = SpotifyWebApiClient(Session(credentials))
+    assert client.playback_state().item.id == 'a'
+    assert client.playback_state() is None
+
+
+def test_changes():
+    assert changes(None, None) == []
+    assert changes(None, PlaybackState(state())) == [ACTIVE]
+    assert changes(PlaybackState(state()), None) == [ACTIVE]
+    assert changes(PlaybackState(state()), PlaybackState(state(progress_ms=1000)), 1000) == []
+    assert changes(PlaybackState(state()), PlaybackState(state(track='b', is_playing=False))) == [TRACK, PLAYING]
+    assert changes(PlaybackState(state()), PlaybackState(state(progress_ms=60000)), 1000) == [SEEK]
+    assert changes(PlaybackState(state()), PlaybackState(state(volume=70, context=None))) == [VOLUME, CONTEXT]
+
+
+def test_subscribers_get_changes(clock):
+    playback_watcher = watcher(clock, [state(), state(progress_ms=2000), state(progress_ms=12000, is_playing=False)])
+    events = []
+    playback_watcher.subscribe(lambda event, new, previous: events.append((event, new.is_playing)))
+    playback_watcher.run(polls=3)
+    assert events == [(ACTIVE, True), (PLAYING, False)]
+
+
+def test_polls_at_predicted_track_end(clock):
+    playback_watcher = watcher(
+        clock,
+        [state(progress_ms=195000), state(track='b')],
+        playing_interval=10,
+        track_end_delay=1,
+        change_interval=2,
+    )
+    playback_watcher.poll()
+    playback_watcher.state = PlaybackState(state(progress_ms=195000))
+    assert playback_watcher.interval() == pytest.approx(6)
+    playback_watcher.next_poll = clock.now + playback_watcher.interval()
+    clock.now += 3
+    assert playback_watcher.poll_if_due() == []
+    assert playback_watcher.progress_ms() == 198000
+    clock.now += 3
+    assert playback_watcher.poll_if_due() == [TRACK]
+    assert playback_watcher.next_poll == clock.now + 2
+
+
+def test_interval_adapts_to_playback(clock):
+    playback_watcher = watcher(
+        clock,
+        [state(progress_ms=0), state(is_playing=False), None],
+        playing_interval=10,
+        paused_interval=20,
+        inactive_interval=60,
+        change_interval=2,
+    )
+    playback_watcher.poll()
+    assert playback_watcher.interval() == 10
+    playback_watcher.poll()
+    assert playback_watcher.interval() == 20
+    playback_watcher.poll()
+    assert playback_watcher.interval() == 60
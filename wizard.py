@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import os
 import time
 
 import click
@@ -8,6 +9,24 @@ from ampy import pyboard
 from ampy.files import Files
 from serial.tools import list_ports
 
+# The library is transferred to the device filesystem with main.py, the setup wizard
+# streams its pages from TEMPLATE_DIR
+LIBRARY_DIR = 'spotify_web_api'
+TEMPLATE_DIR = LIBRARY_DIR + '/templates'
+
+
+def put_directory(files, directory, suffix):
+    files.mkdir(directory, exists_okay=True)
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(suffix):
+            with open(os.path.join(directory, name), 'rb') as source_file:
+                files.put('{}/{}'.format(directory, name), source_file.read())
+
+
+def put_library(files):
+    put_directory(files, LIBRARY_DIR, '.py')
+    put_directory(files, TEMPLATE_DIR, '.html')
+
 
 @click.command()
 def main():
@@ -29,13 +48,15 @@ For a new device you should go through all the steps.
     )
     click.echo(
         """
-Erase the flash memory and write the Micropython with Spotify web API firmware.
-(WiFi and Spotify credentials will be lost)
+Erase the flash memory and write a Micropython firmware, e.g. esp8266 v1.13 or later
+from https://micropython.org/download/ (WiFi and Spotify credentials will be lost)
 """
     )
     if click.confirm('Erase and flash firmware?'):
         import esptool
 
+        firmware = click.prompt('firmware file', type=click.Path(exists=True, dir_okay=False))
+
         esptool.main(['--port', port, 'erase_flash'])
         esptool.main(
             [
@@ -47,18 +68,19 @@ Erase the flash memory and write the Micropython with Spotify web API firmware.
                 '--flash_size',
                 'detect',
                 '0',
-                'spotify_web_api_micropython.bin',
+                firmware,
             ]
         )
         serial.Serial(port).close()
         click.echo('\n')
 
-    if click.confirm('Transfer application code (main.py)?'):
+    if click.confirm('Transfer application code (main.py and the spotify_web_api library)?'):
         pyb = pyboard.Pyboard(port)
         files = Files(pyb)
         with open('main.py') as main_file:
             main_code = main_file.read()
             files.put('main.py', main_code.encode())
+        put_library(files)
         pyb.close()
 
     if click.confirm('Updated WiFi settings (transfer boot.py)?'):